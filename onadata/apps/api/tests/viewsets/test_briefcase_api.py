@@ -44,6 +44,9 @@ class TestBriefcaseAPI(TestAbstractViewSet):
         self._download_submission_url = reverse(
             'view-download-submission',
             kwargs={'username': self.user.username})
+        self._download_submissions_url = reverse(
+            'view-download-submissions',
+            kwargs={'username': self.user.username})
         self._form_upload_url = reverse(
             'form-upload', kwargs={'username': self.user.username})
 
@@ -229,6 +232,52 @@ class TestBriefcaseAPI(TestAbstractViewSet):
             self.assertContains(response, instanceId, status_code=200)
             self.assertMultiLineEqual(response.content, text)
 
+    def test_view_download_submissions(self):
+        view = BriefcaseApi.as_view({'get': 'download_submissions'})
+        self._publish_xml_form()
+        self._submit_transport_instance_w_attachment()
+        for survey in self.surveys[1:]:
+            self._make_submission(os.path.join(
+                self.main_directory, 'fixtures', 'transportation',
+                'instances', survey, survey + '.xml'))
+        instances = ordered_instances(self.xform)
+        self.assertEqual(instances.count(), NUM_INSTANCES)
+        params = {'formId': self.xform.id_string, 'numEntries': 2}
+        auth = DigestAuth(self.login_username, self.login_password)
+        request = self.factory.get(
+            self._download_submissions_url, data=params)
+        response = view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 401)
+        request.META.update(auth(request.META, response))
+        response = view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['resumptionCursor'], instances[1].pk)
+
+        submissions = response.data['submissions']
+        self.assertEqual(len(submissions), 2)
+        # Same XML and attachments as `downloadSubmission` returns
+        for submission, instance in zip(submissions, instances[:2]):
+            root_node = instance.get_root_node()
+            root_node.setAttribute('instanceID', 'uuid:%s' % instance.uuid)
+            root_node.setAttribute(
+                'submissionDate', instance.date_created.isoformat())
+            self.assertEqual(submission['submission_data'],
+                             root_node.toxml())
+            self.assertEqual(list(submission['media_files']),
+                             list(instance.attachments.all()))
+        self.assertEqual(len(submissions[0]['media_files']), 1)
+        self.assertContains(response, '<filename>1335783522563.jpg</filename>')
+
+        # Next page
+        params['cursor'] = response.data['resumptionCursor']
+        request = self.factory.get(
+            self._download_submissions_url, data=params)
+        request.META.update(auth(request.META, response))
+        response = view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['submissions']), 2)
+        self.assertEqual(response.data['resumptionCursor'], instances[3].pk)
+
     def test_view_download_submission_other_user(self):
         view = BriefcaseApi.as_view({'get': 'retrieve'})
         self._publish_xml_form()
@@ -1,6 +1,7 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division, absolute_import
 
+import json
 import requests
 
 from django.test import RequestFactory
@@ -170,6 +171,62 @@ class TestDataViewSet(TestBase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_data_with_after_parameter(self):
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        formid = self.xform.pk
+        ids = sorted(self.xform.instances.values_list('pk', flat=True))
+
+        request = self.factory.get(
+            '/', data={'after': '', 'limit': 3, 'fields': '["_uuid"]'},
+            **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['_id'] for r in response.data], ids[:3])
+        self.assertEqual(sorted(response.data[0].keys()), ['_id', '_uuid'])
+        self.assertIn('after={}'.format(ids[2]), response['Link'])
+        self.assertIn('rel="next"', response['Link'])
+
+        request = self.factory.get(
+            '/', data={'after': ids[2], 'limit': 3}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual([r['_id'] for r in response.data], ids[3:])
+        # Last page
+        self.assertFalse(response.has_header('Link'))
+
+        request = self.factory.get(
+            '/', data={'after': ids[2], 'start': 1}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Pages are always bounded
+        request = self.factory.get(
+            '/', data={'after': ids[2], 'limit': 0}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_data_streaming(self):
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        formid = self.xform.pk
+        request = self.factory.get('/', **self.extra)
+        expected = view(request, pk=formid).data
+
+        request = self.factory.get('/', data={'stream': 'true'}, **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(json.loads(content), expected)
+
+        request = self.factory.get('/', data={'stream': 'ndjson'},
+                                   **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual([json.loads(line) for line in content.splitlines()],
+                         expected)
+
     def test_anon_data_list(self):
         self._make_submissions()
         view = DataViewSet.as_view({'get': 'list'})
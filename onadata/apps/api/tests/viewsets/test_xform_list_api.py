@@ -10,10 +10,12 @@ from guardian.shortcuts import assign_perm
 from onadata.apps.api.tests.viewsets.test_abstract_viewset import\
     TestAbstractViewSet
 from onadata.apps.api.viewsets.xform_list_api import XFormListApi
+from onadata.apps.logger.models.xform import XForm
 from onadata.libs.constants import (
     CAN_ADD_SUBMISSIONS,
     CAN_VIEW_XFORM
 )
+from onadata.libs.utils.form_list_cache import form_list_cache
 
 
 class TestXFormListApi(TestAbstractViewSet):
@@ -22,6 +24,7 @@ class TestXFormListApi(TestAbstractViewSet):
         self.view = XFormListApi.as_view({
             "get": "list"
         })
+        form_list_cache.clear()
         self.publish_xls_form()
 
     def test_get_xform_list(self):
@@ -225,6 +228,45 @@ class TestXFormListApi(TestAbstractViewSet):
             content = response.render().content
             self.assertEqual(content, form_list_xml % data)
 
+    def test_get_xform_list_etag(self):
+        request = self.factory.get('/')
+        response = self.view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertTrue(response.has_header('X-OpenRosa-Version'))
+
+        # The client already has the latest list
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+        response = self.view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.render().content, '')
+
+        # A change to the form gives a new list
+        self.xform.save()
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+        response = self.view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # So does a form no longer in the list
+        etag = response['ETag']
+        self.xform.downloadable = False
+        self.xform.save()
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+        response = self.view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data, [])
+
+    def test_xform_version_and_hash(self):
+        self.assertEqual(self.xform.xml_hash,
+                         XForm.get_hash(self.xform.xml))
+        self.assertEqual(self.xform.hash, self.xform.xml_hash)
+        self.assertEqual(self.xform.version,
+                         XForm.get_version_from_json(self.xform.json))
+
     def test_retrieve_xform_xml(self):
         self.view = XFormListApi.as_view({
             "get": "retrieve"
@@ -291,6 +333,31 @@ class TestXFormListApi(TestAbstractViewSet):
         self.assertTrue(response.has_header('Date'))
         self.assertEqual(response['Content-Type'], 'text/xml; charset=utf-8')
 
+    def test_retrieve_xform_manifest_etag(self):
+        self._load_metadata(self.xform)
+        self.view = XFormListApi.as_view({
+            "get": "manifest"
+        })
+        request = self.factory.get('/')
+        response = self.view(request, pk=self.xform.pk,
+                             username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+        response = self.view(request, pk=self.xform.pk,
+                             username=self.user.username)
+        self.assertEqual(response.status_code, 304)
+
+        # Removing the media file changes the manifest
+        self.metadata.delete()
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=etag)
+        response = self.view(request, pk=self.xform.pk,
+                             username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data, [])
+
     def test_retrieve_xform_manifest_anonymous_user(self):
         self._load_metadata(self.xform)
         self.view = XFormListApi.as_view({
@@ -5,14 +5,21 @@ import os
 
 import simplejson as json
 from django.contrib.auth.models import AnonymousUser
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    SimpleUploadedFile,
+)
 from django_digest.test import DigestAuth
 from guardian.shortcuts import assign_perm
+from mock import patch
 
 from onadata.apps.api.tests.viewsets.test_abstract_viewset import \
     TestAbstractViewSet
 from onadata.apps.api.viewsets.xform_submission_api import XFormSubmissionApi
-from onadata.apps.logger.models import Attachment
+from onadata.apps.logger.models import Attachment, Instance, XForm
+from onadata.apps.logger.xform_instance_parser import \
+    InstanceMultipleNodeError
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
 from onadata.libs.constants import (
     CAN_ADD_SUBMISSIONS
 )
@@ -378,3 +385,139 @@ class TestXFormSubmissionApi(TestAbstractViewSet):
         response = self.view(request)
         self.assertContains(response, 'No submission key provided.',
                             status_code=400)
+
+    def test_post_submission_batch(self):
+        view = XFormSubmissionApi.as_view({'post': 'batch'})
+        paths = [
+            os.path.join(self.main_directory, 'fixtures', 'transportation',
+                         'instances', s, s + '.xml')
+            for s in (self.surveys[0], self.surveys[1], self.surveys[0])
+        ]
+        xml_files = [SimpleUploadedFile(os.path.basename(path),
+                                        open(path).read(), 'text/xml')
+                     for path in paths]
+        xml_files.append(SimpleUploadedFile('bad.xml', b'<transportation>',
+                                            'text/xml'))
+        request = self.factory.post(
+            '/%s/submission/batch' % self.user.username,
+            {'xml_submission_file': xml_files})
+        request.user = AnonymousUser()
+
+        response = view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('X-OpenRosa-Version'))
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results],
+                         [201, 201, 202, 400])
+        self.assertEqual(results[0]['uuid'],
+                         '5b2cc313-fc09-437e-8149-fcd32f695d41')
+        # The duplicate points to the submission it matches
+        self.assertEqual(results[2]['id'], results[0]['id'])
+
+        instances = Instance.objects.filter(xform=self.xform)
+        self.assertEqual(sorted(instances.values_list('pk', flat=True)),
+                         sorted([results[0]['id'], results[1]['id']]))
+        self.assertEqual(ParsedInstance.objects.filter(
+            instance__xform=self.xform).count(), 2)
+        self.assertEqual(XForm.objects.get(
+            pk=self.xform.pk).num_of_submissions, 2)
+
+    def test_post_submission_batch_duplicate_of_failed_submission(self):
+        view = XFormSubmissionApi.as_view({'post': 'batch'})
+        path = os.path.join(
+            self.main_directory, 'fixtures', 'transportation', 'instances',
+            self.surveys[0], self.surveys[0] + '.xml')
+        with open(path) as f:
+            xml = f.read()
+        xml_files = [SimpleUploadedFile('submission.xml', xml, 'text/xml')
+                     for _ in range(2)]
+        request = self.factory.post(
+            '/%s/submission/batch' % self.user.username,
+            {'xml_submission_file': xml_files})
+        request.user = AnonymousUser()
+
+        with patch.object(Instance, 'prepare_for_bulk_create',
+                          side_effect=InstanceMultipleNodeError('error')):
+            response = view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 200)
+        # The duplicate is not reported as saved
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            [400, 400])
+        self.assertFalse(Instance.objects.filter(xform=self.xform).exists())
+
+    def test_post_submission_batch_other_form(self):
+        view = XFormSubmissionApi.as_view({'post': 'batch'})
+        bob_xform = self.xform
+        alice_data = {
+            'username': 'alice',
+            'password1': 'alicealice',
+            'password2': 'alicealice',
+            'email': 'alice@localhost.com',
+        }
+        self._login_user_and_profile(alice_data)
+        # Same `id_string` as bob's form
+        self.publish_xls_form()
+        alice_xform = self.xform
+
+        xml_files = []
+        for s, xform in ((self.surveys[0], bob_xform),
+                         (self.surveys[1], alice_xform)):
+            path = self._add_uuid_to_submission_xml(os.path.join(
+                self.main_directory, 'fixtures', 'transportation',
+                'instances', s, s + '.xml'), xform)
+            with open(path) as f:
+                xml_files.append(SimpleUploadedFile(
+                    os.path.basename(path), f.read(), 'text/xml'))
+            os.unlink(path)
+        request = self.factory.post('/bob/submission/batch',
+                                    {'xml_submission_file': xml_files})
+        request.user = AnonymousUser()
+
+        response = view(request, username='bob')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            [201, 400])
+        self.assertEqual(Instance.objects.filter(xform=bob_xform).count(), 1)
+        self.assertFalse(Instance.objects.filter(xform=alice_xform).exists())
+
+    def test_post_submission_batch_ndjson(self):
+        view = XFormSubmissionApi.as_view({'post': 'batch'})
+        path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            '..',
+            'fixtures',
+            'transport_submission.json')
+        with open(path) as f:
+            submission = json.loads(f.read())
+        submission_path = os.path.join(
+            self.main_directory, 'fixtures', 'transportation', 'instances',
+            self.surveys[0], self.surveys[0] + '.xml')
+        with open(submission_path) as f:
+            xml = f.read()
+        body = '\n'.join([json.dumps(submission), json.dumps({'xml': xml}),
+                          json.dumps({'xml': xml})])
+
+        request = self.factory.post('/submission/batch', body,
+                                    content_type='application/x-ndjson')
+        response = view(request)
+        self.assertEqual(response.status_code, 401)
+
+        request = self.factory.post('/submission/batch', body,
+                                    content_type='application/x-ndjson')
+        auth = DigestAuth('bob', 'bobbob')
+        request.META.update(auth(request.META, response))
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            [201, 201, 202])
+        self.assertEqual(XForm.objects.get(
+            pk=self.xform.pk).num_of_submissions, 2)
+
+        request = self.factory.post(
+            '/%s/submission/batch' % self.user.username, 'not json',
+            content_type='application/x-ndjson')
+        response = view(request, username=self.user.username)
+        self.assertEqual(response.status_code, 400)
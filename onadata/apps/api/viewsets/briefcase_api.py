@@ -1,6 +1,7 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division, absolute_import
 
+from django.conf import settings
 from django.core.files import File
 from django.core.validators import ValidationError
 from django.contrib.auth.models import User
@@ -23,6 +24,7 @@ from onadata.apps.api.permissions import ViewDjangoObjectPermissions
 from onadata.apps.logger.models.attachment import Attachment
 from onadata.apps.logger.models.instance import Instance
 from onadata.apps.logger.models.xform import XForm
+from onadata.apps.logger.xform_instance_parser import set_root_node_attributes
 from onadata.apps.main.models.meta_data import MetaData
 from onadata.apps.main.models.user_profile import UserProfile
 from onadata.libs import filters
@@ -65,6 +67,13 @@ def _parse_int(num):
         pass
 
 
+def _get_submission_data(instance):
+    return set_root_node_attributes(instance.xml, {
+        'instanceID': 'uuid:%s' % instance.uuid,
+        'submissionDate': instance.date_created.isoformat(),
+    })
+
+
 class DoXmlFormUpload():
 
     def __init__(self, xml_file, user):
@@ -149,13 +158,18 @@ class BriefcaseApi(OpenRosaHeadersMixin, mixins.CreateModelMixin,
             instances = instances.filter(pk__gt=cursor)
 
         num_entries = _parse_int(num_entries)
+        if self.action == 'download_submissions':
+            max_entries = getattr(settings, 'BRIEFCASE_MAX_BATCH_SIZE', 100)
+            num_entries = min(num_entries or max_entries, max_entries)
         if num_entries:
             instances = instances[:num_entries]
 
-        if instances.count():
-            last_instance = instances[instances.count() - 1]
-            self.resumptionCursor = last_instance.pk
-        elif instances.count() == 0 and cursor:
+        # A single keyset query gives both the page and its resumption cursor
+        instances = [{'pk': pk, 'uuid': uuid}
+                     for pk, uuid in instances.values_list('pk', 'uuid')]
+        if instances:
+            self.resumptionCursor = instances[-1]['pk']
+        elif cursor:
             self.resumptionCursor = cursor
         else:
             self.resumptionCursor = 0
@@ -218,14 +232,8 @@ class BriefcaseApi(OpenRosaHeadersMixin, mixins.CreateModelMixin,
     def retrieve(self, request, *args, **kwargs):
         self.object = self.get_object()
 
-        submission_xml_root_node = self.object.get_root_node()
-        submission_xml_root_node.setAttribute(
-            'instanceID', 'uuid:%s' % self.object.uuid)
-        submission_xml_root_node.setAttribute(
-            'submissionDate', self.object.date_created.isoformat()
-        )
         data = {
-            'submission_data': submission_xml_root_node.toxml(),
+            'submission_data': _get_submission_data(self.object),
             'media_files': Attachment.objects.filter(instance=self.object),
             'host': request.build_absolute_uri().replace(
                 request.get_full_path(), '')
@@ -235,6 +243,33 @@ class BriefcaseApi(OpenRosaHeadersMixin, mixins.CreateModelMixin,
                                                           location=False),
                         template_name='downloadSubmission.xml')
 
+    def download_submissions(self, request, *args, **kwargs):
+        """
+        Batch variant of `downloadSubmission`: takes the `formId`, `cursor`
+        and `numEntries` parameters of `submissionList` and returns the
+        submissions of that page, at most `BRIEFCASE_MAX_BATCH_SIZE`, with
+        their attachments fetched in a single query.
+        """
+        page = self.filter_queryset(self.get_queryset())
+        instances = Instance.objects.filter(
+            pk__in=[instance['pk'] for instance in page]
+        ).order_by('pk').prefetch_related('attachments')
+
+        data = {
+            'submissions': [
+                {'submission_data': _get_submission_data(instance),
+                 'media_files': instance.attachments.all()}
+                for instance in instances
+            ],
+            'resumptionCursor': self.resumptionCursor,
+            'host': request.build_absolute_uri().replace(
+                request.get_full_path(), '')
+        }
+        return Response(data,
+                        headers=self.get_openrosa_headers(request,
+                                                          location=False),
+                        template_name='downloadSubmissions.xml')
+
     @detail_route(methods=['GET'])
     def manifest(self, request, *args, **kwargs):
         self.object = self.get_object()
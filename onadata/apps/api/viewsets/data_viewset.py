@@ -6,7 +6,7 @@ import json
 from django.db.models import Q
 from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.utils import six
+from django.utils import six, timezone
 from django.utils.translation import ugettext as _
 
 from rest_framework import status
@@ -16,8 +16,10 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.exceptions import ParseError, PermissionDenied
 from rest_framework.serializers import ValidationError
 from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 from onadata.apps.api.exceptions import NoConfirmationProvidedException
+from onadata.apps.api.mongo_helper import MongoHelper
 from onadata.apps.api.viewsets.xform_viewset import custom_response_handler
 from onadata.apps.api.tools import add_tags_to_instance, \
     add_validation_status_to_instance, get_validation_status, \
@@ -37,6 +39,10 @@ from onadata.libs.constants import (
 from onadata.libs.serializers.data_serializer import (
     DataSerializer, DataListSerializer, DataInstanceSerializer)
 from onadata.libs import filters
+from onadata.libs.utils.streaming import (
+    get_stream_format,
+    streaming_json_response,
+)
 from onadata.libs.utils.viewer_tools import (
     EnketoError,
     get_enketo_edit_url)
@@ -245,6 +251,44 @@ API Parameters</a>.
 >            }
 >        ]
 
+## Page through submitted data of a specific form
+Use the `after` parameter to page through large forms with a continuation
+token instead of `start`. Submissions are returned in `_id` order, `limit` at
+a time (30000 at most), and the URL of the next page is given in the `Link`
+header of the response as long as pages are full. Leave `after` empty to
+start from the first submission. `query` and `fields` can be used as usual,
+`start` and `sort` can't.
+
+<pre class="prettyprint">
+<b>GET</b> /api/v1/data/<code>{pk}</code>?after=&limit=<code>1000</code></pre>
+
+> Example
+>
+>       curl -i -X GET 'https://example.com/api/v1/data/22845?after=&limit=1000'
+
+> Response headers
+>
+>       Link: <https://example.com/api/v1/data/22845?after=4503&limit=1000>; rel="next"
+
+## Stream submitted data of a specific form
+Add `stream=true` to get the same JSON list, written to the response as it
+is read from the database, or `stream=ndjson` to get one submission per
+line (newline-delimited JSON). It works with `query`, `fields`, `start`,
+`limit`, `sort` and `after`, but streamed responses never include a `Link`
+header: the next `after` value is the `_id` of the last submission.
+
+<pre class="prettyprint">
+<b>GET</b> /api/v1/data/<code>{pk}</code>?stream=ndjson</pre>
+
+> Example
+>
+>       curl -X GET 'https://example.com/api/v1/data/22845?stream=ndjson'
+
+> Response
+>
+>       {"_id": 4503, "expense_type": "service", ...}
+>       {"_id": 4504, "expense_type": "rent", ...}
+
 ## Query submitted data of a specific form using Tags
 Provides a list of json submitted data for a specific form matching specific
 tags. Use the `tags` query parameter to filter the list of forms, `tags`
@@ -435,9 +479,12 @@ Delete a specific submission in a form
 
         postgres_query, mongo_query = self.__build_db_queries(xform, payload)
 
-        # Update Postgres & Mongo
+        # Update Postgres & Mongo. `update()` does not set `date_modified`,
+        # which tells incremental exports the submissions changed
         updated_records_count = Instance.objects.\
-            filter(**postgres_query).update(validation_status=new_validation_status)
+            filter(**postgres_query).update(
+                validation_status=new_validation_status,
+                date_modified=timezone.now())
         ParsedInstance.bulk_update_validation_statuses(mongo_query,
                                                        new_validation_status)
         return Response({
@@ -643,16 +690,43 @@ Delete a specific submission in a form
         export_type = kwargs.get('format')
         if export_type is None or export_type in ['json']:
             # perform default viewset retrieve, no data export
+            stream_format = get_stream_format(request.query_params)
+            if stream_format and not request.query_params.get('count'):
+                cursor = DataListSerializer.get_cursor(xform,
+                                                       request.query_params)
+                return streaming_json_response(
+                    (MongoHelper.to_readable_dict(record)
+                     for record in cursor),
+                    stream_format)
 
             # With DRF ListSerializer are automatically created and wraps
             # everything in a list. Since this returns a list
             # # already, we unwrap it.
             res = super(DataViewSet, self).list(request, *args, **kwargs)
             res.data = res.data[0]
+            self._set_next_link(request, res)
             return res
 
         return custom_response_handler(request, xform, query, export_type)
 
+    @staticmethod
+    def _set_next_link(request, response):
+        """
+        In continuation-token mode (`?after=`), points to the next page with
+        a `Link` header, which leaves the body a plain list of submissions.
+        A full page is the only hint that more submissions may follow.
+        """
+        keyset_params = DataListSerializer.get_keyset_params(
+            request.query_params)
+        if (keyset_params is None or request.query_params.get('count') or
+                not isinstance(response.data, list)):
+            return
+        _, limit = keyset_params
+        if response.data and len(response.data) == limit:
+            next_url = replace_query_param(request.build_absolute_uri(),
+                                           'after', response.data[-1]['_id'])
+            response['Link'] = '<{}>; rel="next"'.format(next_url)
+
     @staticmethod
     def __get_payload(request):
         try:
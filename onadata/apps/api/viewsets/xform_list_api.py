@@ -2,13 +2,16 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
 
 import pytz
+from calendar import timegm
 from datetime import datetime
 
 from django.conf import settings
 from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.http import http_date, parse_etags, quote_etag
 from rest_framework import viewsets
 from rest_framework import permissions
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import detail_route
 
@@ -23,6 +26,7 @@ from onadata.libs.renderers.renderers import XFormListRenderer
 from onadata.libs.renderers.renderers import XFormManifestRenderer
 from onadata.libs.serializers.xform_serializer import XFormListSerializer
 from onadata.libs.serializers.xform_serializer import XFormManifestSerializer
+from onadata.libs.utils.form_list_cache import form_list_cache
 
 
 # 10,000,000 bytes
@@ -110,12 +114,51 @@ class XFormListApi(viewsets.ReadOnlyModelViewSet):
 
         return queryset
 
+    def _get_cached_response(self, key, version, get_data,
+                             last_modified=None):
+        """
+        Returns the response with the data `get_data()` returns, from
+        `form_list_cache` if `version` has not changed since it was cached,
+        or `304 Not Modified` if the client already has it.
+        """
+        etag = form_list_cache.get_etag(key, version)
+        headers = self.get_openrosa_headers()
+        headers['ETag'] = quote_etag(etag)
+        if last_modified is not None:
+            headers['Last-Modified'] = http_date(
+                timegm(last_modified.utctimetuple()))
+
+        if_none_match = parse_etags(
+            self.request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+
+        data = form_list_cache.get(key, version)
+        if data is None:
+            # Without the serializer, which `ReturnList` holds on to
+            data = list(get_data())
+            form_list_cache.set(key, version, data)
+
+        return Response(data, headers=headers)
+
     def list(self, request, *args, **kwargs):
         self.object_list = self.filter_queryset(self.get_queryset())
 
-        serializer = self.get_serializer(self.object_list, many=True)
+        # The forms the user can see, and when they last changed
+        forms = list(self.object_list.values_list('pk', 'date_modified'))
+        last_modified = max(
+            date_modified for _, date_modified in forms) if forms else None
+        key = ('formList', request.user.pk, self.kwargs.get('username'),
+               request.GET.get('formID'), request.build_absolute_uri('/'))
+        version = (tuple(sorted(pk for pk, _ in forms)), last_modified)
+
+        def get_data():
+            return self.get_serializer(
+                self.object_list.select_related('user'), many=True).data
 
-        return Response(serializer.data, headers=self.get_openrosa_headers())
+        return self._get_cached_response(key, version, get_data,
+                                         last_modified)
 
     def retrieve(self, request, *args, **kwargs):
         self.object = self.get_object()
@@ -127,11 +170,18 @@ class XFormListApi(viewsets.ReadOnlyModelViewSet):
         self.object = self.get_object()
         object_list = MetaData.objects.filter(data_type='media',
                                               xform=self.object)
-        context = self.get_serializer_context()
-        serializer = XFormManifestSerializer(object_list, many=True,
-                                             context=context)
-
-        return Response(serializer.data, headers=self.get_openrosa_headers())
+        key = ('manifest', self.object.pk, self.object.user_id,
+               request.build_absolute_uri('/'))
+        version = tuple(object_list.order_by('pk').values_list(
+            'pk', 'data_value', 'file_hash', 'from_kpi'))
+
+        def get_data():
+            context = self.get_serializer_context()
+            return XFormManifestSerializer(
+                object_list.select_related('xform__user'), many=True,
+                context=context).data
+
+        return self._get_cached_response(key, version, get_data)
 
     @detail_route(methods=['GET'])
     def media(self, request, *args, **kwargs):
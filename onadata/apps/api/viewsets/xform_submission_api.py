@@ -1,12 +1,13 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division, absolute_import
 
+import json
 import re
 import StringIO
 
 from django.conf import settings
-from django.contrib.auth.models import User
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
 from django.utils.translation import ugettext as _
 
 from rest_framework import permissions
@@ -17,20 +18,29 @@ from rest_framework.authentication import (
     BasicAuthentication,
     TokenAuthentication,
     SessionAuthentication,)
+from rest_framework.decorators import list_route
 from rest_framework.response import Response
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
-from onadata.apps.logger.models import Instance
-from onadata.apps.main.models.user_profile import UserProfile
+from onadata.apps.logger.exceptions import FormInactiveError
+from onadata.apps.logger.models import Instance, XForm
+from onadata.apps.logger.xform_instance_parser import InstanceInvalidUserError
 from onadata.libs import filters
 from onadata.libs.authentication import DigestAuthentication
 from onadata.libs.mixins.openrosa_headers_mixin import OpenRosaHeadersMixin
 from onadata.libs.renderers.renderers import TemplateXMLRenderer
 from onadata.libs.serializers.data_serializer import SubmissionSerializer
-from onadata.libs.utils.logger_tools import dict2xform, safe_create_instance
+from onadata.libs.utils.batch_submission import create_instances
+from onadata.libs.utils.logger_tools import (
+    dict2xform,
+    get_profile_or_404,
+    safe_create_instance,
+)
 
 
 # 10,000,000 bytes
 DEFAULT_CONTENT_LENGTH = getattr(settings, 'DEFAULT_CONTENT_LENGTH', 10000000)
+# Maximum number of submissions per batch
+BATCH_SUBMISSION_MAX_SIZE = getattr(settings, 'BATCH_SUBMISSION_MAX_SIZE', 1000)
 xml_error_re = re.compile('>(.*)<')
 
 
@@ -79,6 +89,37 @@ def create_instance_from_json(username, request):
     return safe_create_instance(username, xml_file, [], None, request)
 
 
+def get_batch_xmls(request):
+    """
+    Returns the XML of each submission of a batch, sent either as several
+    `xml_submission_file` files or as newline-delimited JSON, one object
+    per line with either the XML (`{"xml": "..."}`) or the same content as a
+    JSON submission (`{"id": "[form ID]", "submission": {...}}`).
+
+    :raises: ValueError if a line is not valid
+    """
+    if request.content_type.lower().startswith('multipart/'):
+        return [xml_file.read()
+                for xml_file in request.FILES.getlist('xml_submission_file')]
+
+    xmls = []
+    for line in request.body.splitlines():
+        if not line.strip():
+            continue
+        dict_form = json.loads(line)
+        if not isinstance(dict_form, dict):
+            raise ValueError(_("Each line must be a JSON object."))
+        if 'xml' in dict_form:
+            xmls.append(dict_form['xml'])
+        elif dict_form.get('submission') is not None:
+            # convert lists in submission dict to joined strings
+            submission_joined = dict_lists2strings(dict_form['submission'])
+            xmls.append(dict2xform(submission_joined, dict_form.get('id')))
+        else:
+            raise ValueError(_("No xml or submission key provided."))
+    return xmls
+
+
 class XFormSubmissionApi(OpenRosaHeadersMixin,
                          mixins.CreateModelMixin, viewsets.GenericViewSet):
     """
@@ -104,6 +145,33 @@ https://example.com/api/v1/submissions
 http://localhost:8000/api/v1/submissions -u user:pass -H "Content-Type: \
 application/json"
 
+## Submit a batch of XForm submissions
+
+Up to `BATCH_SUBMISSION_MAX_SIZE` (1000 by default) submissions to the same
+form, without attachments, either as several `xml_submission_file` files or
+as newline-delimited JSON, one object per line with either the XML
+(`{"xml": "..."}`) or a JSON submission (`{"id": "[form ID]", "submission":
+[the JSON]}`).
+
+<pre class="prettyprint">
+<b>POST</b> /api/v1/submissions/batch</pre>
+> Example
+>
+>       curl -X POST -F xml_submission_file=@/path/to/submission1.xml \
+-F xml_submission_file=@/path/to/submission2.xml \
+https://example.com/api/v1/submissions/batch
+
+The status of each submission, in the order they were sent, is the status a
+single submission would have been answered with:
+>       {
+>           "results": [
+>               {"index": 0, "status": 201, "id": 1, "uuid": "...",
+>                "message": null},
+>               {"index": 1, "status": 202, "id": 1, "uuid": null,
+>                "message": "Duplicate submission"}
+>           ]
+>       }
+
 Here is some example JSON, it would replace `[the JSON]` above:
 >       {
 >           "transport": {
@@ -163,16 +231,18 @@ Here is some example JSON, it would replace `[the JSON]` above:
                     not issubclass(auth_class, SessionAuthentication)
         ]
 
-    def create(self, request, *args, **kwargs):
+    def get_submission_username(self, request):
+        """
+        Returns the username of the account submissions are made to, and
+        forces authentication if it is required
+        """
         username = self.kwargs.get('username')
         if self.request.user.is_anonymous():
             if username is None:
                 # raises a permission denied exception, forces authentication
                 self.permission_denied(self.request)
             else:
-                user = get_object_or_404(User, username=username.lower())
-
-                profile, created = UserProfile.objects.get_or_create(user=user)
+                profile = get_profile_or_404(username=username.lower())
 
                 if profile.require_auth:
                     # raises a permission denied exception,
@@ -182,6 +252,11 @@ Here is some example JSON, it would replace `[the JSON]` above:
             # get the username from the user if not set
             username = (request.user and request.user.username)
 
+        return username
+
+    def create(self, request, *args, **kwargs):
+        username = self.get_submission_username(request)
+
         if request.method.upper() == 'HEAD':
             return Response(status=status.HTTP_204_NO_CONTENT,
                             headers=self.get_openrosa_headers(request),
@@ -219,3 +294,45 @@ Here is some example JSON, it would replace `[the JSON]` above:
         return Response({'error': error_msg},
                         headers=self.get_openrosa_headers(request),
                         status=status_code)
+
+    @list_route(methods=['POST'], renderer_classes=[JSONRenderer])
+    def batch(self, request, *args, **kwargs):
+        username = self.get_submission_username(request)
+        headers = self.get_openrosa_headers(request)
+
+        try:
+            xmls = get_batch_xmls(request)
+        except ValueError as e:
+            return Response({'error': unicode(e)}, headers=headers,
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not xmls:
+            return Response({'error': _("No submission provided.")},
+                            headers=headers,
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(xmls) > BATCH_SUBMISSION_MAX_SIZE:
+            return Response(
+                {'error': _("A batch cannot hold more than %(max_size)s "
+                            "submissions.") % {
+                    'max_size': BATCH_SUBMISSION_MAX_SIZE}},
+                headers=headers, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            items = create_instances(username, xmls, request)
+        except InstanceInvalidUserError:
+            error_msg = _("Username or ID required.")
+            status_code = status.HTTP_400_BAD_REQUEST
+        except PermissionDenied as e:
+            error_msg = unicode(e)
+            status_code = status.HTTP_403_FORBIDDEN
+        except (Http404, XForm.DoesNotExist):
+            error_msg = _("Form does not exist on this account")
+            status_code = status.HTTP_404_NOT_FOUND
+        except FormInactiveError:
+            error_msg = _("Form is not active")
+            status_code = status.HTTP_405_METHOD_NOT_ALLOWED
+        else:
+            return Response({'results': [item.to_dict() for item in items]},
+                            headers=headers, status=status.HTTP_200_OK)
+
+        return Response({'error': error_msg}, headers=headers,
+                        status=status_code)
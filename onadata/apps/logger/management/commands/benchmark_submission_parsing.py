@@ -0,0 +1,145 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+'''
+Django management command to compare the cost of parsing a submission with
+and without a `SubmissionContext`, i.e. before and after the XML was parsed
+only once per submission.
+
+Nothing is written to the database or to MongoDB.
+
+:Example:
+    python manage.py benchmark_submission_parsing path/to/submission.xml --username someuser --iterations 50
+'''
+
+import gc
+import time
+from xml.dom import minidom
+from xml.parsers import expat
+
+from django.core.management.base import BaseCommand, CommandError
+
+from onadata.apps.logger.models import XForm
+from onadata.apps.logger.xform_instance_parser import (
+    SubmissionContext,
+    XFormInstanceParser,
+    get_deprecated_uuid_from_xml,
+    get_submission_date_from_xml,
+    get_uuid_from_xml,
+)
+from onadata.libs.utils.logger_tools import get_uuid_from_submission
+
+
+class ParseCounter(object):
+    """
+    Counts the minidom and expat parsers created while it is active.
+    """
+
+    def __enter__(self):
+        self.minidom = 0
+        self.expat = 0
+        self._parse_string = minidom.parseString
+        self._parser_create = expat.ParserCreate
+
+        def parse_string(*args, **kwargs):
+            self.minidom += 1
+            return self._parse_string(*args, **kwargs)
+
+        def parser_create(*args, **kwargs):
+            self.expat += 1
+            return self._parser_create(*args, **kwargs)
+
+        minidom.parseString = parse_string
+        expat.ParserCreate = parser_create
+        return self
+
+    def __exit__(self, *args):
+        minidom.parseString = self._parse_string
+        expat.ParserCreate = self._parser_create
+
+
+def parse_without_context(xml, data_dictionary):
+    """
+    What `create_instance()` and `Instance.save()` did for a new submission
+    """
+    get_uuid_from_submission(xml)
+    get_uuid_from_xml(xml)
+    get_submission_date_from_xml(xml)
+    get_deprecated_uuid_from_xml(xml)
+    parser = XFormInstanceParser(xml, data_dictionary)
+    get_uuid_from_xml(xml)
+    return parser.get_flat_dict_with_attributes()
+
+
+def parse_with_context(xml, data_dictionary):
+    submission_context = SubmissionContext(xml)
+    submission_context.formhub_uuid
+    submission_context.uuid
+    submission_context.submission_date
+    submission_context.deprecated_uuid
+    parser = XFormInstanceParser(xml, data_dictionary,
+                                 submission_context=submission_context)
+    submission_context.uuid
+    return parser.get_flat_dict_with_attributes()
+
+
+class Command(BaseCommand):
+    help = 'Measure parse calls, time and allocations per submission'
+
+    def add_arguments(self, parser):
+        parser.add_argument('xml_file')
+        parser.add_argument(
+            '--username',
+            required=True,
+            help='Username of the owner of the form',
+        )
+        parser.add_argument(
+            '--id-string',
+            help='id_string of the form; read from the submission if omitted',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+        )
+
+    def handle(self, *_, **options):
+        with open(options['xml_file']) as xml_file:
+            xml = xml_file.read()
+
+        id_string = options['id_string'] or \
+            SubmissionContext(xml).xform_id_string
+        try:
+            xform = XForm.objects.get(user__username=options['username'],
+                                      id_string=id_string)
+        except XForm.DoesNotExist:
+            raise CommandError('Form `{}` does not exist for user `{}`'.format(
+                id_string, options['username']))
+        data_dictionary = xform.data_dictionary()
+        iterations = options['iterations']
+
+        print('{:<16}{:>16}{:>16}{:>16}{:>20}'.format(
+            '', 'minidom parses', 'expat parses', 'ms', 'net allocations'))
+        results = {}
+        for label, func in (('without context', parse_without_context),
+                            ('with context', parse_with_context)):
+            gc.collect()
+            gc.disable()
+            allocations = gc.get_count()[0]
+            start = time.time()
+            with ParseCounter() as counter:
+                for _ in range(iterations):
+                    results[label] = func(xml, data_dictionary)
+            elapsed = time.time() - start
+            # Containers allocated and not freed, as counted by the collector
+            allocations = gc.get_count()[0] - allocations
+            gc.enable()
+            print('{:<16}{:>16.1f}{:>16.1f}{:>16.2f}{:>20.0f}'.format(
+                label,
+                counter.minidom / iterations,
+                counter.expat / iterations,
+                elapsed * 1000 / iterations,
+                allocations / iterations,
+            ))
+
+        if results['without context'] != results['with context']:
+            raise CommandError('Both pipelines must return the same data')
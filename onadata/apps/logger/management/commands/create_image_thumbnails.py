@@ -12,7 +12,10 @@ from django.conf import settings
 
 from onadata.apps.logger.models.attachment import Attachment
 from onadata.apps.logger.models.xform import XForm
-from onadata.libs.utils.image_tools import resize
+from onadata.libs.utils.image_tools import (
+    generate_thumbnails,
+    get_thumbnail_sizes,
+)
 from onadata.libs.utils.model_tools import queryset_iterator
 from onadata.libs.utils.viewer_tools import get_path
 from django.utils.translation import ugettext as _, ugettext_lazy
@@ -68,7 +71,7 @@ class Command(BaseCommand):
 
             if not default_storage.exists(full_path):
                 try:
-                    resize(filename)
+                    generate_thumbnails(att)
                     if default_storage.exists(get_path(
                             filename,
                             '%s' % settings.THUMB_CONF['small']['suffix'])):
@@ -80,3 +83,7 @@ class Command(BaseCommand):
                 except (IOError, OSError), e:
                     print(_('Error on %(filename)s: %(error)s')
                           % {'filename': filename, 'error': e})
+            elif not att.thumbnails:
+                # Generated before thumbnails were recorded
+                Attachment.objects.filter(pk=att.pk).update(
+                    thumbnails=get_thumbnail_sizes())
@@ -10,13 +10,15 @@ Relies solely on the `argparse` capabilities of `BaseCommand` for argument parsi
 :Example:
     python manage.py populate_xml_hashes_for_instances --repopulate --usernames someuser anotheruser
     python manage.py populate_xml_hashes_for_instances --all
+    python manage.py populate_xml_hashes_for_instances --all --background
 '''
 
 from datetime import datetime
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 from ...models import Instance
+from ...tasks import populate_xml_hashes
 
 
 class Command(BaseCommand):
@@ -39,8 +41,21 @@ class Command(BaseCommand):
             help='Recalculate even `Instance` objects that already have '
                  'hashes.',
         )
+        parser.add_argument(
+            '--background',
+            action='store_true',
+            help='Populate the missing hashes in batches, in Celery tasks.',
+        )
 
     def handle(self, *_, **options):
+        if options['background']:
+            if options['repopulate']:
+                raise CommandError(
+                    '`--background` only populates missing hashes.')
+            populate_xml_hashes.delay(usernames=options['usernames'])
+            print('Queued the population of `Instance` hashes.')
+            return
+
         # Populate the `Instance` hashes and track how long it took.
         start_time = datetime.now()
         instances_updated_total = Instance.populate_xml_hashes_for_instances(
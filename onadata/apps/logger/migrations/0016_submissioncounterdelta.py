@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0015_add_delete_data_permission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionCounterDelta',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('submission_time', models.DateTimeField()),
+                ('xform', models.ForeignKey(related_name='+', on_delete=django.db.models.deletion.DO_NOTHING, db_constraint=False, to='logger.XForm')),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import sys
+from hashlib import md5
+
+from django.db import migrations, models
+
+
+def populate_version_and_xml_hash(apps, schema_editor):
+    """
+    Same as `XForm._set_version_and_hash()`, through `update()` so that
+    `date_modified` is left untouched
+    """
+    XForm = apps.get_model('logger', 'XForm')  # noqa
+    xforms = XForm.objects.only('pk', 'json', 'xml').iterator()
+    count = 0
+    for xform in xforms:
+        try:
+            version = json.loads(xform.json).get('version')
+        except (ValueError, AttributeError):
+            version = None
+        XForm.objects.filter(pk=xform.pk).update(
+            version=None if version is None else '%s' % version,
+            xml_hash=md5(xform.xml.encode('utf8')).hexdigest())
+        count += 1
+
+    sys.stderr.write('Updated the version and hash of {} forms\n'.format(
+        count))
+    sys.stderr.flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0016_submissioncounterdelta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xform',
+            name='version',
+            field=models.CharField(max_length=255, null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='xform',
+            name='xml_hash',
+            field=models.CharField(max_length=32, null=True, blank=True),
+        ),
+        migrations.RunPython(populate_version_and_xml_hash,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from django.db import migrations
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0017_xform_version_and_xml_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='thumbnails',
+            field=jsonfield.fields.JSONField(default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from django.db import migrations
+
+
+# Building this index locks `logger_instance` against writes, i.e. blocks
+# submissions, for as long as it takes. `CREATE INDEX CONCURRENTLY` cannot run
+# in the transaction Django 1.8 wraps every migration in on PostgreSQL, so on
+# large servers, create the index beforehand, outside of a transaction:
+#
+#   CREATE INDEX CONCURRENTLY logger_instance_xform_id_xml_hash_idx
+#       ON logger_instance (xform_id, xml_hash);
+#
+# This migration then finds it and only records it in the model state.
+INDEX_NAME = 'logger_instance_xform_id_xml_hash_idx'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0018_attachment_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS {} '
+            'ON logger_instance (xform_id, xml_hash);'.format(INDEX_NAME),
+            'DROP INDEX IF EXISTS {};'.format(INDEX_NAME),
+            state_operations=[
+                migrations.AlterIndexTogether(
+                    name='instance',
+                    index_together=set([('xform', 'xml_hash')]),
+                ),
+            ],
+        ),
+    ]
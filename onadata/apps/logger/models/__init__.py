@@ -2,6 +2,7 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
 from onadata.apps.logger.models.attachment import Attachment  # flake8: noqa
 from onadata.apps.logger.models.instance import Instance
+from onadata.apps.logger.models.submission_counter import SubmissionCounterDelta
 from onadata.apps.logger.models.survey_type import SurveyType
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.xform_instance_parser import InstanceParseError
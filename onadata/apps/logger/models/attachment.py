@@ -7,7 +7,9 @@ from hashlib import md5
 
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_save
 from django.utils.http import urlencode
+from jsonfield import JSONField
 
 from .instance import Instance
 
@@ -40,6 +42,9 @@ class Attachment(models.Model):
     media_file_size = models.PositiveIntegerField(blank=True, null=True)
     mimetype = models.CharField(
         max_length=100, null=False, blank=True, default='')
+    # Sizes of the generated thumbnails by `THUMB_CONF` key, e.g.
+    # `{"small": 240}`, so their URLs are known without querying the storage
+    thumbnails = JSONField(null=True, default=None)
 
     class Meta:
         app_label = 'logger'
@@ -87,3 +92,19 @@ class Attachment(models.Model):
             suffix=suffix,
             media_file=urlencode({"media_file": self.media_file.name})
         )
+
+
+def generate_thumbnails_on_create(sender, instance=None, created=False,
+                                  **kwargs):
+    if created and instance.mimetype.startswith('image') and \
+            getattr(settings, 'GENERATE_THUMBNAILS_ON_UPLOAD', True):
+        # Avoid circular imports
+        from onadata.apps.logger.tasks import generate_attachment_thumbnails
+        # Leave time for the submission's transaction to commit
+        generate_attachment_thumbnails.apply_async(
+            (instance.pk,), countdown=getattr(
+                settings, 'GENERATE_THUMBNAILS_COUNTDOWN', 5))
+
+
+post_save.connect(generate_thumbnails_on_create, sender=Attachment,
+                  dispatch_uid='generate_attachment_thumbnails')
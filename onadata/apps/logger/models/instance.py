@@ -18,6 +18,10 @@ from taggit.managers import TaggableManager
 
 from onadata.apps.logger.exceptions import FormInactiveError
 from onadata.apps.logger.fields import LazyDefaultBooleanField
+from onadata.apps.logger.models.submission_counter import (
+    SubmissionCounterDelta,
+    submission_counters_are_deferred,
+)
 from onadata.apps.logger.models.survey_type import SurveyType
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.xform_instance_parser import XFormInstanceParser, \
@@ -72,14 +76,34 @@ def update_xform_submission_count(sender, instance, created, **kwargs):
     # `defer_counting` is a Python-only attribute
     if getattr(instance, 'defer_counting', False):
         return
+    increment_submission_counters(instance.xform_id, [instance.date_created])
+
+
+def increment_submission_counters(xform_id, submission_times):
+    """
+    Counts new submissions to the form `xform_id`, one per item of
+    `submission_times`, with a single update of each counter
+    """
+    if not submission_times:
+        return
+    if submission_counters_are_deferred():
+        # An insert into an append-only table does not lock any shared row;
+        # `fold_submission_counters` applies it to the counters later
+        SubmissionCounterDelta.objects.bulk_create([
+            SubmissionCounterDelta(xform_id=xform_id,
+                                   submission_time=submission_time)
+            for submission_time in submission_times
+        ])
+        return
     with transaction.atomic():
-        xform = XForm.objects.only('user_id').get(pk=instance.xform_id)
+        xform = XForm.objects.only('user_id').get(pk=xform_id)
         # Update with `F` expression instead of `select_for_update` to avoid
         # locks, which were mysteriously piling up during periods of high
         # traffic
-        XForm.objects.filter(pk=instance.xform_id).update(
-            num_of_submissions=F('num_of_submissions') + 1,
-            last_submission_time=instance.date_created,
+        XForm.objects.filter(pk=xform_id).update(
+            num_of_submissions=F('num_of_submissions') +
+            len(submission_times),
+            last_submission_time=max(submission_times),
         )
         # Hack to avoid circular imports
         UserProfile = User.profile.related.related_model
@@ -87,11 +111,17 @@ def update_xform_submission_count(sender, instance, created, **kwargs):
             user_id=xform.user_id
         )
         UserProfile.objects.filter(pk=profile.pk).update(
-            num_of_submissions=F('num_of_submissions') + 1,
+            num_of_submissions=F('num_of_submissions') +
+            len(submission_times),
         )
 
 
 def update_xform_submission_count_delete(sender, instance, **kwargs):
+    # A submission which is not folded yet is not in the stored counters
+    if submission_counters_are_deferred() and \
+            SubmissionCounterDelta.discard_pending(instance.xform_id,
+                                                   instance.date_created):
+        return
     try:
         xform = XForm.objects.select_for_update().get(pk=instance.xform.pk)
     except XForm.DoesNotExist:
@@ -160,6 +190,8 @@ class Instance(models.Model):
 
     class Meta:
         app_label = 'logger'
+        # Duplicate submissions are looked up by form and content hash
+        index_together = (('xform', 'xml_hash'),)
 
     @property
     def asset(self):
@@ -230,15 +262,26 @@ class Instance(models.Model):
     def _set_parser(self):
         if not hasattr(self, "_parser"):
             self._parser = XFormInstanceParser(
-                self.xml, self.xform.data_dictionary())
-
-    def _set_survey_type(self):
+                self.xml, self.xform.data_dictionary(),
+                submission_context=self.get_submission_context())
+
+    def _set_survey_type(self, survey_types=None):
+        slug = self.get_root_node_name()
+        if survey_types is not None and slug in survey_types:
+            self.survey_type = survey_types[slug]
+            return
         self.survey_type, created = \
-            SurveyType.objects.get_or_create(slug=self.get_root_node_name())
+            SurveyType.objects.get_or_create(slug=slug)
+        if survey_types is not None:
+            survey_types[slug] = self.survey_type
 
     def _set_uuid(self):
         if self.xml and not self.uuid:
-            uuid = get_uuid_from_xml(self.xml)
+            submission_context = self.get_submission_context()
+            if submission_context is not None:
+                uuid = submission_context.uuid
+            else:
+                uuid = get_uuid_from_xml(self.xml)
             if uuid is not None:
                 self.uuid = uuid
         set_uuid(self)
@@ -248,7 +291,27 @@ class Instance(models.Model):
         Populate the `xml_hash` attribute of this `Instance` based on the content of the `xml`
         attribute.
         '''
-        self.xml_hash = self.get_hash(self.xml)
+        submission_context = self.get_submission_context()
+        if submission_context is None:
+            self.xml_hash = self.get_hash(self.xml)
+            return
+        if submission_context.xml_hash is None:
+            submission_context.xml_hash = self.get_hash(self.xml)
+        self.xml_hash = submission_context.xml_hash
+
+    def get_submission_context(self):
+        """
+        Returns the `SubmissionContext` attached to this instance, if any, as
+        long as it still describes the current XML.
+
+        `submission_context` is a Python-only attribute set by
+        `create_instance()` so that the XML is parsed and hashed only once.
+        """
+        submission_context = getattr(self, 'submission_context', None)
+        if submission_context is not None and \
+                submission_context.matches(self.xml):
+            return submission_context
+        return None
 
     @classmethod
     def populate_xml_hashes_for_instances(cls, usernames=None, pk__in=None, repopulate=False):
@@ -374,14 +437,10 @@ class Instance(models.Model):
         if gc and len(gc):
             return gc[0]
 
-    def save(self, *args, **kwargs):
-        force = kwargs.pop("force", False)
-
-        self._check_active(force)
-
+    def _set_derived_fields(self, survey_types=None):
         self._set_geom()
         self._set_json()
-        self._set_survey_type()
+        self._set_survey_type(survey_types)
         self._set_uuid()
         self._populate_xml_hash()
 
@@ -389,6 +448,24 @@ class Instance(models.Model):
         if self.validation_status is None:
             self.validation_status = {}
 
+    def prepare_for_bulk_create(self, survey_types=None):
+        """
+        Does what `save()` does before writing a new submission, for
+        `bulk_create()`, which calls neither `save()` nor the `post_save`
+        signals (the caller counts the submissions).
+
+        :param dict survey_types: Optional cache of `SurveyType`s by slug,
+        shared by the submissions created together.
+        """
+        self._check_active(False)
+        self._set_derived_fields(survey_types)
+
+    def save(self, *args, **kwargs):
+        force = kwargs.pop("force", False)
+
+        self._check_active(force)
+        self._set_derived_fields()
+
         super(Instance, self).save(*args, **kwargs)
 
     def set_deleted(self, deleted_at=timezone.now()):
@@ -0,0 +1,150 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Q
+
+from onadata.apps.logger.models.xform import XForm
+
+
+def submission_counters_are_deferred():
+    return getattr(settings, 'DEFER_SUBMISSION_COUNTERS', False)
+
+
+class SubmissionCounterDelta(models.Model):
+    """
+    Append-only log of new submissions which are not counted yet in
+    `XForm.num_of_submissions`, `XForm.last_submission_time` and
+    `UserProfile.num_of_submissions`.
+
+    When `DEFER_SUBMISSION_COUNTERS` is on, each new submission inserts one
+    row here instead of updating the (hot) form and profile rows, and the
+    `fold_submission_counters` task periodically applies the rows to the
+    counters. Readers add the pending rows to get exact counts.
+    """
+    FOLD_BATCH_SIZE = 10000
+
+    # No database constraint: inserting a row must not lock the form
+    xform = models.ForeignKey(XForm, related_name='+', db_constraint=False,
+                              on_delete=models.DO_NOTHING)
+    submission_time = models.DateTimeField()
+
+    class Meta:
+        app_label = 'logger'
+
+    @classmethod
+    def get_pending_for_xform(cls, xform_id):
+        """
+        Returns the number of submissions not yet counted for a form and
+        the time of the latest one (or `None`).
+        """
+        pending = cls.objects.filter(xform_id=xform_id).aggregate(
+            count=Count('pk'), last_submission_time=Max('submission_time'))
+        return pending['count'], pending['last_submission_time']
+
+    @classmethod
+    def get_pending_for_xforms(cls, xform_ids):
+        """
+        Returns `{xform_id: (count, last submission time)}` for the forms of
+        `xform_ids` which have submissions not yet counted, in one query.
+        """
+        pending = cls.objects.filter(xform_id__in=xform_ids).values(
+            'xform_id').annotate(count=Count('pk'),
+                                 last_submission_time=Max('submission_time'))
+        return dict(
+            (row['xform_id'], (row['count'], row['last_submission_time']))
+            for row in pending)
+
+    @classmethod
+    def get_pending_for_user(cls, user_id):
+        return cls.objects.filter(xform__user_id=user_id).count()
+
+    @classmethod
+    def set_xform_count(cls, xform_id, count):
+        """
+        Stores `count` as the number of submissions of a form, unless some
+        of them are pending: folding them would count them twice. The check
+        and the update are a single query. Returns whether it was stored.
+        """
+        return XForm.objects.filter(pk=xform_id).exclude(
+            pk__in=cls.objects.filter(xform_id=xform_id).values('xform_id'),
+        ).update(num_of_submissions=count) > 0
+
+    @classmethod
+    def discard_pending(cls, xform_id, submission_time):
+        """
+        Deletes a pending row of a form, preferably the one of the
+        submission made at `submission_time`, when a submission is deleted.
+        Any row of the form counts the same, so this is enough for the
+        submission not to be counted once folded. Returns `False` if there
+        is none, i.e. the counters have to be decremented.
+        """
+        # Locked like `fold()` does: a row it has just folded is not found
+        queryset = cls.objects.select_for_update().filter(xform_id=xform_id)
+        pks = list(queryset.filter(submission_time=submission_time)
+                   .values_list('pk', flat=True)[:1]) or \
+            list(queryset.order_by('submission_time')
+                 .values_list('pk', flat=True)[:1])
+        if not pks:
+            return False
+        cls.objects.filter(pk=pks[0]).delete()
+        return True
+
+    @classmethod
+    def fold(cls):
+        """
+        Applies pending rows to the counters and deletes them, one batch per
+        transaction. Returns the number of rows folded.
+        """
+        folded = 0
+        while True:
+            with transaction.atomic():
+                # Locking the rows makes concurrent folds skip them once
+                # they are deleted, instead of counting them twice
+                rows = list(cls.objects.select_for_update().order_by(
+                    'pk').values_list('pk', 'xform_id', 'submission_time')[
+                    :cls.FOLD_BATCH_SIZE])
+                if not rows:
+                    break
+                cls._apply(rows)
+                cls.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            folded += len(rows)
+            if len(rows) < cls.FOLD_BATCH_SIZE:
+                break
+        return folded
+
+    @staticmethod
+    def _apply(rows):
+        counts = defaultdict(int)
+        last_submission_times = {}
+        for _, xform_id, submission_time in rows:
+            counts[xform_id] += 1
+            previous = last_submission_times.get(xform_id)
+            if previous is None or submission_time > previous:
+                last_submission_times[xform_id] = submission_time
+
+        user_counts = defaultdict(int)
+        owners = XForm.objects.filter(pk__in=counts.keys()).values_list(
+            'pk', 'user_id')
+        for xform_id, user_id in owners:
+            user_counts[user_id] += counts[xform_id]
+            XForm.objects.filter(pk=xform_id).update(
+                num_of_submissions=F('num_of_submissions') + counts[xform_id])
+            last_submission_time = last_submission_times[xform_id]
+            XForm.objects.filter(
+                Q(last_submission_time__isnull=True) |
+                Q(last_submission_time__lt=last_submission_time),
+                pk=xform_id,
+            ).update(last_submission_time=last_submission_time)
+
+        # Hack to avoid circular imports
+        UserProfile = User.profile.related.related_model
+        for user_id, count in user_counts.items():
+            profile, _ = UserProfile.objects.only('pk').get_or_create(
+                user_id=user_id)
+            UserProfile.objects.filter(pk=profile.pk).update(
+                num_of_submissions=F('num_of_submissions') + count)
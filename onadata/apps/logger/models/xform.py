@@ -17,10 +17,11 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.storage import get_storage_class
 from django.core.urlresolvers import reverse
 from django.db import models
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.utils import timezone
 from django.utils.encoding import smart_text
 from django.utils.translation import ugettext_lazy, ugettext as _
+from guardian.models import GroupObjectPermission, UserObjectPermission
 from guardian.shortcuts import (
     assign_perm,
     get_perms_for_model
@@ -106,6 +107,10 @@ class XForm(BaseModel):
     has_kpi_hooks = LazyDefaultBooleanField(default=False)
     kpi_asset_uid = models.CharField(max_length=32, null=True)
 
+    # Denormalized from `json` and `xml` by `save()` for the formList
+    version = models.CharField(max_length=255, null=True, blank=True)
+    xml_hash = models.CharField(max_length=32, null=True, blank=True)
+
     class Meta:
         app_label = 'logger'
         unique_together = (("user", "id_string"), ("user", "sms_id_string"))
@@ -133,9 +138,13 @@ class XForm(BaseModel):
         )
 
     def data_dictionary(self):
-        from onadata.apps.viewer.models.data_dictionary import\
-            DataDictionary
-        return DataDictionary.objects.get(pk=self.pk)
+        """
+        Returns the compiled `DataDictionary` of this form from the
+        process-wide schema cache. The result is shared and read-only; use
+        `DataDictionary.objects.get()` to get an object that can be saved.
+        """
+        from onadata.libs.utils.schema_cache import form_schema_cache
+        return form_schema_cache.get_data_dictionary(self)
 
     @property
     def has_instances_with_geopoints(self):
@@ -184,7 +193,24 @@ class XForm(BaseModel):
             else:
                 self.encrypted = False
 
+    def _set_version_and_hash(self):
+        self.version = self.get_version_from_json(self.json)
+        self.xml_hash = self.get_hash(self.xml)
+
+    @staticmethod
+    def get_version_from_json(json_str):
+        try:
+            version = json.loads(json_str).get('version')
+        except (ValueError, AttributeError):
+            return None
+        return None if version is None else '%s' % version
+
+    @staticmethod
+    def get_hash(xml):
+        return '%s' % md5(xml.encode('utf8')).hexdigest()
+
     def update(self, *args, **kwargs):
+        self._set_version_and_hash()
         super(XForm, self).save(*args, **kwargs)
 
     def save(self, *args, **kwargs):
@@ -216,17 +242,23 @@ class XForm(BaseModel):
             except:
                 self.sms_id_string = self.id_string
 
+        self._set_version_and_hash()
         super(XForm, self).save(*args, **kwargs)
 
     def __unicode__(self):
         return getattr(self, "id_string", "")
 
     def submission_count(self, force_update=False):
-        if self.num_of_submissions == 0 or force_update:
+        pending_count, _ = self._get_pending_submissions()
+        if self.num_of_submissions + pending_count == 0 or force_update:
             count = self.instances.filter(deleted_at__isnull=True).count()
-            self.num_of_submissions = count
-            self.save(update_fields=['num_of_submissions'])
-        return self.num_of_submissions
+            # Pending submissions are already in `count`, and the folds add
+            # them to the stored counter with `F()` expressions: an absolute
+            # value is only stored when none are pending
+            if not pending_count:
+                self._set_submission_count(count)
+            return count
+        return self.num_of_submissions + pending_count
     submission_count.short_description = ugettext_lazy("Submission Count")
 
     def geocoded_submission_count(self):
@@ -235,6 +267,12 @@ class XForm(BaseModel):
                                      geom__isnull=False).count()
 
     def time_of_last_submission(self):
+        _, pending_last_submission_time = \
+            self._get_pending_submissions()
+        if pending_last_submission_time is not None and (
+                self.last_submission_time is None or
+                pending_last_submission_time > self.last_submission_time):
+            return pending_last_submission_time
         if self.last_submission_time is None and self.num_of_submissions > 0:
             try:
                 last_submission = self.instances.\
@@ -246,6 +284,33 @@ class XForm(BaseModel):
                 self.save()
         return self.last_submission_time
 
+    def _set_submission_count(self, count):
+        # Avoid circular imports
+        from onadata.apps.logger.models.submission_counter import (
+            SubmissionCounterDelta,
+            submission_counters_are_deferred,
+        )
+        if not submission_counters_are_deferred():
+            self.num_of_submissions = count
+            self.save(update_fields=['num_of_submissions'])
+        elif SubmissionCounterDelta.set_xform_count(self.pk, count):
+            self.num_of_submissions = count
+
+    def _get_pending_submissions(self):
+        """
+        Returns the number of submissions not counted yet in
+        `num_of_submissions` (see `SubmissionCounterDelta`) and the time of
+        the latest one.
+        """
+        # Avoid circular imports
+        from onadata.apps.logger.models.submission_counter import (
+            SubmissionCounterDelta,
+            submission_counters_are_deferred,
+        )
+        if not submission_counters_are_deferred():
+            return 0, None
+        return SubmissionCounterDelta.get_pending_for_xform(self.pk)
+
     def time_of_last_submission_update(self):
         try:
             # we also consider deleted instances in this case
@@ -255,7 +320,7 @@ class XForm(BaseModel):
 
     @property
     def hash(self):
-        return '%s' % md5(self.xml.encode('utf8')).hexdigest()
+        return self.xml_hash or self.get_hash(self.xml)
 
     @property
     def can_be_replaced(self):
@@ -360,3 +425,31 @@ def set_object_permissions(sender, instance=None, created=False, **kwargs):
 
 post_save.connect(set_object_permissions, sender=XForm,
                   dispatch_uid='xform_object_permissions')
+
+
+def invalidate_user_permission_cache(sender, instance=None, **kwargs):
+    # Avoid circular imports
+    from onadata.libs.utils.permission_cache import xform_permission_cache
+    xform_permission_cache.invalidate(instance.user_id)
+
+
+def invalidate_group_permission_cache(sender, **kwargs):
+    from onadata.libs.utils.permission_cache import xform_permission_cache
+    xform_permission_cache.invalidate()
+
+
+post_save.connect(invalidate_user_permission_cache,
+                  sender=UserObjectPermission,
+                  dispatch_uid='xform_permission_cache_user_saved')
+post_delete.connect(invalidate_user_permission_cache,
+                    sender=UserObjectPermission,
+                    dispatch_uid='xform_permission_cache_user_deleted')
+post_save.connect(invalidate_group_permission_cache,
+                  sender=GroupObjectPermission,
+                  dispatch_uid='xform_permission_cache_group_saved')
+post_delete.connect(invalidate_group_permission_cache,
+                    sender=GroupObjectPermission,
+                    dispatch_uid='xform_permission_cache_group_deleted')
+m2m_changed.connect(invalidate_group_permission_cache,
+                    sender=User.groups.through,
+                    dispatch_uid='xform_permission_cache_groups_changed')
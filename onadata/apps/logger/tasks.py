@@ -3,17 +3,20 @@ from __future__ import unicode_literals, print_function, division, absolute_impo
 
 import csv
 import datetime
+import logging
 import zipfile
 from collections import defaultdict
 from io import BytesIO
 
 from celery import shared_task
 from dateutil import relativedelta
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.storage import get_storage_class
 from django.core.management import call_command
 
-from .models import Instance, XForm
+from onadata.libs.utils.image_tools import generate_thumbnails
+from .models import Attachment, Instance, SubmissionCounterDelta, XForm
 
 # ## ISSUE 242 TEMPORARY FIX ##
 # See https://github.com/kobotoolbox/kobocat/issues/242
@@ -29,6 +32,62 @@ def fix_root_node_names(**kwargs):
 # #### END ISSUE 242 FIX ######
 
 
+@shared_task(soft_time_limit=600, time_limit=900)
+def fold_submission_counters():
+    """
+    Applies the submissions recorded by `SubmissionCounterDelta` to the
+    form and user counters. Scheduled when `DEFER_SUBMISSION_COUNTERS` is on.
+    """
+    return SubmissionCounterDelta.fold()
+
+
+@shared_task(bind=True, soft_time_limit=300, time_limit=360)
+def generate_attachment_thumbnails(self, attachment_id):
+    """
+    Generates the `THUMB_CONF` variants of an image attachment when it is
+    uploaded, so galleries do not generate them while serving the request.
+    """
+    try:
+        attachment = Attachment.objects.get(pk=attachment_id)
+    except Attachment.DoesNotExist:
+        # The submission may not be committed yet, or has been rejected
+        raise self.retry(countdown=30 * (self.request.retries + 1),
+                         max_retries=getattr(
+                             settings, 'GENERATE_THUMBNAILS_MAX_RETRIES', 3))
+
+    try:
+        generate_thumbnails(attachment)
+    except (IOError, OSError):
+        # Not an image PIL can read, or gone from the storage. `image_url()`
+        # tries again when the thumbnail is requested
+        logger = logging.getLogger('media_files')
+        logger.warning('could not generate thumbnails for attachment %s',
+                       attachment_id, exc_info=True)
+
+
+@shared_task(soft_time_limit=600, time_limit=900)
+def populate_xml_hashes(usernames=None, batch_size=None):
+    """
+    Hashes the XML of the submissions stored before `Instance.xml_hash`
+    existed, one batch at a time, queueing itself again until none is left.
+    Duplicate detection then never compares full XML.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'XML_HASH_BACKFILL_BATCH_SIZE', 2000)
+    queryset = Instance.objects.filter(xml_hash=Instance.DEFAULT_XML_HASH)
+    if usernames:
+        queryset = queryset.filter(xform__user__username__in=usernames)
+    instance_ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+    if not instance_ids:
+        return 0
+
+    updated_count = Instance.populate_xml_hashes_for_instances(
+        pk__in=instance_ids)
+    populate_xml_hashes.apply_async(
+        kwargs={'usernames': usernames, 'batch_size': batch_size})
+    return updated_count
+
+
 @shared_task
 def generate_stats_zip(output_filename):
     # Limit to last month and this month
@@ -7,10 +7,12 @@ from django.conf import settings
 from django.core.files.base import File
 from django.core.files.storage import default_storage
 from django.core.management import call_command
+from mock import patch
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.models import Attachment, Instance
-from onadata.libs.utils.image_tools import image_url
+from onadata.libs.utils.image_tools import get_thumbnail_sizes, image_url
+from onadata.libs.utils.viewer_tools import get_path
 
 
 class TestAttachment(TestBase):
@@ -27,6 +29,17 @@ class TestAttachment(TestBase):
             instance=self.instance,
             media_file=File(open(media_file), media_file))
 
+    def tearDown(self):
+        # Thumbnails are generated as soon as attachments are saved, whether
+        # or not the test looks at them
+        for attachment in Attachment.objects.filter(instance=self.instance):
+            for conf in settings.THUMB_CONF.values():
+                thumbnail = get_path(attachment.media_file.name,
+                                     conf['suffix'])
+                if default_storage.exists(thumbnail):
+                    default_storage.delete(thumbnail)
+        super(self.__class__, self).tearDown()
+
     def test_mimetype(self):
         self.assertEqual(self.attachment.mimetype, 'image/jpeg')
 
@@ -43,6 +56,25 @@ class TestAttachment(TestBase):
                     default_storage.exists(thumbnail))
                 default_storage.delete(thumbnail)
 
+    def test_thumbnails_generated_on_upload(self):
+        attachment = Attachment.objects.get(pk=self.attachment.pk)
+        self.assertEqual(attachment.thumbnails, get_thumbnail_sizes())
+        filename = attachment.media_file.name.replace('.jpg', '')
+
+        with patch('onadata.libs.utils.image_tools.get_storage_class') as \
+                get_storage_class:
+            storage = get_storage_class.return_value.return_value
+            storage.url.side_effect = lambda name: name
+            url = image_url(attachment, 'small')
+        # The storage is not queried for thumbnails already generated
+        self.assertFalse(storage.exists.called)
+        self.assertEqual(url, '%s-small.jpg' % filename)
+
+        for size in settings.THUMB_CONF.keys():
+            thumbnail = '%s-%s.jpg' % (filename, size)
+            self.assertTrue(default_storage.exists(thumbnail))
+            default_storage.delete(thumbnail)
+
     def test_create_thumbnails_command(self):
         call_command("create_image_thumbnails")
         created_times = {}
@@ -0,0 +1,92 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+import os
+
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from onadata.apps.logger.models import SubmissionCounterDelta, XForm
+from onadata.apps.logger.tasks import fold_submission_counters
+from onadata.apps.main.models import UserProfile
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.serializers.xform_serializer import XFormSerializer
+
+
+@override_settings(DEFER_SUBMISSION_COUNTERS=True)
+class TestSubmissionCounterDelta(TestBase):
+
+    def setUp(self):
+        super(TestSubmissionCounterDelta, self).setUp()
+        self._publish_transportation_form()
+        for survey in self.surveys:
+            self._make_submission(os.path.join(
+                self.this_directory, 'fixtures', 'transportation',
+                'instances', survey, survey + '.xml'))
+
+    def test_submissions_are_counted_when_folded(self):
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(SubmissionCounterDelta.objects.count(), 4)
+        # Counters are untouched by the submissions themselves...
+        self.assertEqual(xform.num_of_submissions, 0)
+        self.assertIsNone(xform.last_submission_time)
+        self.assertEqual(
+            UserProfile.objects.get(user=self.user).num_of_submissions, 0)
+        # ...but readers include the pending submissions
+        self.assertEqual(xform.submission_count(), 4)
+        self.assertEqual(xform.time_of_last_submission(),
+                         xform.instances.latest('date_created').date_created)
+
+        self.assertEqual(fold_submission_counters(), 4)
+        self.assertEqual(SubmissionCounterDelta.objects.count(), 0)
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.num_of_submissions, 4)
+        self.assertEqual(xform.submission_count(), 4)
+        self.assertEqual(xform.last_submission_time,
+                         xform.instances.latest('date_created').date_created)
+        self.assertEqual(
+            UserProfile.objects.get(user=self.user).num_of_submissions, 4)
+
+    def test_recount_does_not_count_pending_submissions_twice(self):
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.submission_count(force_update=True), 4)
+        fold_submission_counters()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.submission_count(), 4)
+
+    def test_recount_is_not_stored_while_submissions_are_pending(self):
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.submission_count(), 4)
+        self.assertEqual(
+            XForm.objects.get(pk=self.xform.pk).num_of_submissions, 0)
+        fold_submission_counters()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.submission_count(force_update=True), 4)
+        self.assertEqual(xform.num_of_submissions, 4)
+
+    def test_deleting_pending_submission(self):
+        self.xform.instances.latest('date_created').delete()
+        self.assertEqual(SubmissionCounterDelta.objects.count(), 3)
+        fold_submission_counters()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.num_of_submissions, 3)
+        self.assertEqual(
+            UserProfile.objects.get(user=self.user).num_of_submissions, 3)
+
+        # Folded submissions are decremented from the counters
+        self.xform.instances.latest('date_created').delete()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.num_of_submissions, 2)
+        self.assertEqual(xform.submission_count(), 2)
+
+    def test_pending_submissions_of_a_list_of_forms(self):
+        last_submission_time = \
+            self.xform.instances.latest('date_created').date_created
+        self.assertEqual(
+            SubmissionCounterDelta.get_pending_for_xforms([self.xform.pk, 0]),
+            {self.xform.pk: (4, last_submission_time)})
+
+        request = RequestFactory().get('/')
+        xforms = XForm.objects.filter(pk=self.xform.pk)
+        data = XFormSerializer(xforms, many=True,
+                               context={'request': request}).data
+        self.assertEqual(data[0]['num_of_submissions'], 4)
@@ -6,6 +6,7 @@ import unittest
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.models import XForm, Instance
+from onadata.apps.viewer.models.data_dictionary import DataDictionary
 
 
 class TestXForm(TestBase):
@@ -47,6 +48,21 @@ class TestXForm(TestBase):
         self.xform._set_title()
         self.assertIn(self.xform.title, self.xform.xml)
 
+    def test_data_dictionary_is_cached_until_saved(self):
+        self._publish_transportation_form()
+        data_dictionary = self.xform.data_dictionary()
+        self.assertIs(self.xform.data_dictionary(), data_dictionary)
+        self.assertIs(XForm.objects.get(pk=self.xform.pk).data_dictionary(),
+                      data_dictionary)
+        self.assertEqual(data_dictionary.repeat_xpaths(), [])
+        self.assertIn(
+            'transport/available_transportation_types_to_referral_facility',
+            data_dictionary.select_multiple_choices())
+
+        DataDictionary.objects.get(pk=self.xform.pk).save()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertIsNot(xform.data_dictionary(), data_dictionary)
+
     @unittest.skip('Fails under Django 1.6')
     def test_reversion(self):
         self.assertTrue(reversion.is_registered(XForm))
@@ -3,8 +3,11 @@ from __future__ import unicode_literals, print_function, division, absolute_impo
 
 import os
 import re
+from xml.dom import minidom
+from xml.parsers import expat
 
 from django.http import Http404
+from django.test import RequestFactory
 from django_digest.test import DigestAuth
 from django_digest.test import Client as DigestClient
 from guardian.shortcuts import assign_perm
@@ -16,9 +19,15 @@ from onadata.apps.main.models.user_profile import UserProfile
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.models import Instance
 from onadata.apps.logger.models.instance import InstanceHistory
+from onadata.apps.logger.tasks import populate_xml_hashes
 from onadata.apps.logger.xform_instance_parser import clean_and_parse_xml
 from onadata.apps.viewer.models.parsed_instance import ParsedInstance
 from onadata.libs.utils.common_tags import GEOLOCATION
+from onadata.libs.utils.logger_tools import (
+    check_submission_permissions,
+    get_profile_or_404,
+    get_xform_from_submission,
+)
 
 
 class TestFormSubmission(TestBase):
@@ -46,6 +55,30 @@ class TestFormSubmission(TestBase):
         self._make_submission(xml_submission_file_path)
         self.assertEqual(self.response.status_code, 201)
 
+    def test_submission_xml_is_parsed_once(self):
+        """
+        From `create_instance()` to the Mongo document, the XML of a new
+        submission must be parsed once, and never with minidom.
+        """
+        xml_submission_file_path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            "../fixtures/tutorial/instances/"
+            "tutorial_2012-06-27_11-27-53_w_uuid.xml"
+        )
+        with patch('xml.dom.minidom.parseString',
+                   wraps=minidom.parseString) as minidom_parse, \
+                patch('onadata.apps.logger.xform_instance_parser.expat'
+                      '.ParserCreate',
+                      wraps=expat.ParserCreate) as expat_parse:
+            self._make_submission(xml_submission_file_path)
+
+        self.assertEqual(self.response.status_code, 201)
+        self.assertEqual(minidom_parse.call_count, 0)
+        self.assertEqual(expat_parse.call_count, 1)
+        instance = Instance.objects.last()
+        self.assertEqual(instance.uuid, '729f173c688e482486a48661700455ff')
+        self.assertEqual(instance.xml_hash, Instance.get_hash(instance.xml))
+
     @patch('django.utils.datastructures.MultiValueDict.pop')
     def test_fail_with_ioerror_read(self, mock_pop):
         mock_pop.side_effect = IOError(
@@ -238,6 +271,30 @@ class TestFormSubmission(TestBase):
         self._make_submission(xml_submission_file_path)
         self.assertEqual(self.response.status_code, 202)
 
+    def test_duplicate_submission_without_xml_hash(self):
+        """
+        Test duplicates of submissions stored before XML hashes existed
+        """
+        xml_submission_file_path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            "..", "fixtures", "tutorial", "instances",
+            "tutorial_2012-06-27_11-27-53_w_uuid.xml"
+        )
+
+        self._make_submission(xml_submission_file_path)
+        self.assertEqual(self.response.status_code, 201)
+        instance = Instance.objects.order_by('pk').last()
+        Instance.objects.filter(pk=instance.pk).update(
+            xml_hash=Instance.DEFAULT_XML_HASH)
+        self._make_submission(xml_submission_file_path)
+        self.assertEqual(self.response.status_code, 202)
+
+        self.assertEqual(populate_xml_hashes(), 1)
+        self.assertEqual(Instance.objects.get(pk=instance.pk).xml_hash,
+                         Instance.get_hash(instance.xml))
+        self._make_submission(xml_submission_file_path)
+        self.assertEqual(self.response.status_code, 202)
+
     def test_duplicate_submission_with_different_content(self):
         """
         Test xml submissions with same instanceID but different content
@@ -514,3 +571,23 @@ class TestFormSubmission(TestBase):
         xml_str = clean_and_parse_xml(xml_str).toxml()
         edited_name = re.match(r"^.+?<name>(.+?)</name>", xml_str).groups()[0]
         self.assertEqual(record['name'], edited_name)
+
+    def test_submission_routing_queries(self):
+        """
+        Test the form, its owner and their profile are loaded together
+        """
+        with self.assertNumQueries(1):
+            profile = get_profile_or_404(username__iexact='BOB')
+        self.assertEqual(profile.user, self.user)
+
+        with self.assertNumQueries(1):
+            xform = get_xform_from_submission(
+                self.xform.xml, self.user.username, uuid=self.xform.uuid)
+        self.assertEqual(xform, self.xform)
+
+        request = RequestFactory().post('/bob/submission')
+        request.user = self.user
+        with self.assertNumQueries(0):
+            check_submission_permissions(request, xform)
+
+        self.assertRaises(Http404, get_profile_or_404, username='nobody')
@@ -0,0 +1,142 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import os
+import unittest
+from xml.parsers.expat import ExpatError
+
+from onadata.apps.logger.xform_instance_parser import (
+    _get_all_attributes,
+    _xml_node_to_dict,
+    clean_and_parse_xml,
+    parse_submission_xml,
+    set_root_node_attributes,
+    xpath_from_xml_node,
+)
+
+FIXTURE_DIRECTORIES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'),
+]
+
+
+def _fixture_submissions():
+    """
+    Yield the path of every submission XML found among the fixtures, i.e.
+    every XML file within an `instances` folder.
+    """
+    for directory in FIXTURE_DIRECTORIES:
+        for root, _, files in os.walk(directory):
+            if 'instances' not in root.split(os.sep):
+                continue
+            for file_ in sorted(files):
+                if file_.endswith('.xml'):
+                    yield os.path.join(root, file_)
+
+
+def _legacy_parse(xml_str, repeats):
+    root_node = clean_and_parse_xml(xml_str).documentElement
+    attributes = {}
+    for key, value in _get_all_attributes(root_node):
+        attributes.setdefault(key, value)
+    return (root_node.nodeName,
+            _xml_node_to_dict(root_node, repeats),
+            attributes)
+
+
+def _all_xpaths(xml_str):
+    xpaths = []
+    nodes = [clean_and_parse_xml(xml_str).documentElement]
+    while nodes:
+        node = nodes.pop()
+        for child in node.childNodes:
+            if child.nodeType == child.ELEMENT_NODE:
+                xpaths.append(xpath_from_xml_node(child))
+                nodes.append(child)
+    return sorted(set(xpaths))
+
+
+class TestSubmissionXMLParser(unittest.TestCase):
+    """
+    `parse_submission_xml()` must return exactly what the minidom based
+    functions return.
+    """
+
+    def _assert_same_as_legacy(self, xml_str, repeats=()):
+        self.assertEqual(parse_submission_xml(xml_str, repeats),
+                         _legacy_parse(xml_str, repeats))
+
+    def test_fixture_submissions(self):
+        count = 0
+        for path in _fixture_submissions():
+            with open(path) as f:
+                xml_str = f.read()
+            xpaths = _all_xpaths(xml_str)
+            # Without repeats, with every node treated as a repeat and with
+            # half of them
+            for repeats in ([], xpaths, xpaths[::2]):
+                self._assert_same_as_legacy(xml_str, repeats)
+            count += 1
+        self.assertTrue(count > 0)
+
+    def test_namespaces_and_attributes(self):
+        xml_str = (
+            '<?xml version="1.0"?>\n'
+            '<data xmlns:jr="http://openrosa.org/javarosa" '
+            'xmlns:orx="http://openrosa.org/xforms" id="f" orx:version="3">\n'
+            '  <grp jr:template="">\n    <q>1</q>\n  </grp>\n'
+            '  <grp><q>2</q></grp>\n'
+            '  <orx:meta><orx:instanceID>uuid:1</orx:instanceID></orx:meta>\n'
+            '</data>'
+        )
+        self._assert_same_as_legacy(xml_str)
+        self._assert_same_as_legacy(xml_str, ['grp'])
+
+    def test_text_cdata_and_comments(self):
+        xml_str = (
+            '<a><b>  </b><c> t </c><d><![CDATA[<x> y</x>]]></d>'
+            '<e>t<!-- comment -->u</e><f>1<g>2</g>3</f>'
+            '<h><i>1</i><![CDATA[z]]><i>2</i></h>'
+            '<j>x &amp; y &#233;</j><k><![CDATA[]]></k></a>'
+        )
+        self._assert_same_as_legacy(xml_str)
+
+    def test_empty_submission(self):
+        self.assertEqual(parse_submission_xml('<data id="f"><q/></data>'),
+                         ('data', None, {'id': 'f'}))
+
+    def test_malformed_submission(self):
+        self.assertRaises(ExpatError, parse_submission_xml, '<data><q></data>')
+
+
+class TestSetRootNodeAttributes(unittest.TestCase):
+    """
+    `set_root_node_attributes()` must return exactly what minidom returns.
+    """
+
+    ATTRIBUTES = {'instanceID': 'uuid:1 & "2"',
+                  'submissionDate': '2013-03-26T07:30:43+00:00'}
+
+    def _assert_same_as_minidom(self, xml_str):
+        root_node = clean_and_parse_xml(xml_str).documentElement
+        for key, value in self.ATTRIBUTES.items():
+            root_node.setAttribute(key, value)
+        self.assertEqual(set_root_node_attributes(xml_str, self.ATTRIBUTES),
+                         root_node.toxml())
+
+    def test_fixture_submissions(self):
+        count = 0
+        for path in _fixture_submissions():
+            with open(path) as f:
+                self._assert_same_as_minidom(f.read())
+            count += 1
+        self.assertTrue(count > 0)
+
+    def test_text_cdata_and_comments(self):
+        self._assert_same_as_minidom(
+            '<?xml version="1.0"?>\n<!-- before -->'
+            '<a id="f" instanceID="uuid:0" xmlns:orx="o">\n  <b>  </b>'
+            '<c> t &amp; "u" &gt; </c><d><![CDATA[<x> y</x>]]></d>'
+            '<e>t<!-- comment -->u<?pi data?></e><f></f>'
+            '<orx:meta><orx:instanceID>uuid:0</orx:instanceID></orx:meta>'
+            '</a>'
+        )
@@ -44,6 +44,7 @@ from onadata.libs.utils.log import audit_log, Actions
 from onadata.libs.utils.viewer_tools import enketo_url
 from onadata.libs.utils.viewer_tools import image_urls_dict
 from onadata.libs.utils.logger_tools import (
+    get_profile_or_404,
     safe_create_instance,
     OpenRosaResponseBadRequest,
     OpenRosaResponse,
@@ -258,9 +259,7 @@ def xformsManifest(request, username, id_string):
 @csrf_exempt
 def submission(request, username=None):
     if username:
-        formlist_user = get_object_or_404(User, username__iexact=username)
-        profile, created = UserProfile.objects.get_or_create(
-            user=formlist_user)
+        profile = get_profile_or_404(username__iexact=username)
 
         if profile.require_auth:
             authenticator = HttpDigestAuthenticator()
@@ -10,6 +10,7 @@ import six
 from django.utils.encoding import smart_unicode, smart_str
 from django.utils.translation import ugettext as _
 from xml.dom import minidom, Node
+from xml.parsers import expat
 
 from onadata.libs.utils.common_tags import XFORM_ID_STRING
 
@@ -195,6 +196,410 @@ def _xml_node_to_dict(node, repeats=[]):
             return {node.nodeName: value}
 
 
+class _SubmissionXMLHandler(object):
+    """
+    Builds the same nested dictionary as `_xml_node_to_dict()` and collects
+    the same attributes as `_get_all_attributes()`, in a single streaming
+    pass over the XML with expat and without building a DOM.
+
+    Each open element is tracked by a frame `[name, xpath, children]`, where
+    `children` is the list of its child nodes as `(kind, payload)` tuples.
+    Text payloads are lists of chunks joined when the node is complete and
+    element payloads are `(name, xpath, value)` tuples. XPaths are computed
+    from the parent frame, so repeat detection is no longer proportional to
+    the depth of the node.
+    """
+
+    TEXT = 'text'
+    CDATA = 'cdata'
+    ELEMENT = 'element'
+    OTHER = 'other'
+
+    def __init__(self, repeats):
+        self.repeats = frozenset(repeats)
+        self.root_name = None
+        self.value = None
+        self.attributes = {}
+        self.root_attributes = {}
+        self._stack = []
+        self._in_cdata = False
+
+    def parse(self, xml_str):
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.ordered_attributes = True
+        parser.StartElementHandler = self.start_element
+        parser.EndElementHandler = self.end_element
+        parser.CharacterDataHandler = self.character_data
+        parser.StartCdataSectionHandler = self.start_cdata
+        parser.EndCdataSectionHandler = self.end_cdata
+        parser.CommentHandler = self.other_node
+        parser.ProcessingInstructionHandler = self.other_node
+        parser.Parse(smart_str(xml_str.strip()), True)
+
+        return self.value
+
+    def start_element(self, name, attributes):
+        if self._stack:
+            parent = self._stack[-1]
+            self._close_text(parent[2])
+            xpath = '{}/{}'.format(parent[1], name) if parent[1] else name
+        else:
+            self.root_name = name
+            self.root_attributes = dict(zip(attributes[::2], attributes[1::2]))
+            xpath = ''
+
+        for i in range(0, len(attributes), 2):
+            key = attributes[i]
+            if key in self.attributes:
+                logger = logging.getLogger("console_logger")
+                logger.debug("Skipping duplicate attribute: %s"
+                             " with value %s" % (key, attributes[i + 1]))
+            else:
+                self.attributes[key] = attributes[i + 1]
+
+        self._stack.append([name, xpath, []])
+
+    def character_data(self, data):
+        children = self._stack[-1][2]
+        kind = self.CDATA if self._in_cdata else self.TEXT
+        if children and children[-1][0] == kind:
+            children[-1][1].append(data)
+        else:
+            self._close_text(children)
+            children.append((kind, [data]))
+
+    def start_cdata(self):
+        self._close_text(self._stack[-1][2])
+        self._in_cdata = True
+
+    def end_cdata(self):
+        self._in_cdata = False
+
+    def other_node(self, *args):
+        if self._stack:
+            children = self._stack[-1][2]
+            self._close_text(children)
+            children.append((self.OTHER, None))
+
+    def end_element(self, name):
+        name, xpath, children = self._stack.pop()
+        self._close_text(children)
+        value = self._node_value(children)
+
+        if self._stack:
+            self._stack[-1][2].append((self.ELEMENT, (name, xpath, value)))
+        else:
+            self.value = None if value is None else {name: value}
+
+    def _close_text(self, children):
+        """
+        `clean_and_parse_xml()` strips whitespace between tags before
+        parsing, so whitespace-only text nodes must be dropped here too.
+        """
+        if children and children[-1][0] == self.TEXT:
+            kind, chunks = children[-1]
+            if isinstance(chunks, list):
+                text = ''.join(chunks)
+                if text.strip():
+                    children[-1] = (kind, text)
+                else:
+                    children.pop()
+
+    def _node_value(self, children):
+        if len(children) == 0:
+            # there's no data for this leaf node
+            return None
+        if len(children) == 1 and children[0][0] == self.TEXT:
+            # there is data for this leaf node
+            return children[0][1]
+
+        # this is an internal node
+        value = {}
+        for kind, payload in children:
+            if kind == self.CDATA:
+                return ''.join(payload)
+            if kind != self.ELEMENT:
+                continue
+            child_name, child_xpath, child_value = payload
+            if child_value is None:
+                continue
+            if child_xpath in self.repeats:
+                value.setdefault(child_name, []).append(child_value)
+            elif child_name not in value:
+                value[child_name] = child_value
+            else:
+                # Same as `_xml_node_to_dict()` when a repeating group is
+                # not declared but some of its nodes are repeated anyway.
+                if not isinstance(value[child_name], list):
+                    value[child_name] = [value[child_name]]
+                value[child_name].append(child_value)
+
+        return value or None
+
+
+def parse_submission_xml(xml_str, repeats=()):
+    """
+    Parse a submission in a single pass.
+
+    :param xml_str: the submission XML
+    :param repeats: abbreviated xpaths of the repeating groups of the form
+    :returns: a tuple `(root_node_name, dict, attributes)` equivalent to
+        `_xml_node_to_dict(root_node, repeats)` and
+        `_get_all_attributes(root_node)` on the minidom document
+    """
+    handler = _SubmissionXMLHandler(repeats)
+    value = handler.parse(xml_str)
+    return handler.root_name, value, handler.attributes
+
+
+class _RootAttributesXMLWriter(object):
+    """
+    Writes the root element of an XML document back out the way minidom's
+    `toxml()` does, with some attributes of the root node replaced, in a
+    single streaming pass with expat and without building a DOM.
+    """
+
+    def __init__(self, root_attributes):
+        self.root_attributes = root_attributes
+        self._chunks = []
+        self._text = []
+        self._depth = 0
+        # The start tag is only closed once we know whether the element is
+        # empty, `<name/>`, or not
+        self._start_tag_open = False
+
+    def write(self, xml_str):
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.ordered_attributes = True
+        parser.StartElementHandler = self.start_element
+        parser.EndElementHandler = self.end_element
+        parser.CharacterDataHandler = self.character_data
+        parser.StartCdataSectionHandler = self.start_cdata
+        parser.EndCdataSectionHandler = self.end_cdata
+        parser.CommentHandler = self.comment
+        parser.ProcessingInstructionHandler = self.processing_instruction
+        parser.Parse(smart_str(xml_str.strip()), True)
+
+        return ''.join(self._chunks)
+
+    @staticmethod
+    def _escape(data):
+        # Same as `xml.dom.minidom._write_data()`
+        return data.replace('&', '&amp;').replace('<', '&lt;').replace(
+            '"', '&quot;').replace('>', '&gt;')
+
+    def _open_child(self):
+        self._flush_text()
+        if self._start_tag_open:
+            self._chunks.append('>')
+            self._start_tag_open = False
+
+    def _flush_text(self):
+        """
+        `clean_and_parse_xml()` strips whitespace between tags before
+        parsing, so whitespace-only text nodes must be dropped here too.
+        """
+        text = ''.join(self._text)
+        self._text = []
+        if text.strip():
+            if self._start_tag_open:
+                self._chunks.append('>')
+                self._start_tag_open = False
+            self._chunks.append(self._escape(text))
+
+    def start_element(self, name, attributes):
+        self._open_child()
+        attributes = dict(zip(attributes[::2], attributes[1::2]))
+        if self._depth == 0:
+            attributes.update(self.root_attributes)
+        self._chunks.append('<' + name)
+        # minidom sorts the attributes by name
+        for key in sorted(attributes):
+            self._chunks.append(
+                ' {}="{}"'.format(key, self._escape(attributes[key])))
+        self._start_tag_open = True
+        self._depth += 1
+
+    def end_element(self, name):
+        self._flush_text()
+        self._depth -= 1
+        if self._start_tag_open:
+            self._chunks.append('/>')
+            self._start_tag_open = False
+        else:
+            self._chunks.append('</{}>'.format(name))
+
+    def character_data(self, data):
+        if self._depth:
+            self._text.append(data)
+
+    def start_cdata(self):
+        self._open_child()
+        self._chunks.append('<![CDATA[')
+
+    def end_cdata(self):
+        self._chunks.append(''.join(self._text))
+        self._text = []
+        self._chunks.append(']]>')
+
+    def comment(self, data):
+        # Comments and processing instructions outside of the root element
+        # are not part of its XML
+        if self._depth:
+            self._open_child()
+            self._chunks.append('<!--{}-->'.format(data))
+
+    def processing_instruction(self, target, data):
+        if self._depth:
+            self._open_child()
+            self._chunks.append('<?{} {}?>'.format(target, data))
+
+
+def set_root_node_attributes(xml_str, attributes):
+    """
+    Set attributes on the root node of a submission.
+
+    :param xml_str: the submission XML
+    :param attributes: a dictionary of the attributes to add or replace
+    :returns: the XML of the root node, the same as
+        `clean_and_parse_xml(xml_str).documentElement.toxml()` once
+        `attributes` are set on the root node
+    """
+    return _RootAttributesXMLWriter(attributes).write(xml_str)
+
+
+def _wrap_repeats_in_lists(value, names):
+    """
+    Turn the value found at the path `names` into a list, the way
+    `_xml_node_to_dict()` does for repeating groups, descending into every
+    item of the lists met on the way.
+    """
+    if isinstance(value, list):
+        for item in value:
+            _wrap_repeats_in_lists(item, names)
+    elif isinstance(value, dict) and names[0] in value:
+        if len(names) > 1:
+            _wrap_repeats_in_lists(value[names[0]], names[1:])
+        elif not isinstance(value[names[0]], list):
+            value[names[0]] = [value[names[0]]]
+
+
+def _get_meta_from_dict(root_value, meta_name,
+                        meta_tags=('meta', 'orx:meta')):
+    """
+    Same as `get_meta_from_xml()` but reads the dictionary returned by
+    `parse_submission_xml()`.
+    """
+    def _first_child(value, names):
+        if not isinstance(value, dict):
+            return None
+        for key, child in value.items():
+            if key.lower() in names:
+                return child[0] if isinstance(child, list) else child
+        return None
+
+    meta = _first_child(root_value, meta_tags)
+    meta_value = _first_child(
+        meta, (meta_name.lower(), 'orx:%s' % meta_name.lower()))
+    if not isinstance(meta_value, basestring):
+        return None
+    return meta_value.strip()
+
+
+class SubmissionContext(object):
+    """
+    Everything derived from the XML of a submission, computed at most once
+    while it goes through `create_instance()`, `save_submission()`,
+    `Instance.save()`, `ParsedInstance.update_mongo()` and `call_service()`.
+
+    The XML is parsed a single time, before its form is known. The repeating
+    groups of the form are applied afterwards by `parse()`, which is what
+    `XFormInstanceParser` uses instead of parsing the XML again.
+    """
+
+    UUID_REGEX = re.compile(r"uuid:(.*)")
+
+    def __init__(self, xml, xml_hash=None):
+        self.xml = xml
+        self.xml_hash = xml_hash
+        # Set by `ParsedInstance.update_mongo()` and reused by `call_service()`
+        self.mongo_document = None
+        self.parse_count = 0
+
+        handler = _SubmissionXMLHandler(repeats=())
+        self._dict = handler.parse(xml)
+        self.parse_count += 1
+        self._repeats = None
+        self.root_node_name = handler.root_name
+        self.attributes = handler.attributes
+        self.root_attributes = handler.root_attributes
+
+        root_value = self._dict[self.root_node_name] if self._dict else None
+        self.instance_id = _get_meta_from_dict(root_value, 'instanceID')
+        self.deprecated_id = _get_meta_from_dict(root_value, 'deprecatedID')
+        formhub = _get_meta_from_dict(root_value, 'uuid', ('formhub',))
+        self.formhub_uuid = formhub or None
+
+    def _uuid_only(self, uuid):
+        matches = self.UUID_REGEX.match(uuid)
+        if matches and len(matches.groups()) > 0:
+            return matches.groups()[0]
+        return None
+
+    @property
+    def uuid(self):
+        """ Same as `get_uuid_from_xml()` """
+        if self.instance_id:
+            return self._uuid_only(self.instance_id)
+        uuid = self.root_attributes.get('instanceID', '')
+        if uuid != '':
+            return self._uuid_only(uuid)
+        return None
+
+    @property
+    def deprecated_uuid(self):
+        """ Same as `get_deprecated_uuid_from_xml()` """
+        if self.deprecated_id:
+            return self._uuid_only(self.deprecated_id)
+        return None
+
+    @property
+    def submission_date(self):
+        """ Same as `get_submission_date_from_xml()` """
+        submission_date = self.root_attributes.get('submissionDate', '')
+        if submission_date != '':
+            return dateutil.parser.parse(submission_date)
+        return None
+
+    @property
+    def xform_id_string(self):
+        return self.root_attributes.get('id', '')
+
+    def matches(self, xml):
+        return self.xml is xml or self.xml == xml
+
+    def parse(self, repeats):
+        """
+        Returns the same tuple as `parse_submission_xml(self.xml, repeats)`
+        """
+        repeats = tuple(repeats)
+        if self._repeats is None:
+            for xpath in repeats:
+                if self._dict is not None:
+                    _wrap_repeats_in_lists(
+                        self._dict[self.root_node_name], xpath.split('/'))
+            self._repeats = repeats
+        elif self._repeats != repeats:
+            # The form changed in the meantime; start over
+            self._dict = parse_submission_xml(self.xml, repeats)[1]
+            self.parse_count += 1
+            self._repeats = repeats
+
+        return self.root_node_name, self._dict, self.attributes
+
+
 def _flatten_dict(d, prefix):
     """
     Return a list of XPath, value pairs.
@@ -286,8 +691,9 @@ def _get_all_attributes(node):
 
 class XFormInstanceParser(object):
 
-    def __init__(self, xml_str, data_dictionary):
+    def __init__(self, xml_str, data_dictionary, submission_context=None):
         self.dd = data_dictionary
+        self._submission_context = submission_context
         # The two following variables need to be initialized in the constructor, in case parsing fails.
         self._flat_dict = {}
         self._attributes = {}
@@ -304,22 +710,27 @@ class XFormInstanceParser(object):
             six.reraise(*sys.exc_info())
 
     def parse(self, xml_str):
-        self._xml_obj = clean_and_parse_xml(xml_str)
-        self._root_node = self._xml_obj.documentElement
-        repeats = [e.get_abbreviated_xpath()
-                   for e in self.dd.get_survey_elements_of_type("repeat")]
-        self._dict = _xml_node_to_dict(self._root_node, repeats)
+        self._xml_str = xml_str
+        repeats = self.dd.repeat_xpaths()
+        if self._submission_context is not None:
+            parsed = self._submission_context.parse(repeats)
+        else:
+            parsed = parse_submission_xml(xml_str, repeats)
+        self._root_node_name, self._dict, self._attributes = parsed
         if self._dict is None:
             raise InstanceEmptyError
         for path, value in _flatten_dict_nest_repeats(self._dict, []):
             self._flat_dict["/".join(path[1:])] = value
-        self._set_attributes()
 
     def get_root_node(self):
+        # Only build a DOM for the callers which need to alter the XML
+        if not hasattr(self, '_root_node'):
+            self._root_node = clean_and_parse_xml(
+                self._xml_str).documentElement
         return self._root_node
 
     def get_root_node_name(self):
-        return self._root_node.nodeName
+        return self._root_node_name
 
     def get(self, abbreviated_xpath):
         return self.to_flat_dict()[abbreviated_xpath]
@@ -333,22 +744,6 @@ class XFormInstanceParser(object):
     def get_attributes(self):
         return self._attributes
 
-    def _set_attributes(self):
-        all_attributes = list(_get_all_attributes(self._root_node))
-        for key, value in all_attributes:
-            # commented since enketo forms may have the template attribute in
-            # multiple xml tags and I dont see the harm in overiding
-            # attributes at this point
-            try:
-                assert key not in self._attributes
-            except AssertionError:
-                logger = logging.getLogger("console_logger")
-                logger.debug("Skipping duplicate attribute: %s"
-                             " with value %s" % (key, value))
-                logger.debug(str(all_attributes))
-            else:
-                self._attributes[key] = value
-
     def get_xform_id_string(self):
         return self._attributes.get("id")
 
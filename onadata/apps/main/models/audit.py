@@ -3,10 +3,15 @@ from __future__ import unicode_literals, print_function, division, absolute_impo
 
 from datetime import datetime, timedelta
 
+from bson import ObjectId
+from bson.errors import InvalidId
 from django.conf import settings
+from pymongo import ASCENDING
 
 from onadata.apps.viewer.models.parsed_instance import DATETIME_FORMAT
 from onadata.apps.api.mongo_helper import MongoHelper
+from onadata.libs.utils.common_tags import ID
+from onadata.libs.utils.log import flush_audit_log
 
 audit = settings.MONGO_DB.auditlog
 DEFAULT_LIMIT = 1000
@@ -16,6 +21,12 @@ class AuditLog(object):
     ACCOUNT = "account"
     DEFAULT_BATCHSIZE = 1000
     CREATED_ON = "created_on"
+    # Every query is on a single account
+    INDEXES = [
+        [(ACCOUNT, ASCENDING), (CREATED_ON, ASCENDING)],
+        [(ACCOUNT, ASCENDING), (ID, ASCENDING)],
+    ]
+    _indexes_ensured = False
 
     def __init__(self, data):
         self.data = data
@@ -23,9 +34,28 @@ class AuditLog(object):
     def save(self):
         return audit.save(self.data)
 
+    @staticmethod
+    def insert_many(records):
+        return audit.insert_many(records, ordered=False)
+
     @classmethod
-    def query_mongo(cls, username, query=None, fields=None, sort=None, start=0,
-                    limit=DEFAULT_LIMIT, count=False):
+    def ensure_indexes(cls):
+        """
+        Creates the indexes of `INDEXES` which do not exist yet, once per
+        process
+        """
+        if cls._indexes_ensured:
+            return
+        for keys in cls.INDEXES:
+            audit.create_index(keys, background=True)
+        cls._indexes_ensured = True
+
+    @classmethod
+    def _get_query(cls, username, query):
+        # Records logged by this process are buffered, see `AuditLogHandler`
+        flush_audit_log()
+        cls.ensure_indexes()
+
         query = MongoHelper.to_safe_dict(query) if query else {}
         query[cls.ACCOUNT] = username
         # TODO find better method
@@ -51,14 +81,23 @@ class AuditLog(object):
                     end_time = start_time + timedelta(days=1)
                     query[cls.CREATED_ON] = {"$gte": start_time,
                                              "$lte": end_time}
+        return query
 
+    @staticmethod
+    def _get_fields_to_select(fields):
         # TODO: current mongo (2.0.4 of this writing)
         # cant mix including and excluding fields in a single query
         fields_to_select = None
         if type(fields) == list and len(fields) > 0:
             fields_to_select = dict([(MongoHelper.encode(field), 1)
                                      for field in fields])
-        cursor = audit.find(query, fields_to_select)
+        return fields_to_select
+
+    @classmethod
+    def query_mongo(cls, username, query=None, fields=None, sort=None, start=0,
+                    limit=DEFAULT_LIMIT, count=False):
+        query = cls._get_query(username, query)
+        cursor = audit.find(query, cls._get_fields_to_select(fields))
         if count:
             return [{"count": cursor.count()}]
 
@@ -71,3 +110,29 @@ class AuditLog(object):
         # set batch size for cursor iteration
         cursor.batch_size = cls.DEFAULT_BATCHSIZE
         return cursor
+
+    @classmethod
+    def query_mongo_keyset(cls, username, query=None, fields=None, after=None,
+                           limit=DEFAULT_LIMIT):
+        """
+        Returns up to `limit` records of `username` whose `_id` is greater
+        than `after`, sorted by `_id`, i.e. in the order they were logged.
+
+        Unlike `skip()`, every page is a range scan on the `(account, _id)`
+        index, which costs the same however far into the log it starts.
+        """
+        query = cls._get_query(username, query)
+        if after is not None:
+            try:
+                after = ObjectId(after)
+            except (InvalidId, TypeError):
+                raise ValueError("Invalid after param")
+            query[ID] = {"$gt": after}
+
+        # `limit(0)` would return every remaining record
+        if limit <= 0:
+            raise ValueError("Invalid limit param")
+
+        cursor = audit.find(query, cls._get_fields_to_select(fields))
+        return cursor.sort(ID, 1).limit(limit).batch_size(
+            cls.DEFAULT_BATCHSIZE)
@@ -27,3 +27,23 @@ class TestAuditLog(TestCase):
         self.assertEqual(record['account'], "alice")
         self.assertEqual(record['user'], "bob")
         self.assertEqual(record['action'], Actions.FORM_PUBLISHED)
+
+    def test_query_mongo_keyset(self):
+        account_user = User(username="alice")
+        request_user = User(username="bob")
+        request = RequestFactory().get("/")
+        for i in range(3):
+            audit_log(Actions.FORM_ACCESSED, request_user, account_user,
+                      "Form accessed %s" % i, {}, request)
+
+        records = list(AuditLog.query_mongo_keyset(
+            account_user.username, limit=2))
+        self.assertEqual(len(records), 2)
+        records.extend(AuditLog.query_mongo_keyset(
+            account_user.username, after=str(records[-1]['_id'])))
+        self.assertEqual([record['msg'] for record in records[-3:]],
+                         ["Form accessed %s" % i for i in range(3)])
+        self.assertRaises(ValueError, AuditLog.query_mongo_keyset,
+                          account_user.username, after='not an id')
+        self.assertRaises(ValueError, AuditLog.query_mongo_keyset,
+                          account_user.username, limit=0)
@@ -128,6 +128,10 @@ urlpatterns = patterns(
     url(r"^(?P<username>\w+)/view/downloadSubmission$",
         BriefcaseApi.as_view({'get': 'retrieve', 'head': 'retrieve'}),
         name='view-download-submission'),
+    url(r"^(?P<username>\w+)/view/downloadSubmissions$",
+        BriefcaseApi.as_view({'get': 'download_submissions',
+                              'head': 'download_submissions'}),
+        name='view-download-submissions'),
     url(r"^(?P<username>\w+)/formUpload$",
         BriefcaseApi.as_view({'post': 'create', 'head': 'create'}),
         name='form-upload'),
@@ -148,6 +152,9 @@ urlpatterns = patterns(
     url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.sav.zip",
         'onadata.apps.viewer.views.data_export', name='sav_zip_export',
         kwargs={'export_type': 'sav_zip'}),
+    url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/attachments\.zip$",
+        'onadata.apps.viewer.views.attachments_zip_export',
+        name='attachments_zip_export'),
     url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.kml$",
         'onadata.apps.viewer.views.kml_export'),
     url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/gdocs$",
@@ -213,6 +220,9 @@ urlpatterns = patterns(
     url(r"^(?P<username>\w+)/submission$",
         XFormSubmissionApi.as_view({'post': 'create', 'head': 'create'}),
         name='submissions'),
+    url(r"^(?P<username>\w+)/submission/batch$",
+        XFormSubmissionApi.as_view({'post': 'batch'}),
+        name='submissions-batch'),
     url(r"^(?P<username>\w+)/bulk-submission$",
         'onadata.apps.logger.views.bulksubmission'),
     url(r"^(?P<username>\w+)/bulk-submission-form$",
@@ -60,6 +60,10 @@ from onadata.libs.utils.log import audit_log, Actions
 from onadata.libs.utils.logger_tools import response_with_mimetype_and_name, \
     publish_form
 from onadata.libs.utils.qrcode import generate_qrcode
+from onadata.libs.utils.streaming import (
+    get_stream_format,
+    streaming_json_response,
+)
 from onadata.libs.utils.user_auth import (
     add_cors_headers,
     check_and_set_user,
@@ -564,10 +568,22 @@ def api(request, username=None, id_string=None):
         if 'count' in request.GET:
             args["count"] = True if int(request.GET.get('count')) > 0\
                 else False
+        stream_format = get_stream_format(request.GET)
+        if stream_format and not args.get("count"):
+            args["lazy"] = True
         cursor = ParsedInstance.query_mongo(**args)
     except ValueError as e:
         return HttpResponseBadRequest(e.__str__())
 
+    if args.get("lazy"):
+        response = streaming_json_response(
+            cursor, stream_format, callback=request.GET.get('callback'))
+        content_type = response['Content-Type']
+        add_cors_headers(response)
+        # `add_cors_headers()` forces `application/json`
+        response['Content-Type'] = content_type
+        return response
+
     records = list(record for record in cursor)
     response_text = json_util.dumps(records)
 
@@ -1354,7 +1370,14 @@ def activity_api(request, username):
         if 'count' in request.GET:
             query_args["count"] = True \
                 if int(request.GET.get('count')) > 0 else False
-        cursor = AuditLog.query_mongo(**query_args)
+        if 'after' in request.GET:
+            # Keyset paging, sorted by creation
+            for key in ('sort', 'start', 'count'):
+                query_args.pop(key, None)
+            query_args['after'] = request.GET.get('after')
+            cursor = AuditLog.query_mongo_keyset(**query_args)
+        else:
+            cursor = AuditLog.query_mongo(**query_args)
     except ValueError as e:
         return HttpResponseBadRequest(e.__str__())
 
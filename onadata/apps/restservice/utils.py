@@ -9,8 +9,15 @@ def call_service(parsed_instance):
     # lookup service
     instance = parsed_instance.instance
     rest_services = RestService.objects.filter(xform=instance.xform)
+    # The document is the same for every service. When the submission has
+    # just been saved to Mongo, it has been built already.
+    submission_context = instance.get_submission_context()
+    mongo_document = submission_context.mongo_document \
+        if submission_context is not None else None
     # call service send with url and data parameters
     for rest_service in rest_services:
+        if mongo_document is None:
+            mongo_document = parsed_instance.to_dict_for_mongo()
         # Celery can't pickle ParsedInstance object,
         # let's use build a serializable object instead
         # We don't really need `xform_id`, `xform_id_string`, `instance_uuid`
@@ -21,6 +28,6 @@ def call_service(parsed_instance):
             "instance_uuid": instance.uuid,
             "instance_id": instance.id,
             "xml": parsed_instance.instance.xml,
-            "json": parsed_instance.to_dict_for_mongo()
+            "json": mongo_document
         }
         service_definition_task.delay(rest_service.pk, data)
@@ -0,0 +1,157 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+'''
+Django management command to measure the exporters on a synthetic form and
+synthetic submissions: records and rows per second, peak RSS and output size.
+
+Nothing is read from or written to the database or to MongoDB.
+
+Results can be saved as JSON and compared with the results of another
+commit, e.g.:
+
+:Example:
+    python manage.py benchmark_exports --records 10000 --output before.json
+    python manage.py benchmark_exports --records 10000 --compare before.json
+'''
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from onadata.libs.utils.export_benchmark import (
+    EXPORTER_NAMES,
+    compare_results,
+    run_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure exporters on a synthetic form'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--records',
+            type=int,
+            default=1000,
+            help='Number of submissions to export',
+        )
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=20,
+            help='Number of questions at the root and in each repeat',
+        )
+        parser.add_argument(
+            '--repeat-depth',
+            type=int,
+            default=1,
+            help='Number of nested repeats',
+        )
+        parser.add_argument(
+            '--repeat-count',
+            type=int,
+            default=2,
+            help='Occurrences of each repeat per parent occurrence',
+        )
+        parser.add_argument(
+            '--select-multiples',
+            type=int,
+            default=2,
+            help='Number of select multiples at the root and in each repeat',
+        )
+        parser.add_argument(
+            '--choices',
+            type=int,
+            default=5,
+            help='Number of choices of each select question',
+        )
+        parser.add_argument(
+            '--geopoints',
+            type=int,
+            default=1,
+            help='Number of geopoints at the root and in each repeat',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+        )
+        parser.add_argument(
+            '--exporter',
+            action='append',
+            choices=EXPORTER_NAMES,
+            dest='exporters',
+            help='Exporter to run; may be repeated. All of them by default',
+        )
+        parser.add_argument(
+            '--no-isolate',
+            action='store_false',
+            dest='isolate',
+            help='Run the exporters in this process instead of a new process '
+                 'each. Peak RSS is then the peak of the whole run',
+        )
+        parser.add_argument(
+            '--output',
+            help='Save the results to this JSON file',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Compare the results with this JSON file from a previous run',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (IOError, ValueError) as e:
+                raise CommandError('Cannot read `{}`: {}'.format(
+                    options['compare'], e))
+
+        form_options = {
+            'questions': options['questions'],
+            'repeat_depth': options['repeat_depth'],
+            'repeat_count': options['repeat_count'],
+            'select_multiples': options['select_multiples'],
+            'choices': options['choices'],
+            'geopoints': options['geopoints'],
+            'seed': options['seed'],
+        }
+        results = run_benchmarks(form_options, options['records'],
+                                 options['exporters'], options['isolate'])
+
+        self.stdout.write('{:<18}{:>12}{:>14}{:>14}{:>14}{:>14}'.format(
+            '', 'seconds', 'records/s', 'rows/s', 'peak RSS KB',
+            'output bytes'))
+        for result in results['results']:
+            if 'error' in result:
+                self.stdout.write('{:<18}{}'.format(
+                    result['exporter'], result['error']))
+                continue
+            self.stdout.write(
+                '{:<18}{:>12.2f}{:>14.1f}{:>14.1f}{:>14}{:>14}'.format(
+                    result['exporter'],
+                    result['seconds'],
+                    result['records_per_second'],
+                    result['rows_per_second'],
+                    result['peak_rss_kb'],
+                    result['output_bytes'],
+                ))
+
+        if baseline:
+            if baseline.get('form') != form_options or \
+                    baseline.get('records') != options['records']:
+                self.stderr.write('Warning: `{}` was run with other '
+                                  'parameters'.format(options['compare']))
+            self.stdout.write('\nCompared with {} ({}):'.format(
+                options['compare'], baseline.get('commit') or 'unknown commit'))
+            for exporter, metric, old, new, change in compare_results(
+                    baseline, results):
+                self.stdout.write('{:<18}{:<20}{:>14}{:>14}{:>+10.1%}'.format(
+                    exporter, metric, old, new, change))
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2, sort_keys=True)
+            self.stdout.write('Results saved to {}'.format(options['output']))
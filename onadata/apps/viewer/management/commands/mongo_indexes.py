@@ -0,0 +1,99 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+from collections import OrderedDict
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.main.models.audit import AuditLog
+from onadata.libs.utils.common_tags import USERFORM_ID
+from onadata.libs.utils.mongo_indexes import (
+    INSTANCES_INDEXES,
+    check_query_plans,
+    create_indexes,
+    get_missing_indexes,
+)
+
+
+def format_keys(keys):
+    return '{{{}}}'.format(', '.join(
+        '{}: {}'.format(field, direction) for field, direction in keys))
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Report the missing indexes of the MongoDB "
+                         "collections, build them and check the plans of "
+                         "the standard queries on submissions")
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--create',
+            action='store_true',
+            default=False,
+            help=ugettext_lazy("Build the missing indexes, in the "
+                               "background")),
+        make_option(
+            '--explain',
+            action='store_true',
+            default=False,
+            help=ugettext_lazy("Flag the standard queries on submissions "
+                               "which scan the whole collection")),
+        make_option('-u', '--username',
+                    help=ugettext_lazy("Username of the form user whose "
+                                       "submissions are queried by "
+                                       "--explain")),
+        make_option('-i', '--id_string',
+                    help=ugettext_lazy("id string of the form")))
+
+    def handle(self, *args, **kwargs):
+        # check for username AND id_string - if one exists so must the other
+        if bool(kwargs.get('username')) != bool(kwargs.get('id_string')):
+            raise CommandError("username and id_string must either both be "
+                               "specified or neither")
+
+        collections = OrderedDict([
+            ('instances', (settings.MONGO_DB.instances, INSTANCES_INDEXES)),
+            ('auditlog', (settings.MONGO_DB.auditlog, AuditLog.INDEXES)),
+        ])
+        for name, (collection, indexes) in collections.iteritems():
+            missing_indexes = get_missing_indexes(collection, indexes)
+            if not missing_indexes:
+                self.stdout.write('{}: all indexes exist'.format(name))
+            for keys in missing_indexes:
+                self.stdout.write('{}: missing index {}'.format(
+                    name, format_keys(keys)))
+            if missing_indexes and kwargs['create']:
+                for index_name in create_indexes(collection, missing_indexes):
+                    self.stdout.write('{}: building index {}'.format(
+                        name, index_name))
+
+        if kwargs['explain']:
+            self.explain(settings.MONGO_DB.instances, kwargs.get('username'),
+                         kwargs.get('id_string'))
+
+    def explain(self, collection, username, id_string):
+        if username:
+            userform_id = '{}_{}'.format(username, id_string)
+        else:
+            # Plans only depend on the shape of the queries
+            record = collection.find_one({}, {USERFORM_ID: 1})
+            if record is None or USERFORM_ID not in record:
+                self.stdout.write('No submission to explain the queries '
+                                  'with')
+                return
+            userform_id = record[USERFORM_ID]
+
+        collection_scans = []
+        for description, (stages, collection_scan) in check_query_plans(
+                collection, userform_id).iteritems():
+            self.stdout.write('{}: {}{}'.format(
+                description, ' > '.join(stages),
+                ' (COLLECTION SCAN)' if collection_scan else ''))
+            if collection_scan:
+                collection_scans.append(description)
+        if collection_scans:
+            raise CommandError(
+                "{} queries scan the whole collection: {}. Run with "
+                "--create to build the missing indexes.".format(
+                    len(collection_scans), ', '.join(collection_scans)))
@@ -5,8 +5,9 @@ from django.core.management.base import BaseCommand, CommandError
 from django.utils.translation import ugettext_lazy
 from optparse import make_option
 
-from onadata.apps.viewer.models.parsed_instance import ParsedInstance
-from onadata.libs.utils.common_tags import USERFORM_ID
+from onadata.apps.logger.models import XForm
+from onadata.libs.utils.mongo_indexes import INSTANCES_INDEXES, create_indexes
+from onadata.libs.utils.remongo import DEFAULT_REMONGO_RANGE_SIZE, MongoRebuild
 
 
 class Command(BaseCommand):
@@ -17,45 +18,62 @@ class Command(BaseCommand):
             type='int',
             default=100,
             help=ugettext_lazy("Number of records to process per query")),
+        make_option(
+            '--processes',
+            type='int',
+            default=1,
+            help=ugettext_lazy("Number of processes to rebuild with")),
+        make_option(
+            '--range-size',
+            type='int',
+            dest='range_size',
+            default=DEFAULT_REMONGO_RANGE_SIZE,
+            help=ugettext_lazy("Number of records per unit of work")),
+        make_option(
+            '--resume',
+            dest='run_id',
+            help=ugettext_lazy("Id of an interrupted run to resume")),
+        make_option(
+            '--async',
+            action='store_true',
+            dest='asynchronous',
+            default=False,
+            help=ugettext_lazy("Queue the units of work as a Celery chord "
+                               "instead of processing them here")),
         make_option('-u', '--username',
                     help=ugettext_lazy("Username of the form user")),
         make_option('-i', '--id_string',
                     help=ugettext_lazy("id string of the form")))
 
     def handle(self, *args, **kwargs):
-        ids = None
         # check for username AND id_string - if one exists so must the other
         if (kwargs.get('username') and not kwargs.get('id_string')) or (
                 not kwargs.get('username') and kwargs.get('id_string')):
             raise CommandError("username and id_string must either both be "
                                "specified or neither")
         elif kwargs.get('username') and kwargs.get('id_string'):
-            from onadata.apps.logger.models import XForm, Instance
             xform = XForm.objects.get(user__username=kwargs.get('username'),
                                       id_string=kwargs.get('id_string'))
-            ids = [i.pk for i in Instance.objects.filter(xform=xform)]
-        # num records per run
-        batchsize = kwargs['batchsize']
-        start = 0
-        end = start + batchsize
-        filter_queryset = ParsedInstance.objects.all()
-        # instance ids for when we have a username and id_string
-        if ids:
-            filter_queryset = ParsedInstance.objects.filter(instance__in=ids)
-        # total number of records
-        record_count = filter_queryset.count()
-        i = 0
-        while start < record_count:
-            print('Querying record %s to %s' % (start, end-1))
-            queryset = filter_queryset.order_by('pk')[start:end]
-            for pi in queryset.iterator():
-                if pi.update_mongo(asynchronous=False):
-                    i += 1
-                else:
-                    print("\033[91m[ERROR] Could not parse instance {}\033[0m".format(pi.instance.uuid))
+            xform_ids = [xform.pk]
+        else:
+            xform_ids = list(XForm.objects.order_by('pk').values_list(
+                'pk', flat=True))
 
-            start = start + batchsize
-            end = min(record_count, start + batchsize)
+        rebuild = MongoRebuild(
+            xform_ids,
+            run_id=kwargs.get('run_id'),
+            processes=kwargs.get('processes', 1),
+            range_size=kwargs.get('range_size', DEFAULT_REMONGO_RANGE_SIZE),
+            batch_size=kwargs['batchsize'],
+            stdout=self.stdout,
+        )
+        print('Run id: {} (pass `--resume {}` to resume it if it is '
+              'interrupted)'.format(rebuild.run_id, rebuild.run_id))
+        if kwargs.get('asynchronous', False):
+            rebuild.run_async()
+        else:
+            rebuild.run()
         # add indexes after writing so the writing operation above is not
         # slowed
-        settings.MONGO_DB.instances.create_index(USERFORM_ID)
+        create_indexes(settings.MONGO_DB.instances, INSTANCES_INDEXES,
+                       background=False)
@@ -27,7 +27,10 @@ class Command(BaseCommand):
                 "Update all instances for the selected "
                 "form(s), including existing ones. "
                 "Will delete and re-create mongo records. "
-                "Only makes sense when used with the -r option")))
+                "Only makes sense when used with the -r option")),
+        make_option(
+            '--processes', type='int', dest='processes', default=1,
+            help=ugettext_lazy("Number of processes to run remongo with")))
 
     def handle(self, *args, **kwargs):
         user = xform = None
@@ -48,5 +51,6 @@ class Command(BaseCommand):
         remongo = kwargs["remongo"]
         update_all = kwargs["update_all"]
 
-        report_string = mongo_sync_status(remongo, update_all, user, xform)
+        report_string = mongo_sync_status(remongo, update_all, user, xform,
+                                          kwargs.get('processes', 1))
         self.stdout.write(report_string)
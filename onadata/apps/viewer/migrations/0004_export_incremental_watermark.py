@@ -0,0 +1,30 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from django.db import migrations, models
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0003_auto_20171123_1521'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='last_exported_id',
+            field=models.IntegerField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='exported_on',
+            field=models.DateTimeField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='export_options',
+            field=jsonfield.fields.JSONField(default=None, null=True),
+        ),
+    ]
@@ -20,6 +20,7 @@ from onadata.libs.utils.common_tags import UUID, SUBMISSION_TIME, TAGS, NOTES
 from onadata.libs.utils.export_tools import question_types_to_exclude,\
     DictOrganizer
 from onadata.libs.utils.model_tools import queryset_iterator, set_uuid
+from onadata.libs.utils.schema_cache import form_schema_cache
 
 
 class ColumnRename(models.Model):
@@ -163,6 +164,7 @@ class DataDictionary(XForm):
             set_uuid(self)
             self.set_uuid_in_xml(id_string=survey.id_string)
         super(DataDictionary, self).save(*args, **kwargs)
+        form_schema_cache.invalidate(self.pk)
 
     def file_name(self):
         return os.path.split(self.xls.name)[-1]
@@ -180,6 +182,40 @@ class DataDictionary(XForm):
 
     survey = property(get_survey)
 
+    def compile_schema(self):
+        """
+        Build the survey and the lookups used on every submission in a single
+        walk over its elements. Instances served by `form_schema_cache` are
+        compiled once and then shared.
+        """
+        if hasattr(self, '_types_by_xpath'):
+            return
+
+        survey_elements = {}
+        repeat_xpaths = []
+        geopoint_xpaths = []
+        select_multiple_choices = {}
+        types_by_xpath = {}
+
+        for e in self.get_survey_elements():
+            xpath = e.get_abbreviated_xpath()
+            survey_elements[xpath] = e
+            types_by_xpath[xpath] = e.type
+            if e.type == 'repeat':
+                repeat_xpaths.append(xpath)
+            bind_type = e.bind.get('type')
+            if bind_type == 'geopoint':
+                geopoint_xpaths.append(xpath)
+            elif bind_type == 'select':
+                select_multiple_choices[xpath] = [
+                    child.name for child in e.children]
+
+        self._survey_elements = survey_elements
+        self._repeat_xpaths = repeat_xpaths
+        self._geopoint_xpaths = geopoint_xpaths
+        self._select_multiple_choices = select_multiple_choices
+        self._types_by_xpath = types_by_xpath
+
     def get_survey_elements(self):
         return self.survey.iter_descendants()
 
@@ -219,13 +255,24 @@ class DataDictionary(XForm):
     survey_elements = property(get_survey_elements)
 
     def geopoint_xpaths(self):
-        geo_xpaths = []
+        self.compile_schema()
+        return list(self._geopoint_xpaths)
 
-        for e in self.get_survey_elements():
-            if e.bind.get('type') == 'geopoint':
-                geo_xpaths.append(e.get_abbreviated_xpath())
+    def repeat_xpaths(self):
+        self.compile_schema()
+        return list(self._repeat_xpaths)
+
+    def select_multiple_choices(self):
+        """
+        Return a dictionary of select multiple xpaths with the names of their
+        choices e.g. {"group/fruits": ["apple", "orange"]}
+        """
+        self.compile_schema()
+        return self._select_multiple_choices
 
-        return geo_xpaths
+    def get_type(self, abbreviated_xpath):
+        self.compile_schema()
+        return self._types_by_xpath.get(abbreviated_xpath)
 
     def xpath_of_first_geopoint(self):
         geo_xpaths = self.geopoint_xpaths()
@@ -314,10 +361,7 @@ class DataDictionary(XForm):
         return [remove_first_index(header) for header in self.get_headers()]
 
     def get_element(self, abbreviated_xpath):
-        if not hasattr(self, "_survey_elements"):
-            self._survey_elements = {}
-            for e in self.get_survey_elements():
-                self._survey_elements[e.get_abbreviated_xpath()] = e
+        self.compile_schema()
 
         def remove_all_indices(xpath):
             return re.sub(r"\[\d+\]", "", xpath)
@@ -7,6 +7,7 @@ from django.core.files.storage import get_storage_class
 from django.db import models
 from django.db.models.signals import post_delete
 from django.utils.translation import ugettext as _
+from jsonfield import JSONField
 
 from onadata.apps.logger.models import XForm
 
@@ -34,6 +35,7 @@ class Export(models.Model):
     CSV_ZIP_EXPORT = 'csv_zip'
     SAV_ZIP_EXPORT = 'sav_zip'
     SAV_EXPORT = 'sav'
+    PARQUET_EXPORT = 'parquet'
 
     EXPORT_MIMES = {
         'xls': 'vnd.ms-excel',
@@ -43,6 +45,7 @@ class Export(models.Model):
         'csv_zip': 'zip',
         'sav_zip': 'zip',
         'sav': 'sav',
+        'parquet': 'zip',
         'kml': 'vnd.google-earth.kml+xml'
     }
 
@@ -54,7 +57,8 @@ class Export(models.Model):
         (KML_EXPORT, 'kml'),
         (CSV_ZIP_EXPORT, 'CSV ZIP'),
         (SAV_ZIP_EXPORT, 'SAV ZIP'),
-        (SAV_EXPORT, 'SAV')
+        (SAV_EXPORT, 'SAV'),
+        (PARQUET_EXPORT, 'Parquet ZIP')
     ]
 
     EXPORT_TYPE_DICT = dict(export_type for export_type in EXPORT_TYPES)
@@ -82,6 +86,11 @@ class Export(models.Model):
     # status
     internal_status = models.SmallIntegerField(default=PENDING)
     export_url = models.URLField(null=True, default=None)
+    # watermark of incremental exports: highest `_id` in the file, when the
+    # submissions were read and with which options
+    last_exported_id = models.IntegerField(null=True, default=None)
+    exported_on = models.DateTimeField(null=True, default=None)
+    export_options = JSONField(null=True, default=None)
 
     class Meta:
         app_label = "viewer"
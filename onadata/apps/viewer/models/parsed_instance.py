@@ -14,6 +14,7 @@ from django.utils.translation import ugettext as _
 
 from onadata.apps.logger.models import Instance
 from onadata.apps.logger.models import Note
+from onadata.apps.logger.xform_instance_parser import InstanceEmptyError
 from onadata.apps.restservice.utils import call_service
 from onadata.libs.utils.common_tags import (
     ID,
@@ -30,6 +31,7 @@ from onadata.libs.utils.common_tags import (
 )
 from onadata.libs.utils.decorators import apply_form_field_names
 from onadata.libs.utils.model_tools import queryset_iterator
+from onadata.libs.utils.mongo_writer import BulkMongoWriter
 from onadata.apps.api.mongo_helper import MongoHelper
 
 
@@ -68,6 +70,19 @@ def update_mongo_instance(record):
     return False
 
 
+@task
+def update_mongo_instances(instance_ids):
+    """
+    Writes the submissions matching `instance_ids` to Mongo in bulk, one
+    chunk of `MONGO_BULK_WRITE_BATCH_SIZE` ids at a time.
+    """
+    with BulkMongoWriter() as writer:
+        for start in range(0, len(instance_ids), writer.batch_size):
+            ParsedInstance.bulk_update_mongo(
+                instance_ids[start:start + writer.batch_size], writer)
+    return writer.written
+
+
 class ParsedInstance(models.Model):
     USERFORM_ID = '_userform_id'
     STATUS = '_status'
@@ -164,6 +179,33 @@ class ParsedInstance(models.Model):
 
         return cls._get_paginated_and_sorted_cursor(cursor, start, limit, sort)
 
+    @classmethod
+    @apply_form_field_names
+    def query_mongo_keyset(cls, query, fields, after=None,
+                           limit=DEFAULT_LIMIT, hide_deleted=True):
+        """
+        Returns up to `limit` records whose `_id` is greater than `after`,
+        sorted by `_id`.
+
+        Unlike `skip()`, every page is a range scan on the
+        `(_userform_id, _id)` index, which costs the same however far into
+        the data it starts.
+        """
+        if isinstance(query, basestring):
+            query = json.loads(query, object_hook=json_util.object_hook)
+        query = query if query else {}
+        if after is not None:
+            query = {"$and": [query, {ID: {"$gt": after}}]}
+
+        # `limit(0)` would return every remaining record
+        if limit <= 0:
+            raise ValueError(_("Invalid limit param"))
+        limit = min(limit, cls.DEFAULT_LIMIT)
+
+        cursor = cls._get_mongo_cursor(query, fields, hide_deleted)
+        return cursor.sort(ID, 1).limit(limit).batch_size(
+            cls.DEFAULT_BATCHSIZE)
+
     @classmethod
     @apply_form_field_names
     def query_mongo_no_paging(cls, query, fields, count=False, hide_deleted=True):
@@ -240,7 +282,7 @@ class ParsedInstance(models.Model):
             cursor.sort(sort_key, sort_dir)
 
         # set batch size
-        cursor.batch_size = cls.DEFAULT_BATCHSIZE
+        cursor.batch_size(cls.DEFAULT_BATCHSIZE)
         return cursor
 
     def to_dict_for_mongo(self):
@@ -256,7 +298,8 @@ class ParsedInstance(models.Model):
             GEOLOCATION: [self.lat, self.lng],
             SUBMISSION_TIME: self.instance.date_created.strftime(
                 MONGO_STRFTIME),
-            TAGS: list(self.instance.tags.names()),
+            # Not `names()`, which would ignore prefetched tags
+            TAGS: [tag.name for tag in self.instance.tags.all()],
             NOTES: self.get_notes(),
             VALIDATION_STATUS: self.instance.get_validation_status(),
             SUBMITTED_BY: self.instance.user.username
@@ -272,6 +315,10 @@ class ParsedInstance(models.Model):
 
     def update_mongo(self, asynchronous=True):
         d = self.to_dict_for_mongo()
+        submission_context = self.instance.get_submission_context()
+        if submission_context is not None:
+            # Let `call_service()` reuse the document
+            submission_context.mongo_document = d
         if d.get("_xform_id_string") is None:
             # if _xform_id_string, Instance could not be parsed.
             # so, we don't update mongo.
@@ -291,6 +338,73 @@ class ParsedInstance(models.Model):
 
         return True
 
+    @classmethod
+    def bulk_update_mongo(cls, instance_ids, writer, call_services=True):
+        """
+        Adds the Mongo documents of the submissions matching `instance_ids`
+        to `writer` (a `BulkMongoWriter`).
+
+        Submissions without a `ParsedInstance` yet get one, and their rest
+        services are called unless `call_services` is `False`, e.g. when
+        rebuilding MongoDB, which must not send old submissions again.
+
+        Like `save()`, it also refreshes `lat` and `lng` from the geometry
+        of the submissions, updating only the rows where they changed.
+
+        Returns the ids of the submissions which were skipped because they
+        could not be parsed.
+        """
+        skipped_ids = []
+        queryset = cls.objects.filter(instance_id__in=instance_ids)\
+            .select_related('instance__xform__user', 'instance__user')\
+            .prefetch_related('instance__attachments', 'instance__tags',
+                              'instance__notes')
+        found_ids = set()
+        for parsed_instance in queryset:
+            found_ids.add(parsed_instance.instance_id)
+            geopoint = (parsed_instance.lat, parsed_instance.lng)
+            parsed_instance._set_geopoint()
+            if (parsed_instance.lat, parsed_instance.lng) != geopoint:
+                cls.objects.filter(pk=parsed_instance.pk).update(
+                    lat=parsed_instance.lat, lng=parsed_instance.lng)
+            try:
+                record = parsed_instance.to_dict_for_mongo()
+            except InstanceEmptyError:
+                record = {}
+            if record.get("_xform_id_string") is None:
+                skipped_ids.append(parsed_instance.instance_id)
+            else:
+                writer.add(record)
+
+        # Rest services are called once the documents are in MongoDB, as
+        # `save()` does. The documents of new `ParsedInstance`s go through
+        # `writer` as well, so that nothing is written with another MongoDB
+        # connection than its collection's.
+        missing_ids = set(instance_ids) - found_ids
+        created = []
+        for instance in Instance.objects.filter(pk__in=missing_ids):
+            parsed_instance = cls(instance=instance)
+            parsed_instance._set_geopoint()
+            try:
+                record = parsed_instance.to_dict_for_mongo()
+            except InstanceEmptyError:
+                record = {}
+            super(ParsedInstance, parsed_instance).save()
+            if record.get("_xform_id_string") is None:
+                skipped_ids.append(instance.pk)
+            else:
+                writer.add(record)
+                created.append(parsed_instance)
+
+        if created and call_services:
+            writer.flush()
+            failed_ids = set(writer.failed_ids)
+            for parsed_instance in created:
+                if parsed_instance.instance_id not in failed_ids:
+                    call_service(parsed_instance)
+
+        return skipped_ids
+
     @staticmethod
     def bulk_update_validation_statuses(query, validation_status):
         return xform_instances.update(
@@ -329,13 +443,7 @@ class ParsedInstance(models.Model):
                 return item['name']
 
     def get_data_dictionary(self):
-        # TODO: fix hack to get around a circular import
-        from onadata.apps.viewer.models.data_dictionary import\
-            DataDictionary
-        return DataDictionary.objects.get(
-            user=self.instance.xform.user,
-            id_string=self.instance.xform.id_string
-        )
+        return self.instance.xform.data_dictionary()
 
     data_dictionary = property(get_data_dictionary)
 
@@ -372,16 +480,14 @@ class ParsedInstance(models.Model):
         note.delete()
 
     def get_notes(self):
-        notes = []
-        note_qs = self.instance.notes.values(
-            'id', 'note', 'date_created', 'date_modified')
-        for note in note_qs:
-            note['date_created'] = \
-                note['date_created'].strftime(MONGO_STRFTIME)
-            note['date_modified'] = \
-                note['date_modified'].strftime(MONGO_STRFTIME)
-            notes.append(note)
-        return notes
+        # `all()` rather than `values()`, which would ignore notes fetched
+        # with `prefetch_related()`
+        return [{
+            'id': note.id,
+            'note': note.note,
+            'date_created': note.date_created.strftime(MONGO_STRFTIME),
+            'date_modified': note.date_modified.strftime(MONGO_STRFTIME),
+        } for note in self.instance.notes.all()]
 
 
 def _get_attachments_from_instance(instance):
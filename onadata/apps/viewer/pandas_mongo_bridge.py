@@ -1,9 +1,13 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division, absolute_import
 from collections import OrderedDict
+import csv
 from itertools import chain
+import json
 import time
 
+from bson import json_util
+
 from django.conf import settings
 from pandas.core.frame import DataFrame
 
@@ -49,6 +53,46 @@ GROUP_DELIMITER_DOT = '.'
 DEFAULT_GROUP_DELIMITER = GROUP_DELIMITER_SLASH
 GROUP_DELIMITERS = [GROUP_DELIMITER_SLASH, GROUP_DELIMITER_DOT]
 
+# pandas' `display.pprint_nest_depth` and `display.max_seq_items` defaults
+PPRINT_NEST_DEPTH = 3
+PPRINT_MAX_ITEMS = 100
+
+
+def _pprint_value(value, quote_strings=False, nest_level=0):
+    """
+    Formats dicts and lists the way pandas printed them in CSV exports
+    """
+    if isinstance(value, dict) and nest_level < PPRINT_NEST_DEPTH:
+        items = [
+            '{}: {}'.format(_pprint_value(k, True, nest_level + 1),
+                            _pprint_value(v, True, nest_level + 1))
+            for k, v in value.items()[:PPRINT_MAX_ITEMS]]
+        if len(value) > PPRINT_MAX_ITEMS:
+            items.append('...')
+        return '{{{}}}'.format(', '.join(items))
+    if isinstance(value, list) and nest_level < PPRINT_NEST_DEPTH:
+        items = [_pprint_value(item, quote_strings, nest_level + 1)
+                 for item in value[:PPRINT_MAX_ITEMS]]
+        if len(value) > PPRINT_MAX_ITEMS:
+            items.append('...')
+        return '[{}]'.format(', '.join(items))
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    if quote_strings and isinstance(value, basestring):
+        return "u'{}'".format(value)
+    return unicode(value)
+
+
+def format_csv_value(value, na_rep=NA_REP):
+    """
+    Returns `value` as written in a CSV export, encoded in UTF-8
+    """
+    if value is None:
+        return na_rep.encode('utf-8')
+    if isinstance(value, bytes):
+        return value
+    return _pprint_value(value).encode('utf-8')
+
 
 def get_valid_sheet_name(sheet_name, existing_name_list):
     # truncate sheet_name to XLSDataFrameBuilder.SHEET_NAME_MAX_CHARS
@@ -589,8 +633,7 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
                     # generated when we reindex
                 ordered_columns[child.get_abbreviated_xpath()] = None
 
-    def _format_for_dataframe(self, cursor):
-        # TODO: check for and handle empty results
+    def _add_select_multiple_and_gps_columns(self):
         # add ordered columns for select multiples
         if self.split_select_multiples:
             for key, choices in self.select_multiples.items():
@@ -601,52 +644,72 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
         for key in self.gps_fields:
             gps_xpaths = self.dd.get_additional_geopoint_xpaths(key)
             self.ordered_columns[key] = [key] + gps_xpaths
-        data = []
-        for record in cursor:
-            # split select multiples
-            if self.split_select_multiples:
-                record = self._split_select_multiples(
-                    record, self.select_multiples,
-                    self.BINARY_SELECT_MULTIPLES)
-            # check for gps and split into components i.e. latitude, longitude,
-            # altitude, precision
-            self._split_gps_fields(record, self.gps_fields)
-            self._tag_edit_string(record)
-            flat_dict = {}
-            # re index repeats
-            for key, value in record.iteritems():
-                reindexed = self._reindex(key, value, self.ordered_columns)
-                flat_dict.update(reindexed)
-
-            # if delimetr is diferent, replace within record as well
-            if self.group_delimiter != DEFAULT_GROUP_DELIMITER:
-                flat_dict = dict((self.group_delimiter.join(k.split('/')), v)
-                                 for k, v in flat_dict.iteritems())
-            data.append(flat_dict)
-        return data
 
-    def export_to(self, file_or_path, data_frame_max_size=30000):
-        from math import ceil
-        # get record count
-        record_count = self._query_mongo(query=self.filter_query, count=True)
+    def _format_record(self, record):
+        """
+        Flattens `record` into a row, adding the columns of the repeats it
+        answers to `ordered_columns`
+        """
+        # split select multiples
+        if self.split_select_multiples:
+            record = self._split_select_multiples(
+                record, self.select_multiples,
+                self.BINARY_SELECT_MULTIPLES)
+        # check for gps and split into components i.e. latitude, longitude,
+        # altitude, precision
+        self._split_gps_fields(record, self.gps_fields)
+        self._tag_edit_string(record)
+        flat_dict = {}
+        # re index repeats
+        for key, value in record.iteritems():
+            reindexed = self._reindex(key, value, self.ordered_columns)
+            flat_dict.update(reindexed)
 
-        self.ordered_columns = OrderedDict()
-        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
+        # if delimetr is diferent, replace within record as well
+        if self.group_delimiter != DEFAULT_GROUP_DELIMITER:
+            flat_dict = dict((self.group_delimiter.join(k.split('/')), v)
+                             for k, v in flat_dict.iteritems())
+        return flat_dict
 
-        # pandas will only export 30k records in a dataframe to a csv
-        # - we need to create multiple 30k dataframes if required,
-        # we need to go through all the records though so that
-        # we can figure out the columns we need for repeats
-        datas = []
-        num_data_frames = \
-            int(ceil(float(record_count) / float(data_frame_max_size)))
-        for i in range(num_data_frames):
-            cursor = self._query_mongo(
-                self.filter_query, start=(i * data_frame_max_size),
-                limit=data_frame_max_size)
-            data = self._format_for_dataframe(cursor)
-            datas.append(data)
+    def _format_for_dataframe(self, cursor):
+        # TODO: check for and handle empty results
+        self._add_select_multiple_and_gps_columns()
+        return [self._format_record(record) for record in cursor]
+
+    def _get_query(self, last_id=None):
+        """
+        Returns `filter_query`, restricted to the submissions up to
+        `last_id` if it is not `None`
+        """
+        if last_id is None:
+            return self.filter_query
+        query = self.filter_query
+        if isinstance(query, basestring):
+            query = json.loads(query, object_hook=json_util.object_hook)
+        return {"$and": [query or {}, {ID: {"$lte": last_id}}]}
+
+    def _iter_records(self, fields='[]', last_id=None):
+        """
+        Returns the submissions matching `filter_query`, up to `last_id` if
+        it is not `None`, fetched in batches as they are iterated
+        """
+        return ParsedInstance.query_mongo(
+            username=self.username, id_string=self.id_string,
+            query=self._get_query(last_id), fields=fields, sort='{}',
+            limit=0, lazy=True)
 
+    def _get_last_id(self):
+        """
+        Returns the highest `_id` of the submissions matching `filter_query`
+        """
+        for record in ParsedInstance.query_mongo(
+                username=self.username, id_string=self.id_string,
+                query=self.filter_query, fields=json.dumps([ID]),
+                sort=json.dumps({ID: -1}), limit=1, lazy=True):
+            return record[ID]
+        return None
+
+    def _get_columns(self):
         columns = list(chain.from_iterable(
             [[xpath] if cols is None else cols
              for xpath, cols in self.ordered_columns.iteritems()]))
@@ -659,7 +722,42 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
         # add extra columns
         columns += [col for col in self.ADDITIONAL_COLUMNS]
 
-        header = True
+        # remove columns we don't want
+        return [col for col in columns if col not in self.IGNORED_COLUMNS]
+
+    def export_to(self, file_or_path, data_frame_max_size=None):
+        """
+        Writes the CSV export in two passes over the submissions. The first
+        one only reads the repeats, to find how many columns each needs; the
+        second one formats and writes the rows one by one. Nothing is kept in
+        memory but the columns.
+
+        `data_frame_max_size` is not used anymore; it used to be the number
+        of rows per pandas `DataFrame`.
+        """
+        # raises `NoRecordsFoundError` if there are none
+        self._query_mongo(query=self.filter_query, count=True)
+
+        self.ordered_columns = OrderedDict()
+        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
+        self._add_select_multiple_and_gps_columns()
+
+        # Both passes read the submissions up to the last one the first
+        # pass sees: the repeats of a submission received in between could
+        # need columns the first pass did not find
+        repeats = [xpath for xpath, cols in self.ordered_columns.iteritems()
+                   if cols == []]
+        if repeats:
+            last_id = None
+            # Nested repeats are within their top level repeat; projecting
+            # on them as well does no harm
+            for record in self._iter_records(json.dumps(repeats + [ID])):
+                last_id = max(last_id, record.get(ID))
+                self._format_record(record)
+        else:
+            last_id = self._get_last_id()
+        columns = self._get_columns()
+
         if hasattr(file_or_path, 'read'):
             csv_file = file_or_path
             close = False
@@ -667,10 +765,15 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
             csv_file = open(file_or_path, "wb")
             close = True
 
-        for data in datas:
-            writer = CSVDataFrameWriter(data, columns)
-            writer.write_to_csv(csv_file, header=header)
-            header = False
+        na_rep = getattr(settings, 'NA_REP', NA_REP)
+        # Same output as pandas' `DataFrame.to_csv()` used to write
+        csv_writer = csv.writer(csv_file, lineterminator=str('\n'))
+        csv_writer.writerow([column.encode('utf-8') for column in columns])
+        for record in self._iter_records(last_id=last_id):
+            get = self._format_record(record).get
+            csv_writer.writerow(
+                [format_csv_value(get(column), na_rep) for column in columns])
+
         if close:
             csv_file.close()
 
@@ -4,7 +4,7 @@ import logging
 import pytz
 import re
 import sys
-from celery import task, shared_task
+from celery import chord, task, shared_task
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.core.mail import mail_admins
@@ -17,7 +17,23 @@ from onadata.libs.utils.export_tools import (
     generate_attachments_zip_export,
     generate_kml_export
 )
+from onadata.libs.utils.incremental_export import (
+    generate_incremental_export,
+    is_incremental_export,
+)
 from onadata.libs.utils.logger_tools import mongo_sync_status, report_exception
+from onadata.libs.utils.remongo import (
+    RemongoCheckpoints,
+    RemongoRange,
+    rebuild_range,
+)
+from onadata.libs.utils.sharded_export import (
+    delete_export_parts,
+    get_export_shard_count,
+    merge_export_shards,
+    render_export_shard,
+    split_export_into_shards,
+)
 
 
 def create_async_export(xform, export_type, query, force_xlsx, options=None):
@@ -38,7 +54,7 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
     }
     if export_type in [Export.XLS_EXPORT, Export.GDOC_EXPORT,
                        Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT,
-                       Export.SAV_ZIP_EXPORT]:
+                       Export.SAV_ZIP_EXPORT, Export.PARQUET_EXPORT]:
         if options and "group_delimiter" in options:
             arguments["group_delimiter"] = options["group_delimiter"]
         if options and "split_select_multiples" in options:
@@ -48,8 +64,16 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
             arguments["binary_select_multiples"] =\
                 options["binary_select_multiples"]
 
+        # Incremental exports only export the new submissions
+        shards = 1 if is_incremental_export(export_type, query) \
+            else get_export_shard_count(xform, export_type)
+
         # start async export
-        if export_type in [Export.XLS_EXPORT, Export.GDOC_EXPORT]:
+        if shards > 1:
+            arguments.update({'export_type': export_type, 'shards': shards})
+            result = create_sharded_export.apply_async(
+                (), arguments, countdown=10)
+        elif export_type in [Export.XLS_EXPORT, Export.GDOC_EXPORT]:
             result = create_xls_export.apply_async((), arguments, countdown=10)
         elif export_type == Export.CSV_EXPORT:
             result = create_csv_export.apply_async(
@@ -60,6 +84,9 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
         elif export_type == Export.SAV_ZIP_EXPORT:
             result = create_sav_zip_export.apply_async(
                 (), arguments, countdown=10)
+        elif export_type == Export.PARQUET_EXPORT:
+            result = create_parquet_export.apply_async(
+                (), arguments, countdown=10)
         else:
             raise Export.ExportTypeError
     elif export_type == Export.ZIP_EXPORT:
@@ -134,9 +161,16 @@ def create_csv_export(username, id_string, export_id, query=None,
     try:
         # though export is not available when for has 0 submissions, we
         # catch this since it potentially stops celery
-        gen_export = generate_export(
-            Export.CSV_EXPORT, 'csv', username, id_string, export_id, query,
-            group_delimiter, split_select_multiples, binary_select_multiples)
+        if is_incremental_export(Export.CSV_EXPORT, query):
+            gen_export = generate_incremental_export(
+                Export.CSV_EXPORT, username, id_string, export_id,
+                group_delimiter, split_select_multiples,
+                binary_select_multiples)
+        else:
+            gen_export = generate_export(
+                Export.CSV_EXPORT, 'csv', username, id_string, export_id,
+                query, group_delimiter, split_select_multiples,
+                binary_select_multiples)
     except NoRecordsFoundError:
         # not much we can do but we don't want to report this as the user
         # should not even be on this page if the survey has no records
@@ -222,10 +256,16 @@ def create_csv_zip_export(username, id_string, export_id, query=None,
     try:
         # though export is not available when for has 0 submissions, we
         # catch this since it potentially stops celery
-        gen_export = generate_export(
-            Export.CSV_ZIP_EXPORT, 'zip', username, id_string, export_id,
-            query, group_delimiter, split_select_multiples,
-            binary_select_multiples)
+        if is_incremental_export(Export.CSV_ZIP_EXPORT, query):
+            gen_export = generate_incremental_export(
+                Export.CSV_ZIP_EXPORT, username, id_string, export_id,
+                group_delimiter, split_select_multiples,
+                binary_select_multiples)
+        else:
+            gen_export = generate_export(
+                Export.CSV_ZIP_EXPORT, 'zip', username, id_string, export_id,
+                query, group_delimiter, split_select_multiples,
+                binary_select_multiples)
     except (Exception, NoRecordsFoundError) as e:
         export.internal_status = Export.FAILED
         export.save()
@@ -273,6 +313,101 @@ def create_sav_zip_export(username, id_string, export_id, query=None,
         return gen_export.id
 
 
+@task()
+def create_parquet_export(username, id_string, export_id, query=None,
+                          group_delimiter='/', split_select_multiples=True,
+                          binary_select_multiples=False):
+    export = Export.objects.get(id=export_id)
+    try:
+        # though export is not available when for has 0 submissions, we
+        # catch this since it potentially stops celery
+        gen_export = generate_export(
+            Export.PARQUET_EXPORT, 'zip', username, id_string, export_id,
+            query, group_delimiter, split_select_multiples,
+            binary_select_multiples
+        )
+    except (Exception, NoRecordsFoundError) as e:
+        export.internal_status = Export.FAILED
+        export.save()
+        # mail admins
+        details = {
+            'export_id': export_id,
+            'username': username,
+            'id_string': id_string
+        }
+        report_exception("Parquet Export Exception: Export ID - "
+                         "%(export_id)s, /%(username)s/%(id_string)s"
+                         % details, e, sys.exc_info())
+        raise
+    else:
+        return gen_export.id
+
+
+@task()
+def create_sharded_export(username, id_string, export_id, export_type,
+                          shards, query=None, group_delimiter='/',
+                          split_select_multiples=True,
+                          binary_select_multiples=False):
+    """
+    Renders each shard of the export in its own task, then merges them in
+    `finish_sharded_export`
+    """
+    try:
+        export = Export.objects.get(id=export_id)
+    except Export.DoesNotExist:
+        return None
+
+    options = {
+        'group_delimiter': group_delimiter,
+        'split_select_multiples': split_select_multiples,
+        'binary_select_multiples': binary_select_multiples,
+    }
+    header = [
+        create_export_shard.s(username, id_string, export_id, shard,
+                              after_id, last_id, query, options)
+        for shard, (after_id, last_id) in enumerate(
+            split_export_into_shards(export.xform, shards))
+    ]
+    callback = finish_sharded_export.s(
+        export_type, username, id_string, export_id, query, options
+    ).on_error(mark_sharded_export_failed.si(username, id_string, export_id))
+    chord(header)(callback)
+    return export_id
+
+
+@shared_task(acks_late=True)
+def create_export_shard(username, id_string, export_id, shard, after_id,
+                        last_id, query=None, options=None):
+    return render_export_shard(username, id_string, export_id, shard,
+                               after_id, last_id, query, options)
+
+
+@shared_task
+def finish_sharded_export(parts, export_type, username, id_string,
+                          export_id, query=None, options=None):
+    try:
+        gen_export = merge_export_shards(parts, export_type, username,
+                                         id_string, export_id, query, options)
+    except Exception as e:
+        details = {
+            'export_id': export_id,
+            'username': username,
+            'id_string': id_string
+        }
+        report_exception("Sharded Export Exception: Export ID - "
+                         "%(export_id)s, /%(username)s/%(id_string)s"
+                         % details, e, sys.exc_info())
+        raise
+    else:
+        return gen_export.id
+
+
+@shared_task
+def mark_sharded_export_failed(username, id_string, export_id):
+    Export.objects.filter(id=export_id).update(internal_status=Export.FAILED)
+    delete_export_parts(username, id_string, export_id)
+
+
 @task()
 def delete_export(export_id):
     try:
@@ -324,6 +459,26 @@ def email_mongo_sync_status():
                              SYNC_MONGO_MANUAL_INSTRUCTIONS]))
 
 
+@shared_task(acks_late=True)
+def rebuild_mongo_range(run_id, remongo_range, only_missing=False,
+                        batch_size=None):
+    """
+    Rebuilds one range of a `MongoRebuild` run. If the task is run again
+    (e.g. after its worker was lost), it resumes from the range's last
+    checkpoint.
+    """
+    return rebuild_range(run_id, RemongoRange(*remongo_range),
+                         only_missing=only_missing, batch_size=batch_size)
+
+
+@shared_task
+def finish_mongo_rebuild(results, run_id):
+    RemongoCheckpoints().delete_if_done(run_id)
+    logging.info('Mongo rebuild {} done: {} submissions processed'.format(
+        run_id, sum(results)))
+    return sum(results)
+
+
 @shared_task(soft_time_limit=60, time_limit=90)
 def log_stuck_exports_and_mark_failed():
     # How long can an export possibly run, not including time spent waiting in
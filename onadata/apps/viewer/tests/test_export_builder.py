@@ -1,6 +1,7 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division, absolute_import
 import csv
+from copy import deepcopy
 import datetime
 import os
 import shutil
@@ -9,8 +10,10 @@ import unittest
 import zipfile
 
 from django.conf import settings
+from django.core.files.storage import get_storage_class
 from django.core.files.temp import NamedTemporaryFile
 from openpyxl import load_workbook
+import pyarrow.parquet
 from pyxform.builder import create_survey_from_xls
 from savReaderWriter import SavReader
 
@@ -20,6 +23,9 @@ from onadata.apps.viewer.tests.export_helpers import viewer_fixture_path
 from onadata.libs.utils.export_tools import (
     dict_to_joined_export,
     ExportBuilder)
+from onadata.libs.utils.sharded_export import (
+    iter_merged_rows,
+    write_export_part)
 
 
 def _logger_fixture_path(*args):
@@ -250,6 +256,58 @@ class TestExportBuilder(TestBase):
         self.assertEqual(
             sorted(expected_element_names), sorted(element_names))
 
+    def test_export_plan_rows_match_pre_processed_joined_export(self):
+        survey = self._create_childrens_survey()
+        for data in (self.data, self.data_utf8):
+            export_builder = ExportBuilder()
+            export_builder.set_survey(survey)
+            expected_rows = []
+            indices = {}
+            for index, d in enumerate(deepcopy(data), 1):
+                output = ExportBuilder.decode_mongo_encoded_section_names(
+                    dict_to_joined_export(d, index, indices, survey.name))
+                output.setdefault(survey.name, {}).update(
+                    {'_index': index, '_parent_index': -1})
+                for section in export_builder.sections:
+                    rows = output.get(section['name'], [])
+                    if type(rows) == dict:
+                        rows = [rows]
+                    expected_rows.extend(
+                        (section['name'],
+                         export_builder.pre_process_row(row, section))
+                        for row in rows)
+
+            rows = []
+            indices = {}
+            for index, d in enumerate(deepcopy(data), 1):
+                rows.extend(
+                    (section.name, row) for section, row in
+                    export_builder.export_plan.iter_rows(d, index, indices))
+            self.assertEqual(rows, expected_rows)
+
+    def test_merged_export_parts_match_single_pass(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        data = self.data * 3
+        expected_rows = [
+            (section.name, dict((f, row.get(f)) for f in section.fields))
+            for section, row in export_builder.iter_rows(deepcopy(data))]
+
+        parts = [
+            write_export_part(export_builder, deepcopy(data[2:]), 1,
+                              'bob/exports/parts/test/1.part'),
+            write_export_part(export_builder, deepcopy(data[:2]), 0,
+                              'bob/exports/parts/test/0.part'),
+        ]
+        rows = [(section.name, row) for section, row in
+                iter_merged_rows(export_builder.export_plan, parts)]
+        self.assertEqual(rows, expected_rows)
+
+        storage = get_storage_class()()
+        for part in parts:
+            storage.delete(part['path'])
+
     def test_zipped_csv_export_works(self):
         survey = self._create_childrens_survey()
         export_builder = ExportBuilder()
@@ -350,6 +408,47 @@ class TestExportBuilder(TestBase):
         }
         self.assertEqual(result, expected_result)
 
+    def test_zipped_parquet_export_works(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        export_builder.PARQUET_ROW_GROUP_SIZE = 2
+        temp_zip_file = NamedTemporaryFile(suffix='.zip')
+        export_builder.to_zipped_parquet(temp_zip_file.name, self.data)
+        temp_dir = tempfile.mkdtemp()
+        with zipfile.ZipFile(temp_zip_file.name, "r") as zip_file:
+            zip_file.extractall(temp_dir)
+        temp_zip_file.close()
+
+        self.assertEqual(
+            sorted(os.listdir(temp_dir)),
+            sorted("_".join(section['name'].split("/")) + ".parquet"
+                   for section in export_builder.sections))
+
+        # one row group per `PARQUET_ROW_GROUP_SIZE` rows
+        children_path = os.path.join(temp_dir, "children.parquet")
+        self.assertEqual(
+            pyarrow.parquet.ParquetFile(children_path).num_row_groups, 2)
+        children = pyarrow.parquet.read_table(children_path)
+        self.assertEqual(children.schema.field_by_name('children/age').type,
+                         pyarrow.int64())
+        columns = children.to_pydict()
+        self.assertEqual(columns['children/name'], ['Mike', 'John', 'Imora'])
+        self.assertEqual(columns['children/age'], [5, 2, 3])
+        self.assertEqual(columns['children/fav_colors'],
+                         [['red', 'blue'], None, None])
+        self.assertEqual(columns['children/fav_colors/red'],
+                         [True, None, None])
+        self.assertEqual(columns['children/fav_colors/pink'],
+                         [False, None, None])
+        self.assertEqual(columns['_index'], [1, 2, 3])
+        self.assertEqual(columns['_parent_index'], [1, 1, 1])
+
+        survey_table = pyarrow.parquet.read_table(
+            os.path.join(temp_dir, "{0}.parquet".format(survey.name)))
+        self.assertEqual(survey_table.to_pydict()['age'], [35, None])
+        shutil.rmtree(temp_dir)
+
     @unittest.skip('Fails with Python2')
     def test_zipped_csv_export_works_with_unicode(self):
         """
@@ -863,6 +962,45 @@ class TestExportBuilder(TestBase):
         self.assertEqual(parent_table_name, expected_parent_table_name)
         xls_file.close()
 
+    def test_to_xls_export_rolls_over_to_new_sheets(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        # a header and two rows per sheet
+        export_builder.XLSX_MAX_ROWS = 3
+        export_builder.set_survey(survey)
+        xls_file = NamedTemporaryFile(suffix='.xlsx')
+        filename = xls_file.name
+        export_builder.to_xls_export(filename, self.data)
+        xls_file.seek(0)
+        wb = load_workbook(filename)
+        self.assertEqual(wb.get_sheet_names(), [
+            'childrens_survey', 'children', 'children_cartoons',
+            'children_cartoons_characters', 'children1',
+            'children_cartoons1'])
+
+        def get_rows(sheet_name):
+            rows = [[c.value for c in row]
+                    for row in wb.get_sheet_by_name(sheet_name).rows]
+            headers = rows[0]
+            return [dict(zip(headers, row)) for row in rows[1:]]
+
+        children = get_rows('children') + get_rows('children1')
+        self.assertEqual([row['children/name'] for row in children],
+                         ['Mike', 'John', 'Imora'])
+        self.assertEqual(len(get_rows('children1')), 1)
+
+        cartoons = get_rows('children_cartoons')
+        self.assertEqual(
+            [(row['children/cartoons/name'], row['_parent_table_name'])
+             for row in cartoons + get_rows('children_cartoons1')],
+            [('Tom & Jerry', 'children'), ('Flinstones', 'children'),
+             ('Shrek', 'children1'), ("Dexter's Lab", 'children1')])
+        characters = get_rows('children_cartoons_characters')
+        self.assertEqual(
+            set(row['_parent_table_name'] for row in characters),
+            {'children_cartoons1'})
+        xls_file.close()
+
     def test_type_conversion(self):
         submission_1 = {
             "_id": 579827,
@@ -6,12 +6,16 @@ import json
 import os
 import StringIO
 import unittest
+import zipfile
 from time import sleep
 
 from django.conf import settings
 from django.core.files.storage import get_storage_class, FileSystemStorage
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from django.utils import timezone
 from django.utils.dateparse import parse_datetime
+from mock import patch
 from xlrd import open_workbook
 
 from onadata.apps.main.views import delete_data
@@ -24,9 +28,10 @@ from onadata.apps.viewer.models.export import Export
 from onadata.apps.main.models.meta_data import MetaData
 from onadata.apps.viewer.models.parsed_instance import ParsedInstance
 from onadata.apps.logger.models import Instance
-from onadata.apps.viewer.tasks import create_xls_export
+from onadata.apps.viewer.tasks import create_async_export, create_xls_export
 from onadata.libs.utils.export_tools import generate_export,\
     increment_index_in_filename, dict_to_joined_export
+from onadata.libs.utils.incremental_export import _write_export
 
 AMBULANCE_KEY = 'transport/available_transportation_types_to_referral_fac'\
                 'ility/ambulance'
@@ -1057,6 +1062,120 @@ class TestExports(TestBase):
         path, ext = os.path.splitext(export.filename)
         self.assertEqual(ext, '.zip')
 
+    @override_settings(EXPORT_SHARDS=3, EXPORT_SHARDING_THRESHOLD=1)
+    def test_sharded_csv_zip_export_matches_single_export(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        export = generate_export(
+            Export.CSV_ZIP_EXPORT, "zip", self.user.username,
+            self.xform.id_string)
+        sharded_export, _ = create_async_export(
+            self.xform, Export.CSV_ZIP_EXPORT, None, False)
+        sharded_export = Export.objects.get(pk=sharded_export.pk)
+        self.assertEqual(sharded_export.internal_status, Export.SUCCESSFUL)
+
+        storage = get_storage_class()()
+
+        def read_zip(filepath):
+            with storage.open(filepath) as export_file:
+                zip_file = zipfile.ZipFile(export_file)
+                return dict((name, zip_file.read(name))
+                            for name in zip_file.namelist())
+
+        contents = read_zip(export.filepath)
+        self.assertEqual(read_zip(sharded_export.filepath), contents)
+        self.assertEqual(
+            len(contents['{}.csv'.format(
+                self.xform.data_dictionary().survey.name)].splitlines()),
+            1 + self.xform.instances.count())
+        # The parts are gone
+        self.assertFalse(storage.exists(os.path.join(
+            self.user.username, 'exports', self.xform.id_string, 'parts',
+            '{}'.format(sharded_export.pk), '0.part')))
+
+    @override_settings(INCREMENTAL_EXPORTS=True)
+    def test_incremental_csv_zip_export_appends_new_submissions(self):
+        self._publish_transportation_form()
+        paths = [os.path.join(
+            self.this_directory, 'fixtures', 'transportation',
+            'instances', s, s + '.xml') for s in self.surveys]
+        for path in paths[:2]:
+            self._make_submission(path)
+
+        storage = get_storage_class()()
+
+        def read_zip(filepath):
+            with storage.open(filepath) as export_file:
+                zip_file = zipfile.ZipFile(export_file)
+                return dict((name, zip_file.read(name))
+                            for name in zip_file.namelist())
+
+        def create_incremental_export():
+            export, _ = create_async_export(
+                self.xform, Export.CSV_ZIP_EXPORT, None, False)
+            export = Export.objects.get(pk=export.pk)
+            self.assertEqual(export.internal_status, Export.SUCCESSFUL)
+            self.assertEqual(export.last_exported_id,
+                             self.xform.instances.latest('pk').pk)
+            return export
+
+        create_incremental_export()
+        for path in paths[2:]:
+            self._make_submission(path)
+
+        # Only the new submissions are exported
+        with patch('onadata.libs.utils.incremental_export._write_export') \
+                as write_export:
+            export = create_incremental_export()
+        self.assertFalse(write_export.called)
+        full_export = generate_export(
+            Export.CSV_ZIP_EXPORT, "zip", self.user.username,
+            self.xform.id_string)
+        self.assertEqual(read_zip(export.filepath),
+                         read_zip(full_export.filepath))
+
+        # A deletion requires a full export
+        self.xform.instances.earliest('pk').set_deleted(
+            timezone.now())
+        with patch('onadata.libs.utils.incremental_export._write_export',
+                   wraps=_write_export) as write_export:
+            export = create_incremental_export()
+        self.assertTrue(write_export.called)
+        full_export = generate_export(
+            Export.CSV_ZIP_EXPORT, "zip", self.user.username,
+            self.xform.id_string)
+        self.assertEqual(read_zip(export.filepath),
+                         read_zip(full_export.filepath))
+
+    def test_attachments_zip_export(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance_w_attachment()
+        url = reverse('attachments_zip_export', kwargs={
+            'username': self.user.username,
+            'id_string': self.xform.id_string
+        })
+
+        # Small enough to be streamed
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        content = self._get_response_content(response)
+        with zipfile.ZipFile(StringIO.StringIO(content)) as zip_file:
+            self.assertEqual(zip_file.namelist(),
+                             [self.attachment.media_file.name])
+
+        # Too large, generated by a task
+        with override_settings(ATTACHMENTS_ZIP_STREAMING_MAX_SIZE=0):
+            response = self.client.get(url)
+        self.assertRedirects(response, reverse(export_list, kwargs={
+            'username': self.user.username,
+            'id_string': self.xform.id_string,
+            'export_type': Export.ZIP_EXPORT
+        }))
+        self.assertTrue(Export.objects.filter(
+            xform=self.xform, export_type=Export.ZIP_EXPORT).exists())
+
     def test_dict_to_joined_export_notes(self):
         submission = {
             "_id": 579828,
@@ -6,14 +6,16 @@ from tempfile import NamedTemporaryFile
 
 from django.utils.dateparse import parse_datetime
 from django.core.urlresolvers import reverse
+from mock import patch
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.xform_instance_parser import xform_instance_to_dict
 from onadata.apps.viewer.pandas_mongo_bridge import AbstractDataFrameBuilder,\
     CSVDataFrameBuilder, CSVDataFrameWriter, ExcelWriter,\
-    get_prefix_from_xpath, get_valid_sheet_name, XLSDataFrameBuilder,\
-    XLSDataFrameWriter, remove_dups_from_list_maintain_order
+    format_csv_value, get_prefix_from_xpath, get_valid_sheet_name,\
+    XLSDataFrameBuilder, XLSDataFrameWriter,\
+    remove_dups_from_list_maintain_order
 from onadata.libs.utils.common_tags import NA_REP
 
 
@@ -235,6 +237,17 @@ class TestPandasMongoBridge(TestBase):
         os.unlink(temp_file.name)
         self.assertEqual(fixture, output)
 
+    def test_format_csv_value(self):
+        # as pandas wrote them
+        self.assertEqual(format_csv_value(None), NA_REP.encode('utf-8'))
+        self.assertEqual(format_csv_value(None, ''), b'')
+        self.assertEqual(format_csv_value(False), b'False')
+        self.assertEqual(format_csv_value(3), b'3')
+        self.assertEqual(format_csv_value('caf\xe9'), b'caf\xc3\xa9')
+        self.assertEqual(format_csv_value({}), b'{}')
+        self.assertEqual(format_csv_value({'uid': 'ok'}), b"{u'uid': u'ok'}")
+        self.assertEqual(format_csv_value(['a', 'b']), b'[a, b]')
+
     def test_csv_columns_for_gps_within_groups(self):
         self._publish_grouped_gps_form()
         self._submit_fixture_instance("grouped_gps", "01")
@@ -588,6 +601,30 @@ class TestPandasMongoBridge(TestBase):
         csv_file.close()
         os.unlink(temp_file.name)
 
+    def test_csv_export_ignores_submissions_received_between_passes(self):
+        self._publish_single_level_repeat_form()
+        for i in range(3):
+            self._submit_fixture_instance("new_repeats", "01")
+        csv_df_builder = CSVDataFrameBuilder(self.user.username,
+                                             self.xform.id_string)
+        get_columns = csv_df_builder._get_columns
+
+        def get_columns_and_submit():
+            # Once the columns are known
+            columns = get_columns()
+            self._submit_fixture_instance("new_repeats", "02")
+            return columns
+
+        temp_file = NamedTemporaryFile(suffix=".csv", delete=False)
+        with patch.object(csv_df_builder, '_get_columns',
+                          side_effect=get_columns_and_submit):
+            csv_df_builder.export_to(temp_file.name)
+        with open(temp_file.name) as csv_file:
+            rows = list(csv.reader(csv_file))
+        os.unlink(temp_file.name)
+        # The header and the submissions the first pass saw
+        self.assertEqual(len(rows), 4)
+
     def test_csv_column_indices_in_groups_within_repeats(self):
         self._publish_xls_fixture_set_xform("groups_in_repeats")
         self._submit_fixture_instance("groups_in_repeats", "01")
@@ -5,12 +5,19 @@ import os
 from django.conf import settings
 from django.core.management import call_command
 from django_digest.test import DigestAuth
+from mock import patch
 from django.utils.six import string_types
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.viewer.models.parsed_instance import ParsedInstance
 from onadata.apps.viewer.management.commands.remongo import Command
 from onadata.libs.utils.common_tags import USERFORM_ID
+from onadata.libs.utils.remongo import (
+    MongoRebuild,
+    RemongoCheckpoints,
+    rebuild_range,
+    split_xform_into_ranges,
+)
 
 
 class TestRemongo(TestBase):
@@ -108,3 +115,58 @@ class TestRemongo(TestBase):
             {USERFORM_ID: userform_id}).count()
         self.assertEqual(mongo_count,
                          initial_mongo_count + len(self.surveys))
+
+    def test_split_xform_into_ranges(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        pks = sorted(self.xform.instances.values_list('pk', flat=True))
+        ranges = split_xform_into_ranges(self.xform.pk, range_size=3)
+        self.assertEqual(
+            [(r.after_pk, r.last_pk, r.count) for r in ranges],
+            [(0, pks[2], 3), (pks[2], None, 1)])
+        # The last range is left open even if it is full
+        ranges = split_xform_into_ranges(self.xform.pk, range_size=2)
+        self.assertEqual(
+            [(r.after_pk, r.last_pk, r.count) for r in ranges],
+            [(0, pks[1], 2), (pks[1], None, 2)])
+
+    def test_rebuild_resumes_interrupted_run(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        settings.MONGO_DB.instances.drop()
+        rebuild = MongoRebuild([self.xform.pk], range_size=2, batch_size=1)
+        ranges, total, processed = rebuild.plan()
+        self.assertEqual((len(ranges), total, processed), (2, 4, 0))
+        # Only the first range completes before the run is interrupted
+        rebuild_range(rebuild.run_id, ranges[0], batch_size=1)
+        self.assertEqual(settings.MONGO_DB.instances.count(), 2)
+
+        resumed = MongoRebuild([self.xform.pk], run_id=rebuild.run_id)
+        self.assertEqual(resumed.run(), 2)
+        self.assertEqual(settings.MONGO_DB.instances.count(), 4)
+        # The checkpoints of a finished run are deleted
+        self.assertFalse(RemongoCheckpoints().exists(rebuild.run_id))
+
+    def test_checkpoints_deleted_once_done(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        rebuild = MongoRebuild([self.xform.pk], range_size=2, batch_size=1)
+        ranges, _, _ = rebuild.plan()
+        checkpoints = RemongoCheckpoints()
+        rebuild_range(rebuild.run_id, ranges[0], batch_size=1)
+        self.assertFalse(checkpoints.delete_if_done(rebuild.run_id))
+        self.assertTrue(checkpoints.exists(rebuild.run_id))
+        rebuild_range(rebuild.run_id, ranges[1], batch_size=1)
+        self.assertTrue(checkpoints.delete_if_done(rebuild.run_id))
+        self.assertFalse(checkpoints.exists(rebuild.run_id))
+
+    def test_rebuild_does_not_call_rest_services(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        # Submissions without a `ParsedInstance` get one
+        ParsedInstance.objects.all().delete()
+        with patch('onadata.apps.viewer.models.parsed_instance.call_service'
+                   ) as call_service:
+            MongoRebuild([self.xform.pk]).run()
+        self.assertFalse(call_service.called)
+        self.assertEqual(ParsedInstance.objects.count(), 4)
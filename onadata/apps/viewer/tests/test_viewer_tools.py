@@ -1,10 +1,16 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division, absolute_import
+import io
+import os
+import zipfile
+
 from django.test.client import RequestFactory
 
 from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.utils.export_tools import get_zipped_attachments
 from onadata.libs.utils.viewer_tools import export_def_from_filename,\
-    get_client_ip
+    get_client_ip, create_attachments_zipfile, _is_missing_file_error
+from onadata.libs.utils.zip_stream import ZipStream
 
 
 class TestViewerTools(TestBase):
@@ -20,3 +26,70 @@ class TestViewerTools(TestBase):
         self.assertIsNotNone(client_ip)
         # will this always be 127.0.0.1
         self.assertEqual(client_ip, "127.0.0.1")
+
+    def test_is_missing_file_error(self):
+        class StorageError(Exception):
+            pass
+
+        self.assertTrue(_is_missing_file_error(IOError('not found')))
+        s3_error = StorageError()
+        s3_error.status = 404
+        self.assertTrue(_is_missing_file_error(s3_error))
+        azure_error = StorageError()
+        azure_error.status_code = 404
+        self.assertTrue(_is_missing_file_error(azure_error))
+        client_error = StorageError()
+        client_error.response = {'Error': {'Code': 'NoSuchKey'}}
+        self.assertTrue(_is_missing_file_error(client_error))
+        forbidden_error = StorageError()
+        forbidden_error.status = 403
+        self.assertFalse(_is_missing_file_error(forbidden_error))
+        self.assertFalse(_is_missing_file_error(ValueError()))
+
+    def test_create_attachments_zipfile(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance_w_attachment()
+        media_file_path = os.path.join(
+            self.this_directory, 'fixtures', 'transportation', 'instances',
+            self.surveys[0], '1335783522563.jpg')
+
+        output_file = io.BytesIO()
+        create_attachments_zipfile(get_zipped_attachments(self.xform),
+                                   output_file=output_file)
+        output_file.seek(0)
+        with zipfile.ZipFile(output_file) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            zip_info, = zip_file.infolist()
+            self.assertEqual(zip_info.filename,
+                             self.attachment.media_file.name)
+            # Photos are stored as is
+            self.assertEqual(zip_info.compress_type, zipfile.ZIP_STORED)
+            with open(media_file_path, 'rb') as media_file:
+                self.assertEqual(zip_file.read(zip_info), media_file.read())
+
+    def test_zip_stream(self):
+        zip_stream = ZipStream()
+        files = [
+            ('stored.jpg', [b'\xff\xd8', b'\xff\xe0'], 4, False),
+            ('deflated.csv', [b'a,b\n'] * 1000, None, True),
+            ('empty', [], 0, False),
+            ('r\xe9sum\xe9.txt', [b'unicode name'], 12, False),
+        ]
+        output_file = io.BytesIO()
+        for filename, chunks, size, compress in files:
+            for data in zip_stream.iter_file(filename, iter(chunks),
+                                             size=size, compress=compress):
+                output_file.write(data)
+        for data in zip_stream.iter_close():
+            output_file.write(data)
+
+        output_file.seek(0)
+        with zipfile.ZipFile(output_file) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(zip_file.namelist(),
+                             [filename for filename, _, _, _ in files])
+            for filename, chunks, _, compress in files:
+                self.assertEqual(zip_file.read(filename), b''.join(chunks))
+                self.assertEqual(
+                    zip_file.getinfo(filename).compress_type,
+                    zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
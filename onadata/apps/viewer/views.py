@@ -16,10 +16,10 @@ from django.contrib.auth.models import User
 from django.core.files.storage import FileSystemStorage
 from django.core.files.storage import get_storage_class
 from django.core.urlresolvers import reverse
-from django.db.models import Q
+from django.db.models import Q, Sum
 from django.http import (
     HttpResponseForbidden, HttpResponseRedirect, HttpResponseNotFound,
-    HttpResponseBadRequest, HttpResponse)
+    HttpResponseBadRequest, HttpResponse, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
 from django.shortcuts import render
 from django.utils.http import urlquote
@@ -37,6 +37,7 @@ from onadata.libs.exceptions import NoRecordsFoundError
 from onadata.libs.utils.common_tags import SUBMISSION_TIME
 from onadata.libs.utils.export_tools import (
     generate_export,
+    get_zipped_attachments,
     should_create_new_export,
     kml_export_data,
     newset_export_for)
@@ -47,7 +48,10 @@ from onadata.libs.utils.logger_tools import response_with_mimetype_and_name, \
     disposition_ext_and_date
 from onadata.libs.utils.user_auth import has_permission, get_xform_and_perms, \
     helper_auth_helper, has_edit_permission
-from onadata.libs.utils.viewer_tools import export_def_from_filename
+from onadata.libs.utils.viewer_tools import (
+    export_def_from_filename,
+    iter_attachments_zip,
+)
 from .xls_writer import XlsWriter
 
 media_file_logger = logging.getLogger('media_files')
@@ -238,7 +242,8 @@ def data_export(request, username, id_string, export_type):
     force_xlsx = request.GET.get('xls') != 'true'
     if export_type == Export.XLS_EXPORT and force_xlsx:
         extension = 'xlsx'
-    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT]:
+    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT,
+                         Export.PARQUET_EXPORT]:
         extension = 'zip'
 
     audit = {
@@ -297,6 +302,60 @@ def data_export(request, username, id_string, export_type):
     return response
 
 
+def attachments_zip_export(request, username, id_string):
+    """
+    Streams the ZIP of the attachments of a form in the response if they
+    are small enough, and has it generated in the background, like
+    `create_export()`, otherwise.
+    """
+    owner = get_object_or_404(User, username__iexact=username)
+    xform = get_object_or_404(XForm, id_string__exact=id_string, user=owner)
+    helper_auth_helper(request)
+    if not has_permission(xform, owner, request):
+        return HttpResponseForbidden(_('Not shared.'))
+
+    audit = {
+        "xform": xform.id_string,
+        "export_type": Export.ZIP_EXPORT
+    }
+    attachments = get_zipped_attachments(xform)
+    total_size = attachments.aggregate(
+        total_size=Sum('media_file_size'))['total_size'] or 0
+    if total_size > getattr(settings, 'ATTACHMENTS_ZIP_STREAMING_MAX_SIZE',
+                            100 * 1024 * 1024):
+        create_async_export(xform, Export.ZIP_EXPORT, None, False)
+        audit_log(
+            Actions.EXPORT_CREATED, request.user, owner,
+            _("Created %(export_type)s export on '%(id_string)s'.") %
+            {
+                'export_type': Export.ZIP_EXPORT.upper(),
+                'id_string': xform.id_string,
+            }, audit, request)
+        return HttpResponseRedirect(reverse(
+            export_list,
+            kwargs={
+                "username": username,
+                "id_string": id_string,
+                "export_type": Export.ZIP_EXPORT
+            })
+        )
+
+    audit_log(
+        Actions.EXPORT_DOWNLOADED, request.user, owner,
+        _("Downloaded %(export_type)s export on '%(id_string)s'.") %
+        {
+            'id_string': xform.id_string,
+            'export_type': Export.ZIP_EXPORT.upper()
+        }, audit, request)
+
+    response = StreamingHttpResponse(
+        iter_attachments_zip(attachments.iterator()),
+        content_type='application/zip')
+    response['Content-Disposition'] = disposition_ext_and_date(
+        id_string, Export.ZIP_EXPORT)
+    return response
+
+
 @login_required
 @require_POST
 def create_export(request, username, id_string, export_type):
@@ -5,6 +5,7 @@ import os
 import celery
 import logging
 
+from celery.signals import worker_process_shutdown
 from django.apps import apps
 from django.conf import settings
 
@@ -47,6 +48,13 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks(lambda: [n.name for n in apps.get_app_configs()])
 
 
+@worker_process_shutdown.connect
+def flush_log_handlers(**kwargs):
+    # Pool processes exit without running `atexit` hooks, which flush the
+    # records buffered by log handlers, e.g. `AuditLogHandler`
+    logging.shutdown()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print('Request: {0!r}'.format(self.request))
@@ -9,9 +9,28 @@ from rest_framework import filters
 from rest_framework.exceptions import ParseError
 
 from onadata.apps.logger.models import XForm, Instance
+from onadata.libs.utils.permission_cache import xform_permission_cache
 
 
-class AnonDjangoObjectPermissionFilter(filters.DjangoObjectPermissionsFilter):
+class XFormObjectPermissionFilter(filters.DjangoObjectPermissionsFilter):
+    """
+    Resolves the permissions of authenticated users on forms from
+    `xform_permission_cache` rather than django-guardian's tables.
+    """
+    def filter_queryset(self, request, queryset, view):
+        if queryset.model is not XForm or request.user.is_anonymous():
+            return super(XFormObjectPermissionFilter, self)\
+                .filter_queryset(request, queryset, view)
+
+        permission = self.perm_format % {
+            'app_label': XForm._meta.app_label,
+            'model_name': XForm._meta.model_name,
+        }
+        return xform_permission_cache.filter_queryset(
+            request.user, permission, queryset)
+
+
+class AnonDjangoObjectPermissionFilter(XFormObjectPermissionFilter):
     def filter_queryset(self, request, queryset, view):
         """
         Anonymous user has no object permissions, return queryset as it is.
@@ -119,7 +138,7 @@ class XFormPermissionFilterMixin(object):
 
 
 class MetaDataFilter(XFormPermissionFilterMixin,
-                     filters.DjangoObjectPermissionsFilter):
+                     XFormObjectPermissionFilter):
     def filter_queryset(self, request, queryset, view):
         queryset = self._xform_filter_queryset(request, queryset, view, 'xform')
         data_type = request.query_params.get('data_type')
@@ -129,7 +148,7 @@ class MetaDataFilter(XFormPermissionFilterMixin,
 
 
 class AttachmentFilter(XFormPermissionFilterMixin,
-                       filters.DjangoObjectPermissionsFilter):
+                       XFormObjectPermissionFilter):
     def filter_queryset(self, request, queryset, view):
         queryset = self._xform_filter_queryset(request, queryset, view,
                                                'instance__xform')
@@ -43,6 +43,12 @@ class SAVZIPRenderer(BaseRenderer):
     charset = None
 
 
+class ParquetZIPRenderer(BaseRenderer):
+    media_type = 'application/octet-stream'
+    format = 'parquet'
+    charset = None
+
+
 # TODO add KML, ZIP(attachments) support
 
 
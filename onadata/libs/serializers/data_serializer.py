@@ -22,16 +22,41 @@ class DataSerializer(serializers.HyperlinkedModelSerializer):
 
 
 class DataListSerializer(serializers.Serializer):
-    def to_representation(self, obj):
-        request = self.context.get('request')
-
-        if not isinstance(obj, XForm):
-            return super(DataListSerializer, self).to_representation(obj)
 
-        query_params = (request and request.query_params) or {}
+    @staticmethod
+    def get_keyset_params(query_params):
+        """
+        Returns `(after, limit)` when the continuation-token mode is
+        requested with `?after=<_id>`, `None` otherwise. An empty `after`
+        starts from the first submission.
+        """
+        if 'after' not in query_params:
+            return None
+        for param in ('start', 'sort'):
+            if query_params.get(param):
+                raise ParseError(_("`%(param)s` can't be used with `after`")
+                                 % {'param': param})
+        try:
+            after = query_params.get('after')
+            after = int(after) if after else None
+            limit = int(query_params.get('limit') or
+                        ParsedInstance.DEFAULT_LIMIT)
+        except ValueError:
+            raise ParseError(_("Invalid after/limit params"))
+        # Mongo reads `limit(0)` as no limit at all
+        if limit <= 0:
+            raise ParseError(_("Invalid after/limit params"))
+        return after, min(limit, ParsedInstance.DEFAULT_LIMIT)
+
+    @classmethod
+    def get_cursor(cls, xform, query_params):
+        """
+        Returns the Mongo cursor of the submissions of `xform` matching
+        `query_params`, or `[{"count": <int>}]` if `count` is requested.
+        """
         query = {
             ParsedInstance.USERFORM_ID:
-            '%s_%s' % (obj.user.username, obj.id_string)
+            '%s_%s' % (xform.user.username, xform.id_string)
         }
         limit = query_params.get('limit', False)
         start = query_params.get('start', False)
@@ -49,10 +74,15 @@ class DataListSerializer(serializers.Serializer):
             'sort': query_params.get('sort')
         }
 
+        keyset_params = None if count else \
+            cls.get_keyset_params(query_params)
         # if we want the count, we don't kwow to paginate the records.
         # start and limit are useless then.
         if count:
             query_kwargs['count'] = True
+        elif keyset_params:
+            del query_kwargs['sort']
+            query_kwargs['after'], query_kwargs['limit'] = keyset_params
         else:
             if limit:
                 query_kwargs['limit'] = int(limit)
@@ -60,10 +90,21 @@ class DataListSerializer(serializers.Serializer):
             if start:
                 query_kwargs['start'] = int(start)
 
-        cursor = ParsedInstance.query_mongo_minimal(**query_kwargs)
+        if keyset_params:
+            return ParsedInstance.query_mongo_keyset(**query_kwargs)
+        return ParsedInstance.query_mongo_minimal(**query_kwargs)
+
+    def to_representation(self, obj):
+        request = self.context.get('request')
+
+        if not isinstance(obj, XForm):
+            return super(DataListSerializer, self).to_representation(obj)
+
+        query_params = (request and request.query_params) or {}
+        cursor = self.get_cursor(obj, query_params)
 
         # if we want the count, we only need the first index of the list.
-        if count:
+        if query_params.get('count', False):
             return cursor[0]
         else:
             return [MongoHelper.to_readable_dict(record) for record in cursor]
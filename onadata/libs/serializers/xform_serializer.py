@@ -2,12 +2,16 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
 
 import os
-import json
 
+from django.db import models
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
 from onadata.apps.logger.models import XForm
+from onadata.apps.logger.models.submission_counter import (
+    SubmissionCounterDelta,
+    submission_counters_are_deferred,
+)
 from onadata.libs.permissions import get_object_users_with_permissions
 from onadata.libs.serializers.fields.boolean_field import BooleanField
 from onadata.libs.serializers.tag_list_serializer import TagListSerializer
@@ -15,6 +19,23 @@ from onadata.libs.serializers.metadata_serializer import MetaDataSerializer
 from onadata.libs.utils.decorators import check_obj
 
 
+class XFormListOfFormsSerializer(serializers.ListSerializer):
+    """
+    Looks up the submissions not folded into the counters yet for all the
+    forms at once, instead of once per form
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        if submission_counters_are_deferred():
+            iterable = list(iterable)
+            self.child.pending_submissions = \
+                SubmissionCounterDelta.get_pending_for_xforms(
+                    [obj.pk for obj in iterable])
+        return super(XFormListOfFormsSerializer, self).to_representation(
+            iterable)
+
+
 class XFormSerializer(serializers.HyperlinkedModelSerializer):
     formid = serializers.ReadOnlyField(source='id')
     metadata = serializers.SerializerMethodField('get_xform_metadata')
@@ -49,11 +70,35 @@ class XFormSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = XForm
+        list_serializer_class = XFormListOfFormsSerializer
         read_only_fields = (
             'json', 'xml', 'date_created', 'date_modified', 'encrypted',
             'last_submission_time')
         exclude = ('json', 'xml', 'xls', 'user',
-                   'has_start_time', 'shared', 'shared_data')
+                   'has_start_time', 'shared', 'shared_data', 'version',
+                   'xml_hash')
+
+    def to_representation(self, obj):
+        ret = super(XFormSerializer, self).to_representation(obj)
+        if submission_counters_are_deferred() and \
+                'num_of_submissions' in ret:
+            # Include the submissions not folded into the counters yet
+            pending_submissions = getattr(self, 'pending_submissions', None)
+            if pending_submissions is not None:
+                count, last_submission_time = pending_submissions.get(
+                    obj.pk, (0, None))
+            else:
+                count, last_submission_time = \
+                    SubmissionCounterDelta.get_pending_for_xform(obj.pk)
+            if count:
+                ret['num_of_submissions'] = \
+                    (ret['num_of_submissions'] or 0) + count
+                if obj.last_submission_time is None or \
+                        last_submission_time > obj.last_submission_time:
+                    ret['last_submission_time'] = \
+                        self.fields['last_submission_time'].to_representation(
+                            last_submission_time)
+        return ret
 
     # Again, this is to match unit tests
     @property
@@ -88,9 +133,9 @@ class XFormListSerializer(serializers.Serializer):
         # Returns version data
         # The data returned may vary depending on the contents of the 
         # version field in the settings of the XLS file when the asset was
-        # created or updated
-        obj_json = json.loads(obj.json)
-        return obj_json.get('version')
+        # created or updated. Stored by `XForm.save()`, see
+        # `XForm.get_version_from_json()`
+        return obj.version
 
     @check_obj
     def get_hash(self, obj):
@@ -0,0 +1,156 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+class AuditLogWriter(object):
+    """
+    Buffers audit log records in memory and writes them from a background
+    thread, `batch_size` at a time, with `write(records)` (e.g.
+    `AuditLog.insert_many`), so that requests do not wait for MongoDB.
+
+    The buffer is bounded: once it holds `max_queue_size` records, new ones
+    are dropped and counted in `dropped` instead of slowing requests down or
+    exhausting memory while MongoDB is unavailable. `flush()` writes what is
+    buffered from the calling thread; `AuditLogHandler.flush()` calls it,
+    and so does `logging.shutdown()` when the process exits.
+
+    The thread is started with the first record, and again in a child
+    process after a fork: records buffered by the parent are left to it.
+    """
+
+    def __init__(self, write, max_queue_size=None, batch_size=None,
+                 flush_interval=None):
+        if max_queue_size is None:
+            max_queue_size = getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 10000)
+        if batch_size is None:
+            batch_size = getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 500)
+        if flush_interval is None:
+            flush_interval = getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 1)
+
+        self.write = write
+        self.max_queue_size = max(1, max_queue_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        # Counters since the writer was created
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self._reset()
+
+    def _reset(self):
+        # A lock copied by `fork()` may be held by a thread which only
+        # exists in the parent
+        self._condition = threading.Condition()
+        self._records = deque()
+        self._in_flight = 0
+        self._thread = None
+        self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._thread is not None:
+            return
+        with self._condition:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run,
+                                          name='AuditLogWriter')
+                thread.daemon = True
+                thread.start()
+                self._thread = thread
+
+    def put(self, record):
+        """
+        Buffers `record`. Returns `False` if the buffer is full and the
+        record has been dropped.
+        """
+        self._ensure_thread()
+        with self._condition:
+            if len(self._records) >= self.max_queue_size:
+                self.dropped += 1
+                return False
+            self._records.append(record)
+            if len(self._records) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    def _take_batch(self):
+        # Called with `_condition` held
+        batch = []
+        while self._records and len(batch) < self.batch_size:
+            batch.append(self._records.popleft())
+        self._in_flight += len(batch)
+        return batch
+
+    def _write_batch(self, batch):
+        success = False
+        try:
+            self.write(batch)
+            success = True
+        except Exception:
+            # Not to the audit log itself
+            logging.getLogger().warning(
+                'AuditLogWriter - {} record(s) could not be saved to '
+                'Mongo'.format(len(batch)), exc_info=True)
+        finally:
+            with self._condition:
+                if success:
+                    self.written += len(batch)
+                else:
+                    self.failed += len(batch)
+                self._in_flight -= len(batch)
+                self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._records) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                batch = self._take_batch()
+            if batch:
+                self._write_batch(batch)
+
+    def flush(self, timeout=None):
+        """
+        Writes the buffered records, then waits up to `timeout` seconds for
+        the batch the thread may be writing
+        """
+        if self._pid != os.getpid():
+            return
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+            if not batch:
+                break
+            self._write_batch(batch)
+
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._condition:
+            while self._in_flight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                self._condition.wait(remaining)
+
+    @property
+    def stats(self):
+        return {
+            'queued': len(self._records),
+            'max_queue_size': self.max_queue_size,
+            'written': self.written,
+            'failed': self.failed,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,339 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from xml.parsers.expat import ExpatError
+
+from django.core.exceptions import PermissionDenied
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.encoding import DjangoUnicodeDecodeError
+from django.utils.translation import ugettext as _
+
+from onadata.apps.logger.exceptions import FormInactiveError
+from onadata.apps.logger.models import Instance, XForm
+from onadata.apps.logger.models.instance import (
+    get_id_string_from_xml_str,
+    increment_submission_counters,
+)
+from onadata.apps.logger.xform_instance_parser import (
+    InstanceEmptyError,
+    InstanceMultipleNodeError,
+    SubmissionContext,
+)
+from onadata.apps.restservice.models import RestService
+from onadata.apps.restservice.utils import call_service
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.libs.utils.logger_tools import (
+    check_submission_permissions,
+    get_xform_from_submission,
+    save_submission,
+)
+from onadata.libs.utils.mongo_writer import BulkMongoWriter
+
+
+# Errors which reject a single submission of a batch, with the same statuses
+# and messages as `safe_create_instance()`
+ITEM_ERRORS = (
+    InstanceEmptyError,
+    ExpatError,
+    InstanceMultipleNodeError,
+    DjangoUnicodeDecodeError,
+    PermissionDenied,
+    FormInactiveError,
+)
+
+
+def get_item_error(e):
+    """
+    Returns the status and the message reported for `e`, one of
+    `ITEM_ERRORS`
+    """
+    if isinstance(e, InstanceEmptyError):
+        return 400, _("Received empty submission. No instance was created")
+    if isinstance(e, ExpatError):
+        return 400, _("Improperly formatted XML.")
+    if isinstance(e, DjangoUnicodeDecodeError):
+        return 400, _("File likely corrupted during transmission, please "
+                      "try later.")
+    if isinstance(e, PermissionDenied):
+        return 403, unicode(e)
+    if isinstance(e, FormInactiveError):
+        return 405, _("Form is not active")
+    return 400, unicode(e)
+
+
+class BatchItem(object):
+    """
+    A submission of a batch and what became of it
+    """
+
+    def __init__(self, index, xml):
+        self.index = index
+        self.xml = xml
+        self.submission_context = None
+        self.status = None
+        self.message = None
+        self.instance = None
+        # The existing submission a duplicate matches
+        self.duplicate_id = None
+
+    def fail(self, status, message):
+        self.status = status
+        self.message = message
+
+    def to_dict(self):
+        instance = self.instance
+        return {
+            'index': self.index,
+            'status': self.status,
+            'message': self.message,
+            'id': instance.pk if instance else self.duplicate_id,
+            'uuid': instance.uuid if instance else None,
+        }
+
+
+def bulk_create_with_ids(model, objects):
+    """
+    Inserts `objects` and sets their primary keys, which `bulk_create()`
+    does not do before Django 1.10. On PostgreSQL, the keys are taken from
+    the sequence of the table beforehand, in a single query; other databases
+    insert the objects one by one, bypassing any `save()` override.
+    """
+    if not objects:
+        return
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+                "FROM generate_series(1, %s)",
+                [model._meta.db_table, model._meta.pk.column, len(objects)])
+            ids = [row[0] for row in cursor.fetchall()]
+        for obj, id_ in zip(objects, ids):
+            obj.pk = id_
+        model.objects.bulk_create(objects)
+    else:
+        for obj in objects:
+            super(model, obj).save(force_insert=True)
+
+
+def get_duplicate_ids(xform, items):
+    """
+    Returns `{xml_hash: pk}` for the submissions to `xform` which are exact
+    matches of `items`, with one query for the whole batch instead of one
+    `get_duplicate_instance()` per submission
+    """
+    if not items:
+        return {}
+    queryset = Instance.objects.filter(xform_id=xform.pk)
+    xml_hashes = set(item.submission_context.xml_hash for item in items)
+    duplicate_ids = dict(queryset.filter(
+        xml_hash__in=xml_hashes).values_list('xml_hash', 'pk'))
+
+    # Submissions without a hash are compared by content, as in
+    # `get_duplicate_instance()`
+    queryset = queryset.filter(xml_hash=Instance.DEFAULT_XML_HASH)
+    if queryset.exists():
+        xml_hashes_by_xml = dict(
+            (item.xml, item.submission_context.xml_hash) for item in items)
+        for xml, pk in queryset.filter(
+                xml__in=list(xml_hashes_by_xml)).values_list('xml', 'pk'):
+            xml_hash = xml_hashes_by_xml.get(xml)
+            if xml_hash is not None:
+                duplicate_ids.setdefault(xml_hash, pk)
+    return duplicate_ids
+
+
+def _create_new_instances(xform, items, submitted_by, status):
+    """
+    Does what `save_submission()` does for each of `items`, new submissions
+    to `xform`, with bulk queries: `Instance`s and `ParsedInstance`s are
+    inserted with one query each, their Mongo documents are upserted
+    together and the submission counters are incremented once.
+    """
+    survey_types = {}
+    instances = []
+    date_created_overrides = []
+    for item in items:
+        submission_context = item.submission_context
+        instance = Instance(xml=item.xml, user=submitted_by, status=status,
+                            xform=xform)
+        instance.submission_context = submission_context
+        date_created_override = submission_context.submission_date
+        if date_created_override:
+            if not timezone.is_aware(date_created_override):
+                # default to utc?
+                date_created_override = timezone.make_aware(
+                    date_created_override, timezone.utc)
+            instance.date_created = date_created_override
+        try:
+            instance.prepare_for_bulk_create(survey_types)
+        except ITEM_ERRORS as e:
+            item.fail(*get_item_error(e))
+            continue
+        if date_created_override:
+            date_created_overrides.append((instance, date_created_override))
+        # Counted below, for the whole batch
+        instance.defer_counting = True
+        item.instance = instance
+        instances.append(instance)
+
+    bulk_create_with_ids(Instance, instances)
+    # `auto_now_add` has replaced the submission dates
+    instance_ids_by_date = {}
+    for instance, date_created in date_created_overrides:
+        instance.date_created = date_created
+        instance_ids_by_date.setdefault(date_created, []).append(instance.pk)
+    for date_created, instance_ids in instance_ids_by_date.iteritems():
+        Instance.objects.filter(pk__in=instance_ids).update(
+            date_created=date_created)
+
+    parsed_instances = []
+    for instance in instances:
+        del instance.defer_counting
+        parsed_instance = ParsedInstance(instance=instance)
+        parsed_instance._set_geopoint()
+        parsed_instances.append(parsed_instance)
+    bulk_create_with_ids(ParsedInstance, parsed_instances)
+
+    saved_to_mongo = []
+    with BulkMongoWriter() as writer:
+        for parsed_instance in parsed_instances:
+            record = parsed_instance.to_dict_for_mongo()
+            # Let `call_service()` reuse the document
+            parsed_instance.instance.submission_context.mongo_document = \
+                record
+            # Same as `ParsedInstance.update_mongo()`
+            if record.get("_xform_id_string") is not None:
+                writer.add(record)
+                saved_to_mongo.append(parsed_instance)
+
+    if RestService.objects.filter(xform=xform).exists():
+        for parsed_instance in saved_to_mongo:
+            call_service(parsed_instance)
+
+    increment_submission_counters(
+        xform.pk, [instance.date_created for instance in instances])
+
+    for item in items:
+        if item.status is None:
+            item.status = 201
+
+
+@transaction.atomic
+def create_instances(username, xmls, request, status='submitted_via_web'):
+    """
+    Creates the submissions whose XML are `xmls`, all to the same form, as
+    `create_instance()` does for each of them, without attachments.
+
+    The form and the permissions of the user are checked once for the
+    batch, duplicates are looked up with a single query and new submissions
+    are saved in bulk. Submissions with a `deprecatedID` (edits) are saved
+    one by one.
+
+    :returns: A `BatchItem` per XML, in the same order.
+    :raises: Like `create_instance()`, when the batch cannot be accepted at
+        all, e.g. the form of its first valid submission does not exist or
+        is not active, or the user is not allowed to submit to it.
+    """
+    submitted_by = request.user \
+        if request and request.user.is_authenticated() else None
+
+    if username:
+        username = username.lower()
+
+    items = [BatchItem(index, xml) for index, xml in enumerate(xmls)]
+    valid_items = []
+    for item in items:
+        try:
+            # Parse the XML once for the whole submission pipeline
+            item.submission_context = SubmissionContext(
+                item.xml, xml_hash=Instance.get_hash(item.xml))
+        except ITEM_ERRORS as e:
+            item.fail(*get_item_error(e))
+        else:
+            valid_items.append(item)
+    if not valid_items:
+        return items
+
+    first_item = valid_items[0]
+    xform = get_xform_from_submission(
+        first_item.xml, username,
+        submission_context=first_item.submission_context)
+    check_submission_permissions(request, xform)
+    if not xform.downloadable:
+        raise FormInactiveError()
+
+    # A submission whose formhub uuid is the one of another form would be
+    # saved to that form by `create_instance()`, whatever its `id_string`.
+    # Unknown uuids fall back to the `id_string`, as they do there.
+    other_uuids = set(
+        item.submission_context.formhub_uuid for item in valid_items
+        if item.submission_context.formhub_uuid not in (None, xform.uuid))
+    if other_uuids:
+        other_uuids = set(XForm.objects.filter(
+            uuid__in=other_uuids).values_list('uuid', flat=True))
+
+    form_items = []
+    for item in valid_items:
+        id_string = item.submission_context.xform_id_string or \
+            get_id_string_from_xml_str(item.xml)
+        if id_string != xform.id_string or \
+                item.submission_context.formhub_uuid in other_uuids:
+            item.fail(400, _("Submission is not for the form %(id_string)s "
+                             "of this batch.") % {
+                'id_string': xform.id_string})
+        else:
+            form_items.append(item)
+
+    # Same rule as `create_instance()`
+    checked_items = [
+        item for item in form_items
+        if xform.has_start_time or item.submission_context.uuid is not None
+    ]
+    duplicate_ids = get_duplicate_ids(xform, checked_items)
+    checked_items = set(checked_items)
+    batch_items = {}
+    batch_duplicates = []
+    new_items = []
+    edit_items = []
+    for item in form_items:
+        xml_hash = item.submission_context.xml_hash
+        if item in checked_items and (xml_hash in duplicate_ids or
+                                      xml_hash in batch_items):
+            item.status = 202
+            item.message = _("Duplicate submission")
+            if xml_hash in duplicate_ids:
+                item.duplicate_id = duplicate_ids[xml_hash]
+            else:
+                batch_duplicates.append((item, batch_items[xml_hash]))
+            continue
+        batch_items[xml_hash] = item
+        if item.submission_context.deprecated_uuid:
+            edit_items.append(item)
+        else:
+            new_items.append(item)
+
+    for item in edit_items:
+        submission_context = item.submission_context
+        try:
+            with transaction.atomic():
+                item.instance = save_submission(
+                    xform, item.xml, [], submission_context.uuid,
+                    submitted_by, status, None,
+                    submission_context=submission_context)
+        except ITEM_ERRORS as e:
+            item.fail(*get_item_error(e))
+        else:
+            item.status = 201
+
+    _create_new_instances(xform, new_items, submitted_by, status)
+
+    # A duplicate of a submission which could not be saved is not reported
+    # as saved: being the same XML, it gets the same error
+    for item, original_item in batch_duplicates:
+        if original_item.instance is not None:
+            item.duplicate_id = original_item.instance.pk
+        else:
+            item.fail(original_item.status, original_item.message)
+
+    return items
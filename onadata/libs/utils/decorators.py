@@ -45,6 +45,12 @@ def is_owner(view_func):
 
 
 def apply_form_field_names(func):
+    """
+    Renames the fields of the records returned by a Mongo query from their
+    Mongo names to their form names when `username` and `id_string` are
+    passed. Records are returned as a list, or as a generator if the
+    decorated function is called with `lazy=True`.
+    """
     @wraps(func)
     def wrapper(*args, **kwargs):
         def _get_decoded_record(record):
@@ -61,6 +67,7 @@ def apply_form_field_names(func):
                         record[field_names[field]] = record.pop(field)
             return record
 
+        lazy = kwargs.pop('lazy', False)
         cursor = func(*args, **kwargs)
         # Compare by class name instead of type because tests use MockMongo
         if cursor.__class__.__name__ == 'Cursor' and 'id_string' in kwargs and \
@@ -69,8 +76,10 @@ def apply_form_field_names(func):
             id_string = kwargs.get('id_string')
             dd = XForm.objects.get(
                 id_string=id_string, user__username=username)
-            records = []
             field_names = dd.data_dictionary().get_mongo_field_names_dict()
+            if lazy:
+                return (_get_decoded_record(record) for record in cursor)
+            records = []
             for record in cursor:
                 records.append(_get_decoded_record(record))
             return records
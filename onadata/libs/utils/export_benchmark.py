@@ -0,0 +1,413 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.test.utils import override_settings
+from pyxform import SurveyElementBuilder
+
+from onadata.apps.viewer.models.data_dictionary import DataDictionary
+from onadata.apps.viewer.pandas_mongo_bridge import CSVDataFrameBuilder
+from onadata.libs.utils.common_tags import (
+    ATTACHMENTS,
+    GEOLOCATION,
+    ID,
+    NOTES,
+    STATUS,
+    SUBMISSION_TIME,
+    TAGS,
+    USERFORM_ID,
+    UUID,
+    VALIDATION_STATUS,
+    XFORM_ID_STRING,
+)
+from onadata.libs.utils.export_tools import ExportBuilder
+from onadata.libs.utils.viewer_tools import create_attachments_zipfile
+
+
+BENCHMARK_USERNAME = 'benchmark'
+SCALAR_QUESTION_TYPES = ['text', 'integer', 'decimal', 'date', 'select one']
+FIRST_SUBMISSION_TIME = datetime(2020, 1, 1)
+FILE_SYSTEM_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# Size of each attachment zipped by `export_attachments_zip()`
+ATTACHMENT_SIZE = 10 * 1024
+
+
+class SyntheticForm(object):
+    """
+    A generated form and its submissions, as stored in Mongo.
+
+    The root and every repeat (nested `repeat_depth` times) get `questions`
+    questions each, `select_multiples` and `geopoints` of which are select
+    multiples and geopoints. Every submission has `repeat_count` occurrences
+    of each repeat per parent occurrence.
+
+    Submissions are generated lazily and deterministically from their index,
+    so they behave like a Mongo cursor: any slice can be read again and only
+    the current submission is held in memory.
+    """
+
+    def __init__(self, questions=20, repeat_depth=1, select_multiples=2,
+                 geopoints=1, choices=5, repeat_count=2, seed=0,
+                 name='benchmark'):
+        self.questions = questions
+        self.repeat_depth = repeat_depth
+        self.select_multiples = select_multiples
+        self.geopoints = geopoints
+        self.choices = choices
+        self.repeat_count = repeat_count
+        self.seed = seed
+        self.name = name
+        self._sections = {}
+        self.survey = SurveyElementBuilder().create_survey_element_from_dict(
+            self.to_dict())
+
+    @property
+    def options(self):
+        return {
+            'questions': self.questions,
+            'repeat_depth': self.repeat_depth,
+            'select_multiples': self.select_multiples,
+            'geopoints': self.geopoints,
+            'choices': self.choices,
+            'repeat_count': self.repeat_count,
+            'seed': self.seed,
+        }
+
+    @property
+    def rows_per_record(self):
+        """
+        Number of rows written across all sheets (or files) per submission
+        """
+        return sum(self.repeat_count ** depth
+                   for depth in range(self.repeat_depth + 1))
+
+    @property
+    def data_dictionary(self):
+        data_dictionary = DataDictionary(id_string=self.name, title=self.name)
+        # Unsaved: skip the JSON round trip in `DataDictionary.get_survey()`
+        data_dictionary._survey = self.survey
+        return data_dictionary
+
+    def to_dict(self):
+        return {
+            'type': 'survey',
+            'name': self.name,
+            'id_string': self.name,
+            'title': self.name,
+            'default_language': 'default',
+            'children': self._get_section_children(1),
+        }
+
+    def _get_section_children(self, depth):
+        questions = []
+        scalars = max(self.questions - self.select_multiples - self.geopoints,
+                      0)
+        types = [SCALAR_QUESTION_TYPES[i % len(SCALAR_QUESTION_TYPES)]
+                 for i in range(scalars)]
+        types += ['select all that apply'] * self.select_multiples
+        types += ['geopoint'] * self.geopoints
+
+        for i, type_ in enumerate(types, 1):
+            question = {
+                'type': type_,
+                'name': '{}_{}'.format(type_.replace(' ', '_'), i),
+                'label': 'Question {}'.format(i),
+            }
+            if type_.startswith('select'):
+                question['children'] = [
+                    {'name': 'choice_{}'.format(c),
+                     'label': 'Choice {}'.format(c)}
+                    for c in range(1, self.choices + 1)]
+            questions.append(question)
+
+        self._sections[depth] = [(q['name'], q['type']) for q in questions]
+
+        if depth <= self.repeat_depth:
+            questions.append({
+                'type': 'repeat',
+                'name': 'repeat_{}'.format(depth),
+                'label': 'Repeat {}'.format(depth),
+                'children': self._get_section_children(depth + 1),
+            })
+        return questions
+
+    def get_records(self, count, start=0):
+        for index in range(start, start + count):
+            yield self.get_record(index)
+
+    def get_record(self, index):
+        rand = random.Random(self.seed * 1000003 + index)
+        record = self._get_section_data(rand, 1, '')
+        record.update({
+            ID: index + 1,
+            UUID: str(uuid.UUID(int=rand.getrandbits(128))),
+            SUBMISSION_TIME: (FIRST_SUBMISSION_TIME + timedelta(
+                minutes=index)).strftime('%Y-%m-%dT%H:%M:%S'),
+            XFORM_ID_STRING: self.name,
+            USERFORM_ID: '{}_{}'.format(BENCHMARK_USERNAME, self.name),
+            STATUS: 'submitted_via_web',
+            GEOLOCATION: [rand.uniform(-90, 90), rand.uniform(-180, 180)],
+            ATTACHMENTS: [],
+            TAGS: [],
+            NOTES: [],
+            VALIDATION_STATUS: {},
+        })
+        return record
+
+    def _get_section_data(self, rand, depth, prefix):
+        data = {}
+        for name, type_ in self._sections[depth]:
+            data[prefix + name] = self._get_value(rand, type_)
+
+        if depth <= self.repeat_depth:
+            xpath = '{}repeat_{}'.format(prefix, depth)
+            data[xpath] = [
+                self._get_section_data(rand, depth + 1, xpath + '/')
+                for _ in range(self.repeat_count)]
+        return data
+
+    def _get_value(self, rand, type_):
+        if type_ == 'integer':
+            return '{}'.format(rand.randint(0, 1000))
+        if type_ == 'decimal':
+            return '{:.3f}'.format(rand.uniform(0, 1000))
+        if type_ == 'date':
+            return (FIRST_SUBMISSION_TIME.date() + timedelta(
+                days=rand.randint(0, 3650))).isoformat()
+        if type_ == 'select one':
+            return 'choice_{}'.format(rand.randint(1, self.choices))
+        if type_ == 'select all that apply':
+            selected = rand.sample(range(1, self.choices + 1),
+                                   rand.randint(1, self.choices))
+            return ' '.join('choice_{}'.format(i) for i in sorted(selected))
+        if type_ == 'geopoint':
+            return '{:.6f} {:.6f} {:.1f} {:.1f}'.format(
+                rand.uniform(-90, 90), rand.uniform(-180, 180),
+                rand.uniform(0, 3000), rand.uniform(1, 50))
+        return 'Lorem ipsum {}'.format(rand.getrandbits(32))
+
+
+class SyntheticCSVDataFrameBuilder(CSVDataFrameBuilder):
+    """
+    `CSVDataFrameBuilder` reading from a `SyntheticForm` instead of the
+    database and Mongo
+    """
+
+    def __init__(self, form, count, **kwargs):
+        self.form = form
+        self.count = count
+        super(SyntheticCSVDataFrameBuilder, self).__init__(
+            BENCHMARK_USERNAME, form.name, **kwargs)
+
+    def _setup(self):
+        self.dd = self.form.data_dictionary
+        self.select_multiples = self._collect_select_multiples(self.dd)
+        self.gps_fields = self._collect_gps_fields(self.dd)
+
+    def _query_mongo(self, query='{}', start=0, limit=None, fields='[]',
+                     count=False):
+        if count:
+            return self.count
+        return self.form.get_records(min(limit, self.count - start), start)
+
+    def _iter_records(self, fields='[]', last_id=None):
+        return self.form.get_records(self.count)
+
+    def _get_last_id(self):
+        return None
+
+
+_MediaFile = namedtuple('_MediaFile', 'name')
+_Attachment = namedtuple('_Attachment',
+                         'media_file media_file_size mimetype')
+
+
+def _get_export_builder(form):
+    export_builder = ExportBuilder()
+    export_builder.set_survey(form.survey)
+    return export_builder
+
+
+def export_xls(form, count, path, work_dir):
+    _get_export_builder(form).to_xls_export(path, form.get_records(count))
+
+
+def export_csv_zip(form, count, path, work_dir):
+    _get_export_builder(form).to_zipped_csv(path, form.get_records(count))
+
+
+def export_sav_zip(form, count, path, work_dir):
+    _get_export_builder(form).to_zipped_sav(path, form.get_records(count))
+
+
+def export_parquet(form, count, path, work_dir):
+    _get_export_builder(form).to_zipped_parquet(path, form.get_records(count))
+
+
+def export_csv(form, count, path, work_dir):
+    SyntheticCSVDataFrameBuilder(form, count).export_to(path)
+
+
+def export_attachments_zip(form, count, path, work_dir):
+    """
+    Zips one attachment per submission, as `generate_attachments_zip_export`
+    does once it has fetched the attachments from the database. The files are
+    written beforehand by `prepare_attachments()`.
+    """
+    media_root = os.path.join(work_dir, 'media')
+    with override_settings(MEDIA_ROOT=media_root,
+                           DEFAULT_FILE_STORAGE=FILE_SYSTEM_STORAGE):
+        with open(path, 'wb') as output_file:
+            create_attachments_zipfile(
+                (_Attachment(_MediaFile(name), ATTACHMENT_SIZE, 'image/jpeg')
+                 for name in _get_attachment_names(form, count)),
+                output_file=output_file)
+
+
+def prepare_attachments(form, count, work_dir):
+    rand = random.Random(form.seed)
+    # Random bytes do not compress, as most photos
+    content = bytearray(rand.getrandbits(8) for _ in range(ATTACHMENT_SIZE))
+    for name in _get_attachment_names(form, count):
+        file_path = os.path.join(work_dir, 'media', name)
+        if not os.path.isdir(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path))
+        with open(file_path, 'wb') as attachment_file:
+            attachment_file.write(content)
+
+
+def _get_attachment_names(form, count):
+    for index in range(count):
+        yield '{}/attachments/{}/{}.jpg'.format(
+            BENCHMARK_USERNAME, form.name, index + 1)
+
+
+# (name, export function, file extension, untimed setup function)
+EXPORTERS = [
+    ('xls', export_xls, 'xlsx', None),
+    ('csv_zip', export_csv_zip, 'zip', None),
+    ('sav_zip', export_sav_zip, 'zip', None),
+    ('parquet', export_parquet, 'zip', None),
+    ('csv', export_csv, 'csv', None),
+    ('attachments_zip', export_attachments_zip, 'zip', prepare_attachments),
+]
+EXPORTER_NAMES = [exporter[0] for exporter in EXPORTERS]
+
+
+def get_peak_rss_kb():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak_rss // 1024
+    return peak_rss
+
+
+def run_exporter(exporter_name, form_options, count):
+    """
+    Runs one exporter over `count` synthetic submissions in a temporary
+    directory and returns its measurements.
+    """
+    _, func, extension, setup = [
+        exporter for exporter in EXPORTERS if exporter[0] == exporter_name][0]
+    form = SyntheticForm(**form_options)
+    work_dir = tempfile.mkdtemp(prefix='export_benchmark_')
+    path = os.path.join(work_dir, '{}.{}'.format(exporter_name, extension))
+    result = {
+        'exporter': exporter_name,
+        'records': count,
+        'rows': count * form.rows_per_record,
+    }
+    try:
+        if setup:
+            setup(form, count, work_dir)
+        start = time.time()
+        func(form, count, path, work_dir)
+        # Never zero, even on a coarse clock
+        seconds = max(time.time() - start, 0.001)
+        result.update({
+            'seconds': round(seconds, 3),
+            'records_per_second': round(count / seconds, 1),
+            'rows_per_second': round(result['rows'] / seconds, 1),
+            'output_bytes': os.path.getsize(path),
+            'peak_rss_kb': get_peak_rss_kb(),
+        })
+    except Exception as e:
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def run_benchmarks(form_options, count, exporter_names=None, isolate=True):
+    """
+    Runs each exporter and returns the results, ready to be dumped to JSON.
+
+    With `isolate`, each exporter runs in a new child process, so that its
+    peak RSS is not hidden by a previous exporter (or by the caller).
+    """
+    results = []
+    for exporter_name in exporter_names or EXPORTER_NAMES:
+        args = (exporter_name, form_options, count)
+        if isolate:
+            pool = multiprocessing.Pool(processes=1)
+            try:
+                results.append(pool.apply(run_exporter, args))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results.append(run_exporter(*args))
+
+    return {
+        'created': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'commit': get_commit(),
+        'python': sys.version.split()[0],
+        'form': form_options,
+        'records': count,
+        'isolated': isolate,
+        'results': results,
+    }
+
+
+def compare_results(baseline, current):
+    """
+    Returns `(exporter, metric, baseline value, current value, change)` for
+    every metric of the exporters found in both results. `change` is a ratio,
+    e.g. 0.1 for 10% more records per second.
+    """
+    baseline_results = dict((r['exporter'], r) for r in baseline['results'])
+    comparison = []
+    for result in current['results']:
+        baseline_result = baseline_results.get(result['exporter'])
+        if not baseline_result:
+            continue
+        for metric in ('records_per_second', 'peak_rss_kb', 'output_bytes'):
+            old, new = baseline_result.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            comparison.append((result['exporter'], metric, old, new,
+                               (new - old) / old))
+    return comparison
+
+
+def get_commit():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=devnull).strip().decode('utf-8')
+    except (OSError, subprocess.CalledProcessError):
+        return None
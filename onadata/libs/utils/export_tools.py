@@ -1,9 +1,11 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division, absolute_import
 
+from bisect import bisect_right
 import csv
 from datetime import datetime, date
 import json
+import logging
 import os
 import re
 import six
@@ -53,6 +55,10 @@ QUESTION_TYPES_TO_EXCLUDE = [
     'note',
 ]
 GEOPOINT_BIND_TYPE = "geopoint"
+# Rows per worksheet allowed by Excel, header included
+XLSX_MAX_ROWS = 1048576
+# Rows buffered per section before they are written as a Parquet row group
+PARQUET_ROW_GROUP_SIZE = 10000
 
 
 def encode_if_str(row, key, encode_dates=False):
@@ -177,6 +183,381 @@ def dict_to_joined_export(data, index, indices, name):
     return output
 
 
+class XLSXSectionSheets(object):
+    """
+    The worksheet(s) of one export section. Once a worksheet is full, the
+    rows go to a new one.
+    """
+
+    def __init__(self, title, headers, fields):
+        self.title = title
+        self.headers = headers
+        self.fields = fields
+        self.titles = []
+        # `_index` of the first row of each worksheet, to find the worksheet
+        # of a parent row
+        self.first_indices = []
+        self.work_sheet = None
+        self.row_count = 0
+
+    def get_title(self, index):
+        position = bisect_right(self.first_indices, index) - 1
+        return self.titles[max(position, 0)]
+
+
+class StreamingXLSXWriter(object):
+    """
+    Writes export sections to an XLSX workbook row by row. Worksheets are
+    written to temporary files as rows come in (openpyxl's optimized writer),
+    so memory does not grow with the number of rows.
+
+    Column lookups are compiled once per section. A section with more rows
+    than fit on a worksheet continues on new worksheets, e.g. `children1`
+    after `children`, and `_parent_table_name` names the worksheet on which
+    the parent row was actually written.
+    """
+
+    def __init__(self, path, max_rows=XLSX_MAX_ROWS):
+        self.path = path
+        self.max_rows = max_rows
+        self.workbook = Workbook(optimized_write=True)
+        self.sections = {}
+        self._titles = []
+
+    def add_section(self, name, headers, fields):
+        sheets = XLSXSectionSheets(
+            "_".join(name.split("/")), headers, fields)
+        self.sections[name] = sheets
+        self._add_work_sheet(sheets, 0)
+
+    def _add_work_sheet(self, sheets, first_index):
+        title = ExportBuilder.get_valid_sheet_name(sheets.title, self._titles)
+        self._titles.append(title)
+        sheets.titles.append(title)
+        sheets.first_indices.append(first_index)
+        sheets.work_sheet = self.workbook.create_sheet(title=title)
+        sheets.work_sheet.append(sheets.headers)
+        sheets.row_count = 1
+
+    def write_row(self, section_name, row):
+        sheets = self.sections[section_name]
+        if sheets.row_count >= self.max_rows:
+            self._add_work_sheet(sheets, row.get(INDEX))
+
+        # update parent_table with the generated sheet's title
+        parent_sheets = self.sections.get(row.get(PARENT_TABLE_NAME))
+        row[PARENT_TABLE_NAME] = parent_sheets.get_title(
+            row.get(PARENT_INDEX)) if parent_sheets else None
+        get = row.get
+        sheets.work_sheet.append([get(field) for field in sheets.fields])
+        sheets.row_count += 1
+
+    def save(self):
+        self.workbook.save(filename=self.path)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        # Dates Excel cannot represent are left as strings by `convert_type()`
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value):
+    return None if value is None else bool(value)
+
+
+def _to_list(value):
+    return value.split() if isinstance(value, six.string_types) else None
+
+
+def _to_string(value):
+    if value is None or isinstance(value, six.text_type):
+        return value
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return six.text_type(value)
+
+
+class ParquetSectionFile(object):
+    """
+    The Parquet file of one export section and the rows not written yet,
+    column by column.
+    """
+
+    def __init__(self, fields, converters, schema, writer):
+        self.fields = fields
+        self.converters = converters
+        self.schema = schema
+        self.writer = writer
+        self.columns = [[] for _ in fields]
+        self.row_count = 0
+        # Per column, values which did not match its type
+        self.invalid_counts = [0 for _ in fields]
+
+
+class StreamingParquetWriter(object):
+    """
+    Writes each export section to a Parquet file, with columns typed after
+    the XLSForm types: numbers, dates, select multiples as lists of choices
+    and their split choices as booleans (or 0/1 integers). Everything else is
+    a string. Values which do not match their type are written as nulls, and
+    logged as a warning when the file is closed.
+
+    Rows are buffered per section and written as a row group once
+    `row_group_size` of them are buffered.
+    """
+
+    def __init__(self, row_group_size=PARQUET_ROW_GROUP_SIZE):
+        # Imported here rather than with the module, which every web and
+        # Celery process loads, while only Parquet exports need pyarrow
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.row_group_size = row_group_size
+        self.sections = {}
+        # XLSForm (bind) type: (Arrow type, converter)
+        self.column_types = {
+            'int': (pyarrow.int64(), _to_int),
+            'decimal': (pyarrow.float64(), _to_float),
+            'date': (pyarrow.date32(), _to_date),
+            'select': (pyarrow.list_(pyarrow.string()), _to_list),
+        }
+        self.extra_field_types = {
+            ID: (pyarrow.int64(), _to_int),
+            INDEX: (pyarrow.int64(), _to_int),
+            PARENT_INDEX: (pyarrow.int64(), _to_int),
+        }
+        self.string_type = (pyarrow.string(), _to_string)
+
+    def add_section(self, section, path):
+        """
+        Opens the Parquet file of `section`, an `ExportSectionPlan`, at
+        `path`
+        """
+        pyarrow = self.pyarrow
+        choices = set(choice for _, _, section_choices
+                      in section.select_multiples
+                      for choice in section_choices)
+        if section.binary_select_multiples:
+            choice_type = (pyarrow.int8(), _to_int)
+        else:
+            choice_type = (pyarrow.bool_(), _to_bool)
+
+        arrow_fields = []
+        converters = []
+        for header, field, xform_type in zip(
+                section.headers, section.fields, section.types):
+            if field in choices:
+                arrow_type, converter = choice_type
+            elif xform_type is None:
+                arrow_type, converter = self.extra_field_types.get(
+                    field, self.string_type)
+            else:
+                arrow_type, converter = self.column_types.get(
+                    xform_type, self.string_type)
+            arrow_fields.append(pyarrow.field(header, arrow_type))
+            converters.append(converter)
+
+        schema = pyarrow.schema(arrow_fields)
+        self.sections[section.name] = ParquetSectionFile(
+            section.fields, converters, schema,
+            pyarrow.parquet.ParquetWriter(path, schema))
+
+    def write_row(self, section_name, row):
+        section_file = self.sections[section_name]
+        get = row.get
+        for column, field in zip(section_file.columns, section_file.fields):
+            column.append(get(field))
+        section_file.row_count += 1
+        if section_file.row_count >= self.row_group_size:
+            self._write_row_group(section_file)
+
+    def _write_row_group(self, section_file):
+        pyarrow = self.pyarrow
+        arrays = []
+        for index, (column, converter, arrow_field) in enumerate(zip(
+                section_file.columns, section_file.converters,
+                section_file.schema)):
+            values = []
+            for value in column:
+                converted = converter(value)
+                if converted is None and value not in (None, ''):
+                    section_file.invalid_counts[index] += 1
+                values.append(converted)
+            arrays.append(pyarrow.array(values, type=arrow_field.type))
+        section_file.writer.write_table(pyarrow.Table.from_arrays(
+            arrays, schema=section_file.schema))
+        section_file.columns = [[] for _ in section_file.fields]
+        section_file.row_count = 0
+
+    def close(self):
+        for section_file in self.sections.values():
+            if section_file.row_count:
+                self._write_row_group(section_file)
+            section_file.writer.close()
+            for arrow_field, invalid_count in zip(
+                    section_file.schema, section_file.invalid_counts):
+                if invalid_count:
+                    logging.getLogger().warning(
+                        'StreamingParquetWriter - {} value(s) of column {} '
+                        'do not match its type ({}) and were written as '
+                        'nulls'.format(invalid_count, arrow_field.name,
+                                       arrow_field.type))
+
+
+class ExportSectionPlan(object):
+    """
+    What `ExportBuilder.pre_process_row()` does to the rows of one section,
+    compiled once: only the columns which need decoding, splitting or
+    converting are visited for each row.
+    """
+
+    def __init__(self, section, extra_fields, encoded_fields=None,
+                 select_multiples=None, gps_fields=None,
+                 binary_select_multiples=False):
+        self.name = section['name']
+        self.headers = [element['title'] for element in section['elements']]\
+            + extra_fields
+        self.fields = [element['xpath'] for element in section['elements']]\
+            + extra_fields
+        # XLSForm (bind) type of each field, `None` for the extra fields
+        self.types = [element['type'] for element in section['elements']]\
+            + [None] * len(extra_fields)
+        self.encoded_fields = list((encoded_fields or {}).items())
+        self.select_multiples = [
+            (xpath, xpath + '/', choices)
+            for xpath, choices in (select_multiples or {}).items()]
+        self.gps_fields = list((gps_fields or {}).items())
+        self.binary_select_multiples = binary_select_multiples
+        self.converters = [
+            (element['xpath'], ExportBuilder.CONVERT_FUNCS[element['type']])
+            for element in section['elements']
+            if element['type'] in ExportBuilder.TYPES_TO_CONVERT]
+
+    def process(self, row):
+        for xpath, encoded_xpath in self.encoded_fields:
+            if row.get(encoded_xpath):
+                row[xpath] = row.pop(encoded_xpath)
+
+        for xpath, prefix, choices in self.select_multiples:
+            data = row.get(xpath)
+            selections = set(
+                prefix + selection for selection in data.split()
+            ) if data else None
+            if self.binary_select_multiples:
+                for choice in choices:
+                    row[choice] = 1 if selections and choice in selections\
+                        else 0
+            else:
+                for choice in choices:
+                    row[choice] = choice in selections if selections\
+                        else None
+
+        for xpath, gps_components in self.gps_fields:
+            data = row.get(xpath)
+            if data:
+                row.update(zip(gps_components, data.split()))
+
+        for xpath, func in self.converters:
+            value = row.get(xpath)
+            if value is not None and value != '':
+                try:
+                    row[xpath] = func(value)
+                except ValueError:
+                    pass
+
+        return row
+
+
+class ExportPlan(object):
+    """
+    Flattens submissions into the rows of each section, as
+    `dict_to_joined_export()` and `ExportBuilder.pre_process_row()` do, with
+    everything that only depends on the form computed once.
+    """
+
+    def __init__(self, survey_name, sections):
+        self.survey_name = survey_name
+        self.sections = sections
+        self._section_names = set(section.name for section in sections)
+        # Mongo key of a list: name of its section, `None` if it has none
+        self._routes = {}
+
+    def get_section_name(self, key):
+        """
+        Returns the name of the section whose rows are stored under `key` in
+        Mongo, or `None`
+        """
+        try:
+            return self._routes[key]
+        except KeyError:
+            section_name = MongoHelper.decode(key)
+            if section_name not in self._section_names:
+                section_name = None
+            self._routes[key] = section_name
+            return section_name
+
+    def _flatten(self, data, row, name, index, indices, tables):
+        for key, val in data.iteritems():
+            if isinstance(val, list) and key not in (NOTES, TAGS):
+                section_name = self.get_section_name(key)
+                for child in val:
+                    child_index = indices.get(key, 0) + 1
+                    indices[key] = child_index
+                    child_row = {INDEX: child_index, PARENT_INDEX: index,
+                                 PARENT_TABLE_NAME: name}
+                    if isinstance(child, dict):
+                        self._flatten(child, child_row, key, child_index,
+                                      indices, tables)
+                    if section_name is not None:
+                        tables.setdefault(section_name, []).append(child_row)
+            elif key == TAGS:
+                row[key] = ",".join(val)
+            elif key == NOTES:
+                row[key] = "\r\n".join([v['note'] for v in val])
+            else:
+                row[key] = val
+
+    def iter_rows(self, data, index, indices):
+        """
+        Yields `(section plan, row)` for each row of the submission `data`,
+        section by section. `index` is the `_index` of the submission and
+        `indices` holds the last `_index` of each repeat, across submissions.
+        """
+        main_row = {}
+        tables = {}
+        self._flatten(data, main_row, self.survey_name, index, indices,
+                      tables)
+        main_row[INDEX] = index
+        main_row[PARENT_INDEX] = -1
+        tables[self.survey_name] = [main_row]
+
+        for section in self.sections:
+            for row in tables.get(section.name, ()):
+                yield section, section.process(row)
+
+
 class ExportBuilder(object):
     IGNORED_COLUMNS = [XFORM_ID_STRING, STATUS, ATTACHMENTS, GEOLOCATION,
                        DELETEDAT]
@@ -200,6 +581,8 @@ class ExportBuilder(object):
     }
 
     XLS_SHEET_NAME_MAX_CHARS = 31
+    XLSX_MAX_ROWS = XLSX_MAX_ROWS
+    PARQUET_ROW_GROUP_SIZE = PARQUET_ROW_GROUP_SIZE
 
     @classmethod
     def string_to_date_with_xls_validation(cls, date_str):
@@ -320,6 +703,24 @@ class ExportBuilder(object):
             main_section, self.survey, self.sections,
             self.select_multiples, self.gps_fields, self.encoded_fields,
             self.GROUP_DELIMITER)
+        self.export_plan = self.compile_export_plan()
+
+    def compile_export_plan(self):
+        sections = []
+        for section in self.sections:
+            section_name = section['name']
+            sections.append(ExportSectionPlan(
+                section,
+                self.EXTRA_FIELDS,
+                encoded_fields=self.encoded_fields.get(section_name),
+                select_multiples=self.select_multiples.get(section_name)
+                if self.SPLIT_SELECT_MULTIPLES else None,
+                gps_fields=self.gps_fields.get(section_name),
+                # Like `pre_process_row()`, which calls the class method
+                # `split_select_multiples()`
+                binary_select_multiples=ExportBuilder.BINARY_SELECT_MULTIPLES,
+            ))
+        return ExportPlan(self.survey.name, sections)
 
     def section_by_name(self, name):
         matches = filter(lambda s: s['name'] == name, self.sections)
@@ -419,61 +820,43 @@ class ExportBuilder(object):
 
         return row
 
+    def iter_rows(self, data):
+        """
+        Yields `(section plan, row)` for the rows of all the submissions in
+        `data`
+        """
+        indices = {}
+        for index, d in enumerate(data, 1):
+            for section_row in self.export_plan.iter_rows(d, index, indices):
+                yield section_row
+
     def to_zipped_csv(self, path, data, *args):
-        def write_row(row, csv_writer, fields):
-            csv_writer.writerow(
-                [encode_if_str(row, field) for field in fields])
+        self.write_zipped_csv(path, self.iter_rows(data))
 
+    def write_zipped_csv(self, path, rows, previous_rows=None):
+        """
+        Writes a CSV ZIP export of `rows`, `(section plan, row)` pairs, to
+        `path`. `previous_rows` are optional `(section plan, values)` pairs
+        read from another CSV ZIP export, written as they are before `rows`.
+        """
         csv_defs = {}
-        for section in self.sections:
+        for section in self.export_plan.sections:
             csv_file = NamedTemporaryFile(suffix=".csv")
             csv_writer = csv.writer(csv_file)
-            csv_defs[section['name']] = {
+            csv_defs[section.name] = {
                 'csv_file': csv_file, 'csv_writer': csv_writer}
 
         # write headers
-        for section in self.sections:
-            fields = [element['title'] for element in section['elements']]\
-                + self.EXTRA_FIELDS
-            csv_defs[section['name']]['csv_writer'].writerow(
-                [f.encode('utf-8') for f in fields])
+        for section in self.export_plan.sections:
+            csv_defs[section.name]['csv_writer'].writerow(
+                [f.encode('utf-8') for f in section.headers])
 
-        index = 1
-        indices = {}
-        survey_name = self.survey.name
-        for d in data:
-            # decode mongo section names
-            joined_export = dict_to_joined_export(d, index, indices,
-                                                  survey_name)
-            output = ExportBuilder.decode_mongo_encoded_section_names(
-                joined_export)
-            # attach meta fields (index, parent_index, parent_table)
-            # output has keys for every section
-            if survey_name not in output:
-                output[survey_name] = {}
-            output[survey_name][INDEX] = index
-            output[survey_name][PARENT_INDEX] = -1
-            for section in self.sections:
-                # get data for this section and write to csv
-                section_name = section['name']
-                csv_def = csv_defs[section_name]
-                fields = [
-                    element['xpath'] for element in
-                    section['elements']] + self.EXTRA_FIELDS
-                csv_writer = csv_def['csv_writer']
-                # section name might not exist within the output, e.g. data was
-                # not provided for said repeat - write test to check this
-                row = output.get(section_name, None)
-                if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        csv_writer, fields)
-                elif type(row) == list:
-                    for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            csv_writer, fields)
-            index += 1
+        for section, values in previous_rows or ():
+            csv_defs[section.name]['csv_writer'].writerow(values)
+
+        for section, row in rows:
+            csv_defs[section.name]['csv_writer'].writerow(
+                [encode_if_str(row, field) for field in section.fields])
 
         # write zipfile
         with ZipFile(path, 'w') as zip_file:
@@ -510,71 +893,18 @@ class ExportBuilder(object):
         return generated_name
 
     def to_xls_export(self, path, data, *args):
-        def write_row(data, work_sheet, fields, work_sheet_titles):
-            # update parent_table with the generated sheet's title
-            data[PARENT_TABLE_NAME] = work_sheet_titles.get(
-                data.get(PARENT_TABLE_NAME))
-            work_sheet.append([data.get(f) for f in fields])
-
-        wb = Workbook(optimized_write=True)
-        work_sheets = {}
-        # map of section_names to generated_names
-        work_sheet_titles = {}
-        for section in self.sections:
-            section_name = section['name']
-            work_sheet_title = ExportBuilder.get_valid_sheet_name(
-                "_".join(section_name.split("/")), work_sheet_titles.values())
-            work_sheet_titles[section_name] = work_sheet_title
-            work_sheets[section_name] = wb.create_sheet(
-                title=work_sheet_title)
+        self.write_xls(path, self.iter_rows(data))
 
-        # write the headers
-        for section in self.sections:
-            section_name = section['name']
-            headers = [
-                element['title'] for element in
-                section['elements']] + self.EXTRA_FIELDS
-            # get the worksheet
-            ws = work_sheets[section_name]
-            ws.append(headers)
+    def write_xls(self, path, rows):
+        xlsx_writer = StreamingXLSXWriter(path, self.XLSX_MAX_ROWS)
+        for section in self.export_plan.sections:
+            xlsx_writer.add_section(
+                section.name, section.headers, section.fields)
 
-        index = 1
-        indices = {}
-        survey_name = self.survey.name
-        for d in data:
-            joined_export = dict_to_joined_export(d, index, indices,
-                                                  survey_name)
-            output = ExportBuilder.decode_mongo_encoded_section_names(
-                joined_export)
-            # attach meta fields (index, parent_index, parent_table)
-            # output has keys for every section
-            if survey_name not in output:
-                output[survey_name] = {}
-            output[survey_name][INDEX] = index
-            output[survey_name][PARENT_INDEX] = -1
-            for section in self.sections:
-                # get data for this section and write to xls
-                section_name = section['name']
-                fields = [
-                    element['xpath'] for element in
-                    section['elements']] + self.EXTRA_FIELDS
-
-                ws = work_sheets[section_name]
-                # section might not exist within the output, e.g. data was
-                # not provided for said repeat - write test to check this
-                row = output.get(section_name, None)
-                if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        ws, fields, work_sheet_titles)
-                elif type(row) == list:
-                    for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            ws, fields, work_sheet_titles)
-            index += 1
-
-        wb.save(filename=path)
+        for section, row in rows:
+            xlsx_writer.write_row(section.name, row)
+
+        xlsx_writer.save()
 
     def to_flat_csv_export(
             self, path, data, username, id_string, filter_query):
@@ -589,10 +919,9 @@ class ExportBuilder(object):
         csv_builder.export_to(path)
 
     def to_zipped_sav(self, path, data, *args):
-        def write_row(row, csv_writer, fields):
-            sav_writer.writerow(
-                [encode_if_str(row, field, True) for field in fields])
+        self.write_zipped_sav(path, self.iter_rows(data))
 
+    def write_zipped_sav(self, path, rows):
         sav_defs = {}
 
         # write headers
@@ -625,40 +954,9 @@ class ExportBuilder(object):
             sav_defs[section['name']] = {
                 'sav_file': sav_file, 'sav_writer': sav_writer}
 
-        index = 1
-        indices = {}
-        survey_name = self.survey.name
-        for d in data:
-            # decode mongo section names
-            joined_export = dict_to_joined_export(d, index, indices,
-                                                  survey_name)
-            output = ExportBuilder.decode_mongo_encoded_section_names(
-                joined_export)
-            # attach meta fields (index, parent_index, parent_table)
-            # output has keys for every section
-            if survey_name not in output:
-                output[survey_name] = {}
-            output[survey_name][INDEX] = index
-            output[survey_name][PARENT_INDEX] = -1
-            for section in self.sections:
-                # get data for this section and write to csv
-                section_name = section['name']
-                sav_def = sav_defs[section_name]
-                fields = [
-                    element['xpath'] for element in
-                    section['elements']] + self.EXTRA_FIELDS
-                sav_writer = sav_def['sav_writer']
-                row = output.get(section_name, None)
-                if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        sav_writer, fields)
-                elif type(row) == list:
-                    for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            sav_writer, fields)
-            index += 1
+        for section, row in rows:
+            sav_defs[section.name]['sav_writer'].writerow(
+                [encode_if_str(row, field, True) for field in section.fields])
 
         for section_name, sav_def in sav_defs.iteritems():
             sav_def['sav_writer'].closeSavFile(
@@ -676,11 +974,54 @@ class ExportBuilder(object):
         for section_name, sav_def in sav_defs.iteritems():
             sav_def['sav_file'].close()
 
+    def to_zipped_parquet(self, path, data, *args):
+        self.write_zipped_parquet(path, self.iter_rows(data))
+
+    def write_zipped_parquet(self, path, rows):
+        parquet_writer = StreamingParquetWriter(self.PARQUET_ROW_GROUP_SIZE)
+        parquet_files = {}
+        try:
+            for section in self.export_plan.sections:
+                parquet_file = NamedTemporaryFile(suffix=".parquet")
+                parquet_files[section.name] = parquet_file
+                parquet_writer.add_section(section, parquet_file.name)
+
+            for section, row in rows:
+                parquet_writer.write_row(section.name, row)
+            parquet_writer.close()
+
+            # write zipfile
+            with ZipFile(path, 'w') as zip_file:
+                for section_name, parquet_file in parquet_files.iteritems():
+                    zip_file.write(
+                        parquet_file.name,
+                        "_".join(section_name.split("/")) + ".parquet")
+        finally:
+            # close files when we are done
+            for parquet_file in parquet_files.itervalues():
+                parquet_file.close()
+
 
 def dict_to_flat_export(d, parent_index=0):
     pass
 
 
+def get_export_builder(xform, group_delimiter='/',
+                       split_select_multiples=True,
+                       binary_select_multiples=False):
+    export_builder = ExportBuilder()
+    export_builder.GROUP_DELIMITER = group_delimiter
+    export_builder.SPLIT_SELECT_MULTIPLES = split_select_multiples
+    export_builder.BINARY_SELECT_MULTIPLES = binary_select_multiples
+    export_builder.set_survey(xform.data_dictionary().survey)
+    return export_builder
+
+
+def get_export_temp_file(export_type, extension, username, id_string):
+    prefix = slugify('{}_export__{}__{}'.format(export_type, username, id_string))
+    return NamedTemporaryFile(prefix=prefix, suffix=("." + extension))
+
+
 def generate_export(export_type, extension, username, id_string,
                     export_id=None, filter_query=None, group_delimiter='/',
                     split_select_multiples=True,
@@ -694,6 +1035,7 @@ def generate_export(export_type, extension, username, id_string,
         Export.CSV_EXPORT: 'to_flat_csv_export',
         Export.CSV_ZIP_EXPORT: 'to_zipped_csv',
         Export.SAV_ZIP_EXPORT: 'to_zipped_sav',
+        Export.PARQUET_EXPORT: 'to_zipped_parquet',
     }
 
     xform = XForm.objects.get(
@@ -702,14 +1044,12 @@ def generate_export(export_type, extension, username, id_string,
     # query mongo for the cursor
     records = query_mongo(username, id_string, filter_query)
 
-    export_builder = ExportBuilder()
-    export_builder.GROUP_DELIMITER = group_delimiter
-    export_builder.SPLIT_SELECT_MULTIPLES = split_select_multiples
-    export_builder.BINARY_SELECT_MULTIPLES = binary_select_multiples
-    export_builder.set_survey(xform.data_dictionary().survey)
+    export_builder = get_export_builder(
+        xform, group_delimiter, split_select_multiples,
+        binary_select_multiples)
 
-    prefix = slugify('{}_export__{}__{}'.format(export_type, username, id_string))
-    temp_file = NamedTemporaryFile(prefix=prefix, suffix=("." + extension))
+    temp_file = get_export_temp_file(export_type, extension, username,
+                                     id_string)
 
     # get the export function by export type
     func = getattr(export_builder, export_type_func_map[export_type])
@@ -717,6 +1057,16 @@ def generate_export(export_type, extension, username, id_string,
     func.__call__(
         temp_file.name, records, username, id_string, filter_query)
 
+    return save_export_file(xform, export_type, extension, username,
+                            id_string, temp_file, export_id, filter_query)
+
+
+def save_export_file(xform, export_type, extension, username, id_string,
+                     temp_file, export_id=None, filter_query=None):
+    """
+    Moves the generated `temp_file` to the storage and updates (or creates)
+    the `Export`
+    """
     # generate filename
     basename = "%s_%s" % (
         id_string, datetime.now().strftime("%Y_%m_%d_%H_%M_%S"))
@@ -758,7 +1108,13 @@ def generate_export(export_type, extension, username, id_string,
     return export
 
 
-def query_mongo(username, id_string, query=None, hide_deleted=True):
+def query_mongo(username, id_string, query=None, hide_deleted=True,
+                after_id=None, last_id=None):
+    """
+    Returns a cursor over the submissions of a form. If `after_id` or
+    `last_id` is given, only the submissions with `after_id < _id <= last_id`
+    are returned, sorted by `_id`.
+    """
     query = json.loads(query, object_hook=json_util.object_hook)\
         if query else {}
     query = MongoHelper.to_safe_dict(query)
@@ -767,7 +1123,18 @@ def query_mongo(username, id_string, query=None, hide_deleted=True):
         # display only active elements
         # join existing query with deleted_at_query on an $and
         query = {"$and": [query, {"_deleted_at": None}]}
-    return xform_instances.find(query, max_time_ms=settings.MONGO_DB_MAX_TIME_MS)
+    if after_id is None and last_id is None:
+        return xform_instances.find(
+            query, max_time_ms=settings.MONGO_DB_MAX_TIME_MS)
+
+    id_query = {}
+    if after_id is not None:
+        id_query['$gt'] = after_id
+    if last_id is not None:
+        id_query['$lte'] = last_id
+    query = {"$and": [query, {ID: id_query}]}
+    return xform_instances.find(
+        query, max_time_ms=settings.MONGO_DB_MAX_TIME_MS).sort(ID, 1)
 
 
 def should_create_new_export(xform, export_type):
@@ -807,11 +1174,20 @@ def increment_index_in_filename(filename):
     return new_filename
 
 
+def get_zipped_attachments(xform):
+    """
+    Returns the attachments of `xform` in the order they are zipped, with
+    only what `iter_attachments_zip()` needs.
+    """
+    return Attachment.objects.filter(instance__xform=xform).only(
+        'media_file', 'media_file_size', 'mimetype').order_by('pk')
+
+
 def generate_attachments_zip_export(
         export_type, extension, username, id_string, export_id=None,
         filter_query=None):
     xform = XForm.objects.get(user__username=username, id_string=id_string)
-    attachments = Attachment.objects.filter(instance__xform=xform)
+    attachments = get_zipped_attachments(xform).iterator()
     basename = "%s_%s" % (id_string,
                           datetime.now().strftime("%Y_%m_%d_%H_%M_%S"))
     filename = basename + "." + extension
@@ -0,0 +1,50 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from hashlib import md5
+
+from django.conf import settings
+
+from onadata.libs.utils.schema_cache import SizedLRUCache
+
+
+# Upper bound (in bytes) of the formList and manifest data kept in memory by
+# each process. The size of an entry is approximated by the length of its
+# representation.
+DEFAULT_FORM_LIST_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+class FormListCache(object):
+    """
+    Process-wide cache of the serialized ODK formList and manifest data.
+
+    Entries are keyed by what a response depends on besides the database,
+    e.g. the user and the host of the absolute URLs, and versioned by a
+    fingerprint of the rows it is rendered from, e.g. the forms the user
+    can see and their latest `date_modified`. Computing the fingerprint
+    costs a single narrow query; a stale entry is replaced on the next miss.
+
+    The key and the version also give the `ETag` of the response.
+    """
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = getattr(settings, 'FORM_LIST_CACHE_MAX_BYTES',
+                                DEFAULT_FORM_LIST_CACHE_MAX_BYTES)
+        self._cache = SizedLRUCache(max_bytes)
+
+    @staticmethod
+    def get_etag(key, version):
+        return md5(repr((key, version)).encode('utf-8')).hexdigest()
+
+    def get(self, key, version):
+        return self._cache.get(key, version)
+
+    def set(self, key, version, data):
+        self._cache.set(key, version, data, len(repr(data)))
+
+    def clear(self):
+        self._cache.clear()
+
+
+form_list_cache = FormListCache()
@@ -5,7 +5,6 @@ from cStringIO import StringIO
 from tempfile import NamedTemporaryFile
 
 from PIL import Image
-import requests
 
 from django.conf import settings
 from django.core.files.storage import get_storage_class
@@ -66,30 +65,55 @@ def _save_thumbnails(image, original_path, size, suffix):
     nm.close()
 
 
+def get_thumbnail_sizes():
+    """
+    Returns the sizes of the `THUMB_CONF` variants, as recorded in
+    `Attachment.thumbnails` once they are generated
+    """
+    return dict((key, conf['size'])
+                for key, conf in settings.THUMB_CONF.items())
+
+
 def resize(filename):
+    """
+    Generates the `THUMB_CONF` variants of the image `filename`, from the
+    largest to the smallest, each one downscaled from the previous one.
+    Returns their sizes, or `None` if the image could not be read.
+    """
     default_storage = get_storage_class()()
-    is_local = default_storage.__class__.__name__ == 'FileSystemStorage'
-    image = None
-    original_path = None
-
-    if is_local:
-        path = default_storage.path(filename)
-        image = Image.open(path)
-        original_path = path
-    else:
-        path = default_storage.url(filename)
-        original_path = filename
-        req = requests.get(path)
-        if req.status_code == 200:
-            im = StringIO(req.content)
-            image = Image.open(im)
-
-    if image:
-        conf = settings.THUMB_CONF
-        [_save_thumbnails(
-            image, original_path,
+    # Read through the storage instead of downloading its URL
+    with default_storage.open(filename, 'rb') as image_file:
+        image = Image.open(StringIO(image_file.read()))
+
+    conf = settings.THUMB_CONF
+    for key in settings.THUMB_ORDER:
+        _save_thumbnails(
+            image, filename,
             conf[key]['size'],
-            conf[key]['suffix']) for key in settings.THUMB_ORDER]
+            conf[key]['suffix'])
+
+    return get_thumbnail_sizes()
+
+
+def generate_thumbnails(attachment):
+    """
+    Generates the thumbnails of `attachment` and records them in
+    `Attachment.thumbnails`, which lets `image_url()` return their URLs
+    without querying the storage
+    """
+    thumbnails = resize(attachment.media_file.name)
+    type(attachment).objects.filter(pk=attachment.pk).update(
+        thumbnails=thumbnails)
+    attachment.thumbnails = thumbnails
+
+
+def has_thumbnail(attachment, suffix):
+    """
+    Returns whether the thumbnail `suffix` of `attachment` has been generated
+    with its current `THUMB_CONF` size
+    """
+    return (attachment.thumbnails or {}).get(suffix) == \
+        settings.THUMB_CONF[suffix]['size']
 
 
 def image_url(attachment, suffix):
@@ -105,13 +129,17 @@ def image_url(attachment, suffix):
         if suffix in settings.THUMB_CONF:
             size = settings.THUMB_CONF[suffix]['suffix']
             filename = attachment.media_file.name
+            if has_thumbnail(attachment, suffix):
+                return default_storage.url(get_path(filename, size))
+            # Uploaded before thumbnails were recorded, or still being
+            # generated
             if default_storage.exists(filename):
                 if default_storage.exists(get_path(filename, size)) and \
                         default_storage.size(get_path(filename, size)) > 0:
                     url = default_storage.url(
                         get_path(filename, size))
                 else:
-                    resize(filename)
+                    generate_thumbnails(attachment)
                     return image_url(attachment, suffix)
             else:
                 return None
@@ -0,0 +1,276 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import csv
+import json
+import shutil
+from zipfile import ZipFile
+
+from django.conf import settings
+from django.core.files.storage import get_storage_class
+from django.core.files.temp import NamedTemporaryFile
+from django.db.models import Q
+from django.utils import timezone
+
+from onadata.apps.logger.models import Instance, Note, XForm
+from onadata.apps.viewer.models.export import Export
+from onadata.apps.viewer.pandas_mongo_bridge import CSVDataFrameBuilder
+from onadata.libs.exceptions import NoRecordsFoundError
+from onadata.libs.utils.common_tags import ID, NA_REP, USERFORM_ID
+from onadata.libs.utils.export_tools import (
+    get_export_builder,
+    get_export_temp_file,
+    query_mongo,
+    save_export_file,
+    xform_instances,
+)
+from onadata.libs.utils.sharded_export import offset_row_indices
+
+
+# Export type: file extension
+INCREMENTAL_EXPORT_TYPES = {
+    Export.CSV_EXPORT: 'csv',
+    Export.CSV_ZIP_EXPORT: 'zip',
+}
+
+
+def is_incremental_export(export_type, filter_query=None):
+    return getattr(settings, 'INCREMENTAL_EXPORTS', False) \
+        and export_type in INCREMENTAL_EXPORT_TYPES and filter_query is None
+
+
+def get_last_submission_id(username, id_string):
+    """
+    Returns the highest `_id` of the form's submissions in MongoDB, deleted
+    ones included, or `None` if there are none
+    """
+    cursor = xform_instances.find(
+        {USERFORM_ID: '{0}_{1}'.format(username, id_string)}, {ID: 1}
+    ).sort(ID, -1).limit(1)
+    for record in cursor:
+        return record[ID]
+    return None
+
+
+def count_exported_submissions(username, id_string, last_id):
+    """
+    Returns how many submissions an export of the submissions up to
+    `last_id` contains if it is generated now
+    """
+    return query_mongo(username, id_string, last_id=last_id).count()
+
+
+def get_appendable_export(xform, export_type, options):
+    """
+    Returns the latest export of `xform` that new submissions can be appended
+    to: generated incrementally with the same `options`, and none of its
+    submissions edited or deleted since. `None` if there is none.
+    """
+    try:
+        export = Export.objects.filter(
+            xform=xform, export_type=export_type,
+            internal_status=Export.SUCCESSFUL,
+            last_exported_id__isnull=False,
+            exported_on__isnull=False,
+        ).latest('created_on')
+    except Export.DoesNotExist:
+        return None
+
+    if export.export_options != options or not export.filepath:
+        return None
+
+    # Hard deletions and submissions which reached MongoDB late are caught
+    # by comparing the number of submissions, see `_append_to_export()`
+    exported_instances = Instance.objects.filter(
+        xform_id=xform.pk, pk__lte=export.last_exported_id)
+    if exported_instances.filter(
+            Q(date_modified__gt=export.exported_on) |
+            Q(deleted_at__gt=export.exported_on)).exists():
+        return None
+    if Note.objects.filter(
+            instance__in=exported_instances,
+            date_modified__gt=export.exported_on).exists():
+        return None
+
+    return export
+
+
+def generate_incremental_export(export_type, username, id_string,
+                                export_id=None, group_delimiter='/',
+                                split_select_multiples=True,
+                                binary_select_multiples=False):
+    """
+    Generates an unfiltered CSV or CSV ZIP export like `generate_export()`.
+    If the previous export is still valid, its file is copied and only the
+    newer submissions are exported after its rows; otherwise all submissions
+    are exported.
+    """
+    xform = XForm.objects.get(
+        user__username__iexact=username, id_string__exact=id_string)
+    options = {
+        'group_delimiter': group_delimiter,
+        'split_select_multiples': split_select_multiples,
+        'binary_select_multiples': binary_select_multiples,
+    }
+    extension = INCREMENTAL_EXPORT_TYPES[export_type]
+
+    # Submissions changed after this are changed after we read them
+    exported_on = timezone.now()
+    # Submissions received while exporting are left to the next export
+    last_id = get_last_submission_id(username, id_string)
+
+    temp_file = get_export_temp_file(export_type, extension, username,
+                                     id_string)
+    previous_export = get_appendable_export(xform, export_type, options)
+    if previous_export is None or not _append_to_export(
+            previous_export, temp_file.name, xform, username, id_string,
+            last_id, options):
+        _write_export(export_type, temp_file.name, xform, username,
+                      id_string, last_id, options)
+
+    export = save_export_file(xform, export_type, extension, username,
+                              id_string, temp_file, export_id)
+    export.last_exported_id = last_id
+    export.exported_on = exported_on
+    export.export_options = options
+    export.save()
+    return export
+
+
+def _write_export(export_type, path, xform, username, id_string, last_id,
+                  options):
+    if export_type == Export.CSV_ZIP_EXPORT:
+        export_builder = get_export_builder(xform, **options)
+        records = query_mongo(username, id_string, last_id=last_id)
+        export_builder.to_zipped_csv(path, records)
+    else:
+        # Raises `NoRecordsFoundError` as `generate_export()` does when the
+        # form has no submissions
+        _write_flat_csv(path, username, id_string, None, last_id, options)
+
+
+def _write_flat_csv(path, username, id_string, after_id, last_id, options):
+    id_query = {'$lte': last_id}
+    if after_id is not None:
+        id_query['$gt'] = after_id
+    csv_builder = CSVDataFrameBuilder(
+        username, id_string, json.dumps({ID: id_query}),
+        options['group_delimiter'], options['split_select_multiples'],
+        options['binary_select_multiples'])
+    csv_builder.export_to(path)
+
+
+def _append_to_export(previous_export, path, xform, username, id_string,
+                      last_id, options):
+    """
+    Writes the file of `previous_export` followed by the submissions received
+    after it to `path`. Returns `False`, with nothing valid written, if the
+    previous file cannot be reused.
+    """
+    after_id = previous_export.last_exported_id
+    storage = get_storage_class()()
+    with NamedTemporaryFile(suffix='.' + INCREMENTAL_EXPORT_TYPES[
+            previous_export.export_type]) as previous_file:
+        # `ZipFile` needs to seek, which remote storages may not allow
+        with storage.open(previous_export.filepath, 'rb') as storage_file:
+            shutil.copyfileobj(storage_file, previous_file)
+        previous_file.flush()
+        previous_file.seek(0)
+
+        if previous_export.export_type == Export.CSV_ZIP_EXPORT:
+            export_builder = get_export_builder(xform, **options)
+            records = query_mongo(username, id_string, after_id=after_id,
+                                  last_id=last_id)
+            exported_count = append_to_zipped_csv(
+                export_builder, previous_file, records, path)
+        else:
+            with NamedTemporaryFile(suffix='.csv') as new_file:
+                try:
+                    _write_flat_csv(new_file.name, username, id_string,
+                                    after_id, last_id, options)
+                except NoRecordsFoundError:
+                    # Nothing new, `new_file` stays empty
+                    pass
+                exported_count = append_to_flat_csv(previous_file, new_file,
+                                                    path)
+
+    return exported_count is not None and exported_count == \
+        count_exported_submissions(username, id_string, after_id)
+
+
+def append_to_zipped_csv(export_builder, previous_file, records, path):
+    """
+    Writes a CSV ZIP export to `path` with the rows of `previous_file`, a CSV
+    ZIP export with the same sections and columns, followed by the rows of
+    `records`.
+
+    Returns the number of submissions in `previous_file`, or `None` if its
+    sections or columns are not the ones of `export_builder`.
+    """
+    export_plan = export_builder.export_plan
+    filenames = dict(
+        (section.name, "_".join(section.name.split("/")) + ".csv")
+        for section in export_plan.sections)
+    offsets = {}
+    with ZipFile(previous_file) as previous_zip:
+        if sorted(previous_zip.namelist()) != sorted(filenames.values()):
+            return None
+        for section in export_plan.sections:
+            csv_reader = csv.reader(previous_zip.open(filenames[section.name]))
+            headers = [f.encode('utf-8') for f in section.headers]
+            if next(csv_reader, None) != headers:
+                return None
+
+        def iter_previous_rows():
+            for section in export_plan.sections:
+                csv_reader = csv.reader(
+                    previous_zip.open(filenames[section.name]))
+                next(csv_reader)
+                count = 0
+                for row in csv_reader:
+                    yield section, row
+                    count += 1
+                offsets[section.name] = count
+
+        # The previous rows are all written, and counted, before the new ones
+        rows = offset_row_indices(
+            export_plan, export_builder.iter_rows(records), offsets)
+        export_builder.write_zipped_csv(path, rows,
+                                        previous_rows=iter_previous_rows())
+
+    return offsets[export_plan.survey_name]
+
+
+def append_to_flat_csv(previous_file, new_file, path):
+    """
+    Writes a CSV export to `path` with the rows of `previous_file` followed by
+    the rows of `new_file`, both CSV exports, in the columns of
+    `previous_file`. `new_file` may be empty.
+
+    Returns the number of submissions in `previous_file`, or `None` if
+    `new_file` has columns `previous_file` does not have, e.g. for a repeat
+    answered more often than in any previous submission.
+    """
+    previous_reader = csv.reader(previous_file)
+    headers = next(previous_reader, None)
+    new_reader = csv.reader(new_file)
+    new_headers = next(new_reader, None)
+    if headers is None or (
+            new_headers is not None and not set(new_headers) <= set(headers)):
+        return None
+
+    na_rep = getattr(settings, 'NA_REP', NA_REP).encode('utf-8')
+    count = 0
+    with open(path, 'wb') as csv_file:
+        # Same line terminator as `CSVDataFrameBuilder.export_to()`
+        csv_writer = csv.writer(csv_file, lineterminator=str('\n'))
+        csv_writer.writerow(headers)
+        for row in previous_reader:
+            csv_writer.writerow(row)
+            count += 1
+        if new_headers is not None:
+            for row in new_reader:
+                values = dict(zip(new_headers, row))
+                csv_writer.writerow(
+                    [values.get(header, na_rep) for header in headers])
+    return count
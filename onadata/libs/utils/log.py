@@ -2,6 +2,10 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
 import logging
 from datetime import datetime
+
+from django.conf import settings
+
+from onadata.libs.utils.audit_log_writer import AuditLogWriter
 from onadata.libs.utils.viewer_tools import get_client_ip
 
 
@@ -56,10 +60,18 @@ Actions = Enum(
 
 
 class AuditLogHandler(logging.Handler):
+    """
+    Saves audit log records to `model`, from a background thread unless
+    `asynchronous` (`AUDIT_LOG_ASYNC` by default) is `False`
+    """
 
-    def __init__(self, model=""):
+    def __init__(self, model="", asynchronous=None):
         super(AuditLogHandler, self).__init__()
         self.model_name = model
+        if asynchronous is None:
+            asynchronous = getattr(settings, 'AUDIT_LOG_ASYNC', True)
+        self.writer = AuditLogWriter(self.write_records) if asynchronous \
+            else None
 
     def _format(self, record):
         data = {
@@ -80,7 +92,8 @@ class AuditLogHandler(logging.Handler):
             'thread': record.thread,
             'name': record.name,
             'threadName': record.threadName,
-            'exc_info': record.exc_info,
+            # A traceback cannot be encoded to BSON, only its text
+            'exc_info': self._format_exc_info(record),
             'pathname': record.pathname,
             'exc_text': record.exc_text,
             'lineno': record.lineno,
@@ -93,8 +106,18 @@ class AuditLogHandler(logging.Handler):
             data['audit'] = record.audit
         return data
 
+    def _format_exc_info(self, record):
+        if not record.exc_info:
+            return None
+        formatter = self.formatter or logging.Formatter()
+        return formatter.formatException(record.exc_info)
+
     def emit(self, record):
         data = self._format(record)
+        if self.writer is not None:
+            # Dropped if the buffer is full, see `AuditLogWriter`
+            self.writer.put(data)
+            return
         # save to mongodb audit_log
         try:
             model = self.get_model(self.model_name)
@@ -104,12 +127,37 @@ class AuditLogHandler(logging.Handler):
             log_entry = model(data)
             log_entry.save()
 
+    def write_records(self, records):
+        # save to mongodb audit_log
+        try:
+            model = self.get_model(self.model_name)
+        except:
+            pass
+        else:
+            model.insert_many(records)
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        self.flush()
+        super(AuditLogHandler, self).close()
+
     def get_model(self, name):
         names = name.split('.')
         mod = __import__('.'.join(names[:-1]), fromlist=names[-1:])
         return getattr(mod, names[-1])
 
 
+def flush_audit_log():
+    """
+    Writes the audit log records buffered by this process
+    """
+    for handler in logging.getLogger("audit_logger").handlers:
+        handler.flush()
+
+
 def audit_log(action, request_user, account_user, message, audit, request,
               level=logging.DEBUG):
     """
@@ -51,6 +51,7 @@ from onadata.apps.logger.xform_instance_parser import (
     InstanceInvalidUserError,
     InstanceMultipleNodeError,
     DuplicateInstance,
+    SubmissionContext,
     clean_and_parse_xml,
     get_uuid_from_xml,
     get_deprecated_uuid_from_xml,
@@ -60,6 +61,8 @@ from onadata.apps.viewer.models.parsed_instance import _remove_from_mongo,\
     xform_instances, ParsedInstance
 from onadata.libs.utils import common_tags
 from onadata.libs.utils.model_tools import queryset_iterator, set_uuid
+from onadata.libs.utils.permission_cache import xform_permission_cache
+from onadata.libs.utils.remongo import MongoRebuild
 
 
 OPEN_ROSA_VERSION_HEADER = 'X-OpenRosa-Version'
@@ -75,15 +78,21 @@ mongo_instances = settings.MONGO_DB.instances
 
 
 def _get_instance(xml, new_uuid, submitted_by, status, xform,
-                  defer_counting=False):
+                  defer_counting=False, submission_context=None):
     """
     `defer_counting=False` will set a Python-only attribute of the same name on
     the *new* `Instance` if one is created. This will prevent
     `update_xform_submission_count()` from doing anything, which avoids locking
     any rows in `logger_xform` or `main_userprofile`.
+
+    `submission_context` is attached to the returned `Instance` so that saving
+    it does not parse `xml` again.
     """
     # check if its an edit submission
-    old_uuid = get_deprecated_uuid_from_xml(xml)
+    if submission_context is not None:
+        old_uuid = submission_context.deprecated_uuid
+    else:
+        old_uuid = get_deprecated_uuid_from_xml(xml)
     instances = Instance.objects.filter(uuid=old_uuid)
 
     if instances:
@@ -93,6 +102,7 @@ def _get_instance(xml, new_uuid, submitted_by, status, xform,
         InstanceHistory.objects.create(
             xml=instance.xml, xform_instance=instance, uuid=old_uuid)
         instance.xml = xml
+        instance.submission_context = submission_context
         instance._populate_xml_hash()
         instance.uuid = new_uuid
         instance.save()
@@ -105,6 +115,7 @@ def _get_instance(xml, new_uuid, submitted_by, status, xform,
         instance.user = submitted_by
         instance.status = status
         instance.xform = xform
+        instance.submission_context = submission_context
         if defer_counting:
             # Only set the attribute if requested, i.e. don't bother ever
             # setting it to `False`
@@ -130,39 +141,79 @@ def get_uuid_from_submission(xml):
     return len(split_xml) > 1 and split_xml[1] or None
 
 
-def get_xform_from_submission(xml, username, uuid=None):
+def get_xform_from_submission(xml, username, uuid=None,
+                              submission_context=None):
     # check alternative form submission ids
-    uuid = uuid or get_uuid_from_submission(xml)
+    if submission_context is not None:
+        uuid = uuid or submission_context.formhub_uuid
+    else:
+        uuid = uuid or get_uuid_from_submission(xml)
 
     if not username and not uuid:
         raise InstanceInvalidUserError()
 
+    # The owner and their profile are needed to check permissions
+    queryset = XForm.objects.select_related('user__profile')
+
     if uuid:
         # try find the form by its uuid which is the ideal condition
         try:
-            xform = XForm.objects.get(uuid=uuid)
+            xform = queryset.get(uuid=uuid)
         except XForm.DoesNotExist:
             pass
         else:
             return xform
 
-    id_string = get_id_string_from_xml_str(xml)
+    id_string = None
+    if submission_context is not None:
+        id_string = submission_context.xform_id_string
+    if not id_string:
+        id_string = get_id_string_from_xml_str(xml)
 
-    return get_object_or_404(XForm, id_string__exact=id_string,
+    return get_object_or_404(queryset, id_string__exact=id_string,
                              user__username=username)
 
 
+def get_profile(user):
+    """
+    Returns the profile of `user`, created if missing, without any query if
+    it has been loaded along with `user`, e.g. by
+    `select_related('user__profile')`
+    """
+    try:
+        return user.profile
+    except UserProfile.DoesNotExist:
+        profile, created = UserProfile.objects.get_or_create(user=user)
+        # Cache it on `user` like a loaded relation
+        user.profile = profile
+        return profile
+
+
+def get_profile_or_404(**user_kwargs):
+    """
+    Returns the profile of the user matching `user_kwargs` (e.g.
+    `username__iexact`), created if missing, with a single query when it
+    exists
+    """
+    try:
+        return UserProfile.objects.select_related('user').get(**dict(
+            ('user__' + lookup, value)
+            for lookup, value in user_kwargs.iteritems()))
+    except UserProfile.DoesNotExist:
+        return get_profile(get_object_or_404(User, **user_kwargs))
+
+
 def _has_edit_xform_permission(xform, user):
     if isinstance(xform, XForm) and isinstance(user, User):
-        return user.has_perm('logger.change_xform', xform)
+        return xform_permission_cache.has_perm(
+            user, 'logger.change_xform', xform)
 
     return False
 
 
 def check_edit_submission_permissions(request_user, xform):
     if xform and request_user and request_user.is_authenticated():
-        requires_auth = UserProfile.objects.get_or_create(
-            user=xform.user)[0].require_auth
+        requires_auth = get_profile(xform.user).require_auth
         has_edit_perms = _has_edit_xform_permission(xform, request_user)
 
         if requires_auth and not has_edit_perms:
@@ -189,11 +240,12 @@ def check_submission_permissions(request, xform):
     :returns: None.
     :raises: PermissionDenied based on the above criteria.
     """
-    profile = UserProfile.objects.get_or_create(user=xform.user)[0]
+    profile = get_profile(xform.user)
     if request and (profile.require_auth or xform.require_auth
                     or request.path == '/submission')\
             and xform.user != request.user\
-            and not request.user.has_perm('report_xform', xform):
+            and not xform_permission_cache.has_perm(
+                request.user, 'report_xform', xform):
         raise PermissionDenied(
             _("%(request_user)s is not allowed to make submissions "
               "to %(form_user)s's %(form_title)s form." % {
@@ -229,9 +281,12 @@ def save_attachments(instance, media_files):
 
 
 def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
-                    date_created_override):
+                    date_created_override, submission_context=None):
     if not date_created_override:
-        date_created_override = get_submission_date_from_xml(xml)
+        if submission_context is not None:
+            date_created_override = submission_context.submission_date
+        else:
+            date_created_override = get_submission_date_from_xml(xml)
 
     # We have to save the `Instance` to the database before we can associate
     # any `Attachment`s with it, but we are inside a transaction and saving
@@ -248,7 +303,8 @@ def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
     # responsible for calling `update_xform_submission_count()` if the returned
     # `Instance` has `defer_counting = True`.
     instance = _get_instance(xml, new_uuid, submitted_by, status, xform,
-                             defer_counting=True)
+                             defer_counting=True,
+                             submission_context=submission_context)
 
     save_attachments(instance, media_files)
 
@@ -266,6 +322,8 @@ def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
             instance=instance)
 
     if not created:
+        # Reuse the in-memory `Instance` which holds the submission context
+        pi.instance = instance
         pi.save(asynchronous=False)
 
     # Now that the slow tasks are complete and we are (hopefully!) close to the
@@ -280,6 +338,29 @@ def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
     return instance
 
 
+def get_duplicate_instance(xform, xml, xml_hash):
+    """
+    Returns the submission to `xform` whose XML is exactly `xml`, or `None`.
+
+    XML matches are identified by identical content hash OR, when a content
+    hash is not present, by string comparison of the full content. Both are
+    looked up in the `(xform, xml_hash)` index, which narrows the string
+    comparison down to the form's submissions without a hash; the
+    `populate_xml_hashes` task or the `populate_xml_hashes_for_instances`
+    command leave none. The XML of a submission names its form, so an exact
+    match can only be a submission to the same form.
+    """
+    duplicate_ids = Instance.objects.filter(
+        Q(xml_hash=xml_hash) | Q(xml_hash=Instance.DEFAULT_XML_HASH, xml=xml),
+        xform_id=xform.pk,
+    ).values_list('pk', flat=True)
+    # Unordered, unlike `first()`: the database could otherwise walk the
+    # whole primary key index to find a new submission has no duplicate
+    for duplicate_id in duplicate_ids[:1]:
+        return Instance.objects.get(pk=duplicate_id)
+    return None
+
+
 @transaction.atomic # paranoia; redundant since `ATOMIC_REQUESTS` set to `True`
 def create_instance(username, xml_file, media_files,
                     status='submitted_via_web', uuid=None,
@@ -298,11 +379,14 @@ def create_instance(username, xml_file, media_files,
 
     xml = xml_file.read()
     xml_hash = Instance.get_hash(xml)
-    xform = get_xform_from_submission(xml, username, uuid)
+    # Parse the XML once for the whole submission pipeline
+    submission_context = SubmissionContext(xml, xml_hash=xml_hash)
+    xform = get_xform_from_submission(xml, username, uuid,
+                                      submission_context=submission_context)
     check_submission_permissions(request, xform)
 
     # get new and deprecated uuid's
-    new_uuid = get_uuid_from_xml(xml)
+    new_uuid = submission_context.uuid
 
     # Dorey's rule from 2012 (commit 890a67aa):
     #   Ignore submission as a duplicate IFF
@@ -316,14 +400,7 @@ def create_instance(username, xml_file, media_files,
     # and still exactly matches an existing submission, it's certainly a
     # duplicate (https://docs.opendatakit.org/openrosa-metadata/#fields).
     if xform.has_start_time or new_uuid is not None:
-        # XML matches are identified by identical content hash OR, when a
-        # content hash is not present, by string comparison of the full
-        # content, which is slow! Use the management command
-        # `populate_xml_hashes_for_instances` to hash existing submissions
-        existing_instance = Instance.objects.filter(
-            Q(xml_hash=xml_hash) | Q(xml_hash=Instance.DEFAULT_XML_HASH, xml=xml),
-            xform__user=xform.user,
-        ).first()
+        existing_instance = get_duplicate_instance(xform, xml, xml_hash)
     else:
         existing_instance = None
 
@@ -339,7 +416,8 @@ def create_instance(username, xml_file, media_files,
     else:
         instance = save_submission(xform, xml, media_files, new_uuid,
                                    submitted_by, status,
-                                   date_created_override)
+                                   date_created_override,
+                                   submission_context=submission_context)
         return instance
 
 
@@ -615,62 +693,34 @@ def inject_instanceid(xml_str, uuid):
     return xml_str
 
 
-def update_mongo_for_xform(xform, only_update_missing=True):
-
-    instance_ids = set(
-        [i.id for i in Instance.objects.only('id').filter(xform=xform)])
-    sys.stdout.write("Total no of instances: %d\n" % len(instance_ids))
-    mongo_ids = set()
-    user = xform.user
-    userform_id = "%s_%s" % (user.username, xform.id_string)
+def update_mongo_for_xforms(xforms, only_update_missing=True, processes=1):
+    """
+    Rebuilds the Mongo documents of `xforms` in a single `MongoRebuild` run,
+    with `processes` processes
+    """
     if only_update_missing:
         sys.stdout.write("Only updating missing mongo instances\n")
-        mongo_ids = set(
-            [rec[common_tags.ID] for rec in mongo_instances.find(
-                {common_tags.USERFORM_ID: userform_id},
-                {common_tags.ID: 1},
-                max_time_ms=settings.MONGO_DB_MAX_TIME_MS
-)])
-        sys.stdout.write("Total no of mongo instances: %d\n" % len(mongo_ids))
-        # get the difference
-        instance_ids = instance_ids.difference(mongo_ids)
     else:
-        # clear mongo records
-        mongo_instances.remove({common_tags.USERFORM_ID: userform_id})
-    # get instances
-    sys.stdout.write(
-        "Total no of instances to update: %d\n" % len(instance_ids))
-    instances = Instance.objects.only('id').in_bulk(
-        [id_ for id_ in instance_ids])
-    total = len(instances)
-    done = 0
-    for id_, instance in instances.items():
-        (pi, created) = ParsedInstance.objects.get_or_create(instance=instance)
-        try:
-            save_success = pi.save(asynchronous=False)
-        except InstanceEmptyError:
-            print(
-                "\033[91m[WARNING] - Skipping Instance #{}/uuid:{} because "
-                "it is empty\033[0m".format(id_, instance.uuid)
-            )
-        else:
-            if not save_success:
-                print(
-                    "\033[91m[ERROR] - Instance #{}/uuid:{} - Could not save "
-                    "the parsed instance\033[0m".format(id_, instance.uuid)
-                )
-            else:
-                done += 1
-
-        progress = "\r%.2f %% done..." % ((float(done) / float(total)) * 100)
-        sys.stdout.write(progress)
-        sys.stdout.flush()
+        for xform in xforms:
+            # clear mongo records
+            userform_id = "%s_%s" % (xform.user.username, xform.id_string)
+            mongo_instances.remove({common_tags.USERFORM_ID: userform_id})
+
+    rebuild = MongoRebuild([xform.pk for xform in xforms],
+                           only_missing=only_update_missing,
+                           processes=processes)
+    rebuild.run()
     sys.stdout.write(
         "\nUpdated %s\n------------------------------------------\n"
-        % xform.id_string)
+        % ", ".join(xform.id_string for xform in xforms))
+
+
+def update_mongo_for_xform(xform, only_update_missing=True, processes=1):
+    update_mongo_for_xforms([xform], only_update_missing, processes)
 
 
-def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None):
+def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None,
+                      processes=1):
     """Check the status of records in the mysql db versus mongodb. At a
     minimum, return a report (string) of the results.
 
@@ -683,7 +733,10 @@ def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None):
     user       -> if specified, apply only to the forms for the given user
                   (default: None)
     xform      -> if specified, apply only to the given form (default: None)
+    processes  -> number of processes the records are updated with
+                  (default: 1)
 
+    The forms found are updated together, in a single `MongoRebuild` run.
     """
 
     qs = XForm.objects.only('id_string', 'user').select_related('user')
@@ -699,6 +752,7 @@ def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None):
     done = 0
     total_to_remongo = 0
     report_string = ""
+    xforms_to_remongo = []
     for xform in queryset_iterator(qs, 100):
         # get the count
         user = xform.user
@@ -720,7 +774,7 @@ def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None):
             total_to_remongo += (instance_count - mongo_count)
 
             # should we remongo
-            if remongo or (remongo and update_all):
+            if remongo:
                 if update_all:
                     sys.stdout.write(
                         "Updating all records for %s\n--------------------"
@@ -730,11 +784,14 @@ def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None):
                         "Updating missing records for %s\n----------------"
                         "-------------------------------\n"
                         % xform.id_string)
-                update_mongo_for_xform(
-                    xform, only_update_missing=not update_all)
+                xforms_to_remongo.append(xform)
         done += 1
         sys.stdout.write(
             "%.2f %% done ...\r" % ((float(done) / float(total)) * 100))
+    if xforms_to_remongo:
+        update_mongo_for_xforms(xforms_to_remongo,
+                                only_update_missing=not update_all,
+                                processes=processes)
     # only show stats if we are not updating mongo, the update function
     # will show progress
     if not remongo:
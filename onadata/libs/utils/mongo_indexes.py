@@ -0,0 +1,152 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from collections import OrderedDict
+
+from pymongo import ASCENDING
+
+from onadata.libs.utils.common_tags import (
+    DELETEDAT,
+    ID,
+    SUBMISSION_TIME,
+    USERFORM_ID,
+)
+
+
+# Indexes the queries on the instances collection rely on. Every query is on
+# a single form, i.e. starts with `_userform_id`.
+INSTANCES_INDEXES = [
+    # Data API and exports: active submissions, sorted or paged by `_id`
+    [(USERFORM_ID, ASCENDING), (DELETEDAT, ASCENDING), (ID, ASCENDING)],
+    # Keyset pagination including deleted submissions, bulk updates of
+    # validation statuses
+    [(USERFORM_ID, ASCENDING), (ID, ASCENDING)],
+    # Filters and sorts on the submission time
+    [(USERFORM_ID, ASCENDING), (SUBMISSION_TIME, ASCENDING)],
+]
+
+# Plan stages which read every document of the collection
+COLLECTION_SCAN_STAGES = ('COLLSCAN',)
+
+
+def get_missing_indexes(collection, indexes):
+    """
+    Returns the indexes of `indexes` (lists of `(field, direction)`) which
+    `collection` does not have, whatever their name
+    """
+    # Directions are compared as they are: MongoDB may report `1.0` for `1`,
+    # which compare equal, and text, 2dsphere or hashed indexes have strings
+    existing_keys = set(
+        tuple(index['key'])
+        for index in collection.index_information().itervalues())
+    return [keys for keys in indexes if tuple(keys) not in existing_keys]
+
+
+def create_indexes(collection, indexes, background=True):
+    """
+    Creates the indexes of `indexes` which `collection` does not have, in
+    the background by default so that the collection can still be read and
+    written while they are built. Returns their names.
+    """
+    names = []
+    for keys in get_missing_indexes(collection, indexes):
+        names.append(collection.create_index(keys, background=background))
+    return names
+
+
+def get_query_shapes(userform_id):
+    """
+    Returns the queries run on the instances collection for the form
+    `userform_id` by the data API, the exports and the reports, as
+    `{description: (filter, sort)}`
+    """
+    active = {"$and": [{USERFORM_ID: userform_id}, {DELETEDAT: None}]}
+    return OrderedDict([
+        # `ParsedInstance.query_mongo()`, `export_tools.query_mongo()`
+        ('data', (active, None)),
+        ('data sorted by _id', (active, [(ID, ASCENDING)])),
+        # `ParsedInstance.query_mongo_keyset()`
+        ('data keyset page', (
+            {"$and": [{"$and": [{USERFORM_ID: userform_id},
+                                {ID: {"$gt": 0}}]},
+                      {DELETEDAT: None}]},
+            [(ID, ASCENDING)])),
+        # `export_tools.query_mongo(after_id=..., last_id=...)`
+        ('incremental export', (
+            {"$and": [active, {ID: {"$gt": 0, "$lte": 2 ** 31}}]},
+            [(ID, ASCENDING)])),
+        ('data by submission time', (
+            {"$and": [{USERFORM_ID: userform_id,
+                       SUBMISSION_TIME: {"$gte": "1970-01-01T00:00:00"}},
+                      {DELETEDAT: None}]},
+            [(SUBMISSION_TIME, ASCENDING)])),
+        # `ParsedInstance.mongo_aggregate()`
+        ('aggregate', (
+            {"$and": [{USERFORM_ID: userform_id},
+                      {"$or": [{DELETEDAT: {"$exists": False}},
+                               {DELETEDAT: None}]}]},
+            None)),
+        # `survey_report.views.get_instances_for_user_and_form()`
+        ('report', (
+            {USERFORM_ID: userform_id, DELETEDAT: {"$exists": False}},
+            None)),
+        # `ParsedInstance.bulk_update_validation_statuses()`
+        ('validation statuses update', (
+            {USERFORM_ID: userform_id, ID: {"$in": [0]}}, None)),
+    ])
+
+
+def get_plan_stages(plan):
+    """
+    Returns the names of the stages of the winning plan of `plan`, the
+    output of `explain()`, in the order they appear
+    """
+    stages = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if 'stage' in node:
+                stages.append(node['stage'])
+            # Sharded clusters report the plans of each shard, under
+            # `shards`, which are all walked
+            for key, value in node.iteritems():
+                # Plans MongoDB considered but did not pick
+                if key != 'rejectedPlans':
+                    walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    if 'queryPlanner' not in plan:
+        # MongoDB < 3.0
+        if plan.get('cursor', '').startswith('BasicCursor'):
+            return ['COLLSCAN']
+        return ['IXSCAN']
+    walk(plan['queryPlanner'].get('winningPlan'))
+    return stages
+
+
+def explain_query(collection, query, sort=None):
+    """
+    Returns the stages of the plan MongoDB chooses for `query`
+    """
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    return get_plan_stages(cursor.explain())
+
+
+def check_query_plans(collection, userform_id):
+    """
+    Explains the standard queries (see `get_query_shapes()`) for the form
+    `userform_id`. Returns `{description: (stages, collection scan)}`.
+    """
+    results = OrderedDict()
+    for description, (query, sort) in get_query_shapes(
+            userform_id).iteritems():
+        stages = explain_query(collection, query, sort)
+        results[description] = (
+            stages,
+            any(stage in COLLECTION_SCAN_STAGES for stage in stages),
+        )
+    return results
@@ -0,0 +1,129 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import logging
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from onadata.apps.logger.models import Instance
+from onadata.libs.utils.common_tags import ID
+
+
+class BulkMongoWriter(object):
+    """
+    Buffers parsed submissions and writes them to MongoDB with unordered
+    `bulk_write()` upserts instead of one `save()` per document.
+
+    Documents which fail are retried on their own (the rest of the batch is
+    not written again) up to `max_retries` times. Once a batch is done,
+    `Instance.is_synced_with_mongo` is updated with one query for the
+    documents which were written and one for those which were not.
+
+    Use it as a context manager, or call `flush()` when done, so the last
+    (partial) batch is written:
+
+        with BulkMongoWriter() as writer:
+            for parsed_instance in parsed_instances:
+                writer.add(parsed_instance.to_dict_for_mongo())
+    """
+
+    def __init__(self, collection=None, batch_size=None, flush_interval=None,
+                 max_retries=None):
+        if collection is None:
+            collection = settings.MONGO_DB.instances
+        if batch_size is None:
+            batch_size = getattr(settings, 'MONGO_BULK_WRITE_BATCH_SIZE', 500)
+        if flush_interval is None:
+            flush_interval = getattr(settings,
+                                     'MONGO_BULK_WRITE_FLUSH_INTERVAL', 5)
+        if max_retries is None:
+            max_retries = getattr(settings, 'MONGO_BULK_WRITE_MAX_RETRIES', 3)
+
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        # Counters since the writer was created
+        self.written = 0
+        self.failed = 0
+        self.failed_ids = []
+        self._records = []
+        self._last_flush = time.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        """
+        Buffers `record` (the output of `ParsedInstance.to_dict_for_mongo()`)
+        and writes the batch if it is full or old enough.
+        """
+        self._records.append(record)
+        if (len(self._records) >= self.batch_size or
+                time.time() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        records = self._records
+        self._records = []
+        self._last_flush = time.time()
+        if not records:
+            return
+
+        # Records share the same `_id` as their `Instance`, the last one wins
+        # if the same submission has been added twice.
+        records_by_id = OrderedDict(
+            (record[ID], record) for record in records)
+        failed_ids = self._write(records_by_id)
+        attempt = 0
+        while failed_ids and attempt < self.max_retries:
+            attempt += 1
+            failed_ids = self._write(OrderedDict(
+                (id_, records_by_id[id_]) for id_ in records_by_id
+                if id_ in failed_ids))
+
+        written_ids = [id_ for id_ in records_by_id if id_ not in failed_ids]
+        if written_ids:
+            Instance.objects.filter(pk__in=written_ids).update(
+                is_synced_with_mongo=True)
+        if failed_ids:
+            Instance.objects.filter(pk__in=failed_ids).update(
+                is_synced_with_mongo=False)
+            logging.getLogger().warning(
+                'BulkMongoWriter - {} submission(s) could not be saved to '
+                'Mongo: {}'.format(len(failed_ids), sorted(failed_ids)))
+
+        self.written += len(written_ids)
+        self.failed += len(failed_ids)
+        self.failed_ids.extend(failed_ids)
+
+    def _write(self, records_by_id):
+        """
+        Upserts `records_by_id` and returns the set of ids which failed.
+        """
+        ids = list(records_by_id)
+        requests = [ReplaceOne({ID: id_}, records_by_id[id_], upsert=True)
+                    for id_ in ids]
+        try:
+            self.collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # With `ordered=False`, every other document has been written
+            return set(ids[error['index']]
+                       for error in e.details.get('writeErrors', []))
+        except PyMongoError:
+            # e.g. lost connection: nothing tells which documents made it.
+            # Upserts are idempotent, so retrying all of them is safe.
+            logging.getLogger().warning('BulkMongoWriter - bulk write failed',
+                                        exc_info=True)
+            return set(ids)
+        return set()
@@ -0,0 +1,177 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import threading
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Max, Sum
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from onadata.apps.logger.models import XForm
+from onadata.libs.utils.schema_cache import SizedLRUCache
+
+
+# Upper bound (in bytes) of the permissions kept in memory by each process.
+# The size of an entry is approximated from the number of grants it holds.
+DEFAULT_XFORM_PERMISSION_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Approximate size of a form id in a `frozenset`
+_GRANT_SIZE = 40
+
+
+class XFormPermissionCache(object):
+    """
+    Process-wide cache of the object permissions on forms each user is
+    granted through django-guardian, directly or through their groups, as
+    `{codename: frozenset(xform ids)}`.
+
+    Entries are keyed by `User.pk` and versioned by a fingerprint of the
+    user's rows in guardian's tables: assigning a permission always adds a
+    row with a higher pk, removing one always lowers the count. Computing the
+    fingerprint costs two aggregate queries on indexed columns instead of
+    the joins guardian runs for every check. `invalidate()`, called whenever
+    guardian's tables change, also drops the entry of the process doing the
+    change.
+
+    The permissions are also kept on the `User` object for the rest of the
+    request, as guardian's `ObjectPermissionChecker` does.
+    """
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = getattr(settings, 'XFORM_PERMISSION_CACHE_MAX_BYTES',
+                                DEFAULT_XFORM_PERMISSION_CACHE_MAX_BYTES)
+        self._cache = SizedLRUCache(max_bytes)
+        # Bumped by `invalidate()` to expire the permissions kept on `User`
+        # objects by this process
+        self._generation = 0
+        self._user_generations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_content_type():
+        return ContentType.objects.get_for_model(XForm)
+
+    @staticmethod
+    def get_codename(perm):
+        """
+        Returns the codename of `perm`, e.g. `report_xform` for
+        `logger.report_xform`, or `None` if it is not a permission on forms
+        """
+        if '.' in perm:
+            app_label, perm = perm.split('.', 1)
+            if app_label != XForm._meta.app_label:
+                return None
+        return perm
+
+    def get_version(self, user_id):
+        content_type = self._get_content_type()
+        user_perms = UserObjectPermission.objects.filter(
+            user_id=user_id, content_type=content_type
+        ).aggregate(count=Count('pk'), last=Max('pk'))
+        # Joining or leaving a group does not add rows, the sum tells apart
+        # groups with as many permissions
+        group_perms = GroupObjectPermission.objects.filter(
+            group__user=user_id, content_type=content_type
+        ).aggregate(count=Count('pk'), last=Max('pk'), total=Sum('pk'))
+        return (user_perms['count'], user_perms['last'],
+                group_perms['count'], group_perms['last'],
+                group_perms['total'])
+
+    def _load_grants(self, user_id):
+        content_type = self._get_content_type()
+        rows = list(UserObjectPermission.objects.filter(
+            user_id=user_id, content_type=content_type
+        ).values_list('object_pk', 'permission__codename'))
+        rows.extend(GroupObjectPermission.objects.filter(
+            group__user=user_id, content_type=content_type
+        ).values_list('object_pk', 'permission__codename'))
+
+        grants = {}
+        for object_pk, codename in rows:
+            grants.setdefault(codename, set()).add(int(object_pk))
+        return dict((codename, frozenset(xform_ids))
+                    for codename, xform_ids in grants.iteritems())
+
+    @staticmethod
+    def get_size(grants):
+        return _GRANT_SIZE * (1 + sum(len(xform_ids)
+                                      for xform_ids in grants.itervalues()))
+
+    def get_grants(self, user):
+        """
+        Returns the permissions of `user`, an authenticated `User`, on forms
+        as `{codename: frozenset(xform ids)}`. Shared between callers and
+        must be treated as read-only.
+        """
+        generation = (self._generation, self._user_generations.get(user.pk))
+        grants_on_user = getattr(user, '_xform_permission_grants', None)
+        if grants_on_user is not None and grants_on_user[0] == generation:
+            return grants_on_user[1]
+
+        # Versioned before loading: permissions changed in between are
+        # reloaded on the next request
+        version = self.get_version(user.pk)
+        grants = self._cache.get(user.pk, version)
+        if grants is None:
+            grants = self._load_grants(user.pk)
+            self._cache.set(user.pk, version, grants, self.get_size(grants))
+
+        user._xform_permission_grants = (generation, grants)
+        return grants
+
+    def get_xform_ids(self, user, perm):
+        codename = self.get_codename(perm)
+        return self.get_grants(user).get(codename, frozenset())
+
+    def has_perm(self, user, perm, xform):
+        """
+        Same as `user.has_perm(perm, xform)`
+        """
+        if user.is_anonymous() or self.get_codename(perm) is None:
+            # Guardian checks the permissions of its anonymous user
+            return user.has_perm(perm, xform)
+        if not user.is_active:
+            return False
+        if user.is_superuser:
+            return True
+        return xform.pk in self.get_xform_ids(user, perm)
+
+    def filter_queryset(self, user, perm, queryset):
+        """
+        Same as guardian's `get_objects_for_user(user, perm, queryset,
+        accept_global_perms=False)` for an authenticated `user`
+        """
+        if user.is_superuser:
+            return queryset
+        return queryset.filter(pk__in=self.get_xform_ids(user, perm))
+
+    def invalidate(self, user_id=None):
+        """
+        Drops the permissions of `user_id`, or of every user if `None`
+        """
+        with self._lock:
+            if user_id is None:
+                self._generation += 1
+                self._user_generations.clear()
+                self._cache.clear()
+            else:
+                self._user_generations[user_id] = \
+                    self._user_generations.get(user_id, 0) + 1
+                self._cache.invalidate(user_id)
+
+    def clear(self):
+        self.invalidate()
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self._cache),
+            'bytes': self._cache.current_bytes,
+            'max_bytes': self._cache.max_bytes,
+            'hits': self._cache.hits,
+            'misses': self._cache.misses,
+        }
+
+
+xform_permission_cache = XFormPermissionCache()
@@ -0,0 +1,306 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import sys
+import time
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.db import connections
+from pymongo import MongoClient
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.libs.utils.common_tags import ID
+from onadata.libs.utils.mongo_writer import BulkMongoWriter
+
+
+# Number of submissions handled by one unit of work (a process pool task or a
+# Celery task)
+DEFAULT_REMONGO_RANGE_SIZE = 10000
+
+
+class RemongoRange(namedtuple('RemongoRange',
+                              'xform_id after_pk last_pk count')):
+    """
+    Submissions of one form with `after_pk < pk <= last_pk`. `last_pk` is
+    `None` for the last range of a form, so submissions received while the
+    rebuild runs are included as well.
+    """
+
+    @property
+    def key(self):
+        return '{}:{}'.format(self.xform_id, self.after_pk)
+
+
+def split_xform_into_ranges(xform_id, range_size=DEFAULT_REMONGO_RANGE_SIZE):
+    """
+    Returns the `RemongoRange`s covering all the submissions of a form. Each
+    boundary is found with one keyset query, so planning never loads the
+    primary keys themselves.
+    """
+    queryset = Instance.objects.filter(xform_id=xform_id).order_by('pk')
+    ranges = []
+    after_pk = 0
+    while True:
+        boundary = list(queryset.filter(pk__gt=after_pk).values_list(
+            'pk', flat=True)[range_size - 1:range_size])
+        if not boundary:
+            break
+        ranges.append(RemongoRange(xform_id, after_pk, boundary[0],
+                                   range_size))
+        after_pk = boundary[0]
+
+    count = queryset.filter(pk__gt=after_pk).count()
+    if count:
+        ranges.append(RemongoRange(xform_id, after_pk, None, count))
+    elif ranges:
+        # The last range stays open-ended
+        ranges[-1] = ranges[-1]._replace(last_pk=None)
+    return ranges
+
+
+class RemongoCheckpoints(object):
+    """
+    Progress of rebuild runs, stored in MongoDB so that it is shared by the
+    processes (or Celery workers) of a run and survives interruptions.
+
+    There is one document per range, holding the last primary key written
+    to MongoDB (`position`).
+    """
+
+    def __init__(self, collection=None):
+        if collection is None:
+            collection = settings.MONGO_DB.remongo_checkpoints
+        self.collection = collection
+
+    @staticmethod
+    def _get_id(run_id, remongo_range):
+        return '{}:{}'.format(run_id, remongo_range.key)
+
+    def create(self, run_id, ranges):
+        documents = [{
+            '_id': self._get_id(run_id, remongo_range),
+            'run_id': run_id,
+            'range': list(remongo_range),
+            'position': remongo_range.after_pk,
+            'processed': 0,
+            'done': False,
+        } for remongo_range in ranges]
+        if documents:
+            self.collection.insert_many(documents, ordered=False)
+
+    def exists(self, run_id):
+        return self.collection.find_one({'run_id': run_id}) is not None
+
+    def get_pending(self, run_id):
+        """
+        Returns the unfinished ranges of a run, the number of submissions of
+        the whole run and how many of them have already been processed.
+        """
+        pending = []
+        total = processed = 0
+        for document in self.collection.find({'run_id': run_id}):
+            remongo_range = RemongoRange(*document['range'])
+            total += remongo_range.count
+            processed += document['processed']
+            if not document['done']:
+                pending.append(remongo_range)
+        return sorted(pending), total, processed
+
+    def get_position(self, run_id, remongo_range):
+        document = self.collection.find_one(
+            {'_id': self._get_id(run_id, remongo_range)})
+        if document is None:
+            return remongo_range.after_pk, 0
+        return document['position'], document['processed']
+
+    def advance(self, run_id, remongo_range, position, processed, done=False):
+        self.collection.update_one(
+            {'_id': self._get_id(run_id, remongo_range)},
+            {'$set': {'position': position,
+                      'processed': processed,
+                      'done': done}},
+            upsert=True)
+
+    def delete_if_done(self, run_id):
+        """
+        Deletes the documents of `run_id` once all its ranges are done, as
+        the run cannot be resumed anymore. Returns whether they were deleted.
+        """
+        if self.collection.find_one({'run_id': run_id, 'done': False}):
+            return False
+        self.collection.delete_many({'run_id': run_id})
+        return True
+
+
+def rebuild_range(run_id, remongo_range, only_missing=False, batch_size=None,
+                  checkpoints=None, mongo_db=None):
+    """
+    Writes the submissions of `remongo_range` to MongoDB, in primary key
+    order, starting after the last checkpoint of `run_id`. `mongo_db`
+    defaults to `settings.MONGO_DB`.
+
+    Returns the number of submissions processed by this call.
+    """
+    if mongo_db is None:
+        mongo_db = settings.MONGO_DB
+    if checkpoints is None:
+        checkpoints = RemongoCheckpoints(mongo_db.remongo_checkpoints)
+    mongo_instances = mongo_db.instances
+    position, processed = checkpoints.get_position(run_id, remongo_range)
+    processed_before = processed
+
+    queryset = Instance.objects.filter(xform_id=remongo_range.xform_id)
+    if remongo_range.last_pk is not None:
+        queryset = queryset.filter(pk__lte=remongo_range.last_pk)
+
+    with BulkMongoWriter(collection=mongo_instances,
+                         batch_size=batch_size) as writer:
+        while True:
+            instance_ids = list(queryset.filter(pk__gt=position).order_by(
+                'pk').values_list('pk', flat=True)[:writer.batch_size])
+            if not instance_ids:
+                break
+            if only_missing:
+                existing_ids = set(
+                    record[ID] for record in mongo_instances.find(
+                        {ID: {'$in': instance_ids}}, {ID: 1}))
+                missing_ids = [id_ for id_ in instance_ids
+                               if id_ not in existing_ids]
+            else:
+                missing_ids = instance_ids
+            if missing_ids:
+                # Old submissions are not sent to rest services again
+                ParsedInstance.bulk_update_mongo(missing_ids, writer,
+                                                 call_services=False)
+                # Never let the checkpoint get ahead of what is in MongoDB
+                writer.flush()
+            position = instance_ids[-1]
+            processed += len(instance_ids)
+            checkpoints.advance(run_id, remongo_range, position, processed)
+
+    checkpoints.advance(run_id, remongo_range, position, processed, done=True)
+    return processed - processed_before
+
+
+# Database of the processes of a `MongoRebuild` pool
+_subprocess_mongo_db = None
+
+
+def _init_subprocess():
+    """
+    Opens the MongoDB connection of a pool process. `MongoClient`s are not
+    fork-safe: the one inherited from the parent shares its sockets and
+    monitoring threads.
+    """
+    global _subprocess_mongo_db
+    client = MongoClient(settings.MONGO_CONNECTION_URL, j=True, tz_aware=True)
+    _subprocess_mongo_db = client[settings.MONGO_DB.name]
+
+
+def _rebuild_range_in_subprocess(args):
+    return rebuild_range(*args, mongo_db=_subprocess_mongo_db)
+
+
+class MongoRebuild(object):
+    """
+    Rebuilds the MongoDB documents of a set of forms.
+
+    Work is split into `(xform, pk range)` units which run in this process,
+    in a pool of `processes` or as a Celery chord. Progress is checkpointed
+    per range, so an interrupted run can be resumed by passing its `run_id`.
+    """
+
+    def __init__(self, xform_ids, run_id=None, only_missing=False,
+                 processes=1, range_size=DEFAULT_REMONGO_RANGE_SIZE,
+                 batch_size=None, stdout=None, checkpoints=None):
+        self.xform_ids = xform_ids
+        self.run_id = run_id or uuid.uuid4().hex
+        self.only_missing = only_missing
+        self.processes = processes
+        self.range_size = range_size
+        self.batch_size = batch_size
+        self.stdout = stdout or sys.stdout
+        self.checkpoints = checkpoints or RemongoCheckpoints()
+
+    def plan(self):
+        """
+        Returns the ranges left to process, the number of submissions of the
+        run and how many of them a previous attempt already processed.
+        """
+        if not self.checkpoints.exists(self.run_id):
+            ranges = []
+            for xform_id in self.xform_ids:
+                ranges.extend(split_xform_into_ranges(xform_id,
+                                                      self.range_size))
+            self.checkpoints.create(self.run_id, ranges)
+        return self.checkpoints.get_pending(self.run_id)
+
+    def run(self):
+        """
+        Processes all pending ranges and returns the number of submissions
+        processed.
+        """
+        ranges, total, processed_before = self.plan()
+        self._start = time.time()
+        self._processed = 0
+        self._remaining = total - processed_before
+
+        arguments = [(self.run_id, remongo_range, self.only_missing,
+                      self.batch_size) for remongo_range in ranges]
+        if self.processes > 1 and len(ranges) > 1:
+            # Children must open their own database connections
+            connections.close_all()
+            pool = Pool(self.processes, initializer=_init_subprocess)
+            try:
+                for processed in pool.imap_unordered(
+                        _rebuild_range_in_subprocess, arguments):
+                    self._report(processed)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for args in arguments:
+                self._report(rebuild_range(*args,
+                                           checkpoints=self.checkpoints))
+
+        self.checkpoints.delete_if_done(self.run_id)
+        self.stdout.write('\nRun {} done: {} submissions processed\n'.format(
+            self.run_id, processed_before + self._processed))
+        return self._processed
+
+    def run_async(self):
+        """
+        Queues one Celery task per pending range. The run is reported once
+        all of them have completed.
+        """
+        # Avoid circular imports
+        from celery import chord
+        from onadata.apps.viewer.tasks import (
+            finish_mongo_rebuild,
+            rebuild_mongo_range,
+        )
+
+        ranges, _, _ = self.plan()
+        if not ranges:
+            return None
+        return chord(
+            rebuild_mongo_range.s(self.run_id, list(remongo_range),
+                                  self.only_missing, self.batch_size)
+            for remongo_range in ranges
+        )(finish_mongo_rebuild.s(self.run_id))
+
+    def _report(self, processed):
+        self._processed += processed
+        self._remaining = max(0, self._remaining - processed)
+        elapsed = time.time() - self._start
+        rate = self._processed / elapsed if elapsed else 0
+        eta = timedelta(seconds=int(self._remaining / rate)) if rate else '?'
+        self.stdout.write(
+            '\r{} submissions processed, {:.0f} docs/s, ETA {}'.format(
+                self._processed, rate, eta))
+        self.stdout.flush()
@@ -0,0 +1,142 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+# Upper bound (in bytes) of the form definitions kept in memory by each
+# process. The size of an entry is approximated by the length of the form's
+# JSON and XML, which is what the built survey is derived from.
+DEFAULT_FORM_SCHEMA_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class SizedLRUCache(object):
+    """
+    Thread-safe, in-process LRU cache bounded by the total (approximate) size
+    of its values rather than by their number.
+
+    Every entry is stored along with a `version`. A lookup only hits if the
+    requested version matches the stored one, which lets several processes
+    share the same source of truth (the database) without any cross-process
+    invalidation: a stale entry is simply replaced on the next miss.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            # Mark as most recently used
+            del self._entries[key]
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, value, size):
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                # Never let a single huge form evict everything else
+                return
+            self._entries[key] = (version, value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._discard(oldest_key)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+
+class FormSchemaCache(object):
+    """
+    Process-wide cache of compiled `DataDictionary` objects.
+
+    Entries are keyed by `XForm.pk` and versioned by `XForm.date_modified`,
+    which changes every time the form itself is saved. `DataDictionary.save()`
+    also invalidates the entry explicitly so the process doing the save never
+    serves the previous definition.
+
+    The cached `DataDictionary` is shared between callers and must be treated
+    as read-only.
+    """
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = getattr(settings, 'FORM_SCHEMA_CACHE_MAX_BYTES',
+                                DEFAULT_FORM_SCHEMA_CACHE_MAX_BYTES)
+        self._cache = SizedLRUCache(max_bytes)
+
+    @staticmethod
+    def get_version(xform):
+        return xform.date_modified
+
+    @staticmethod
+    def get_size(xform):
+        return len(xform.json or '') + len(xform.xml or '')
+
+    def get_data_dictionary(self, xform):
+        # Avoid circular imports
+        from onadata.apps.viewer.models.data_dictionary import DataDictionary
+
+        data_dictionary = self._cache.get(xform.pk, self.get_version(xform))
+        if data_dictionary is not None:
+            return data_dictionary
+
+        data_dictionary = DataDictionary.objects.get(pk=xform.pk)
+        # Build the survey and its lookups outside of the lock; concurrent
+        # misses may compile the same form twice, which is harmless.
+        data_dictionary.compile_schema()
+        self._cache.set(data_dictionary.pk,
+                        self.get_version(data_dictionary),
+                        data_dictionary,
+                        self.get_size(data_dictionary))
+        return data_dictionary
+
+    def invalidate(self, xform_id):
+        self._cache.invalidate(xform_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self._cache),
+            'bytes': self._cache.current_bytes,
+            'max_bytes': self._cache.max_bytes,
+            'hits': self._cache.hits,
+            'misses': self._cache.misses,
+        }
+
+
+form_schema_cache = FormSchemaCache()
@@ -0,0 +1,198 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import gzip
+import math
+import os
+import shutil
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import get_storage_class
+from django.core.files.temp import NamedTemporaryFile
+from six.moves import cPickle as pickle
+
+from onadata.apps.logger.models import Instance, XForm
+from onadata.apps.viewer.models.export import Export
+from onadata.libs.utils.common_tags import (
+    INDEX,
+    PARENT_INDEX,
+    PARENT_TABLE_NAME,
+)
+from onadata.libs.utils.export_tools import (
+    get_export_builder,
+    get_export_temp_file,
+    query_mongo,
+    save_export_file,
+)
+from onadata.libs.utils.remongo import split_xform_into_ranges
+
+
+# Export type: (file extension, `ExportBuilder` method writing the rows)
+SHARDED_EXPORT_TYPES = {
+    Export.XLS_EXPORT: ('xlsx', 'write_xls'),
+    Export.CSV_ZIP_EXPORT: ('zip', 'write_zipped_csv'),
+    Export.SAV_ZIP_EXPORT: ('zip', 'write_zipped_sav'),
+    Export.PARQUET_EXPORT: ('zip', 'write_zipped_parquet'),
+}
+
+
+def get_export_shard_count(xform, export_type):
+    """
+    Returns the number of shards an export should be split into, 1 if it
+    should not be sharded.
+    """
+    shards = getattr(settings, 'EXPORT_SHARDS', 1)
+    if shards < 2 or export_type not in SHARDED_EXPORT_TYPES:
+        return 1
+    threshold = getattr(settings, 'EXPORT_SHARDING_THRESHOLD', 100000)
+    if xform.submission_count() < threshold:
+        return 1
+    return shards
+
+
+def split_export_into_shards(xform, shards):
+    """
+    Returns `(after_id, last_id)` for each shard of the form's submissions.
+    The last shard is open-ended.
+    """
+    count = Instance.objects.filter(xform_id=xform.pk).count()
+    range_size = max(int(math.ceil(count / shards)), 1)
+    ranges = split_xform_into_ranges(xform.pk, range_size)
+    if not ranges:
+        # An empty export still has its headers
+        return [(0, None)]
+    return [(r.after_pk, r.last_pk) for r in ranges]
+
+
+def get_export_parts_dir(username, id_string, export_id):
+    return os.path.join(username, 'exports', id_string, 'parts',
+                        '{}'.format(export_id))
+
+
+def write_export_part(export_builder, records, shard, path):
+    """
+    Flattens `records` through the export plan and saves the rows to `path`
+    in the storage: gzipped, one pickle per row, `(position of the section,
+    values of its fields)`. `_index` and `_parent_index` start at 1 in each
+    part; `iter_merged_rows()` shifts them.
+
+    Returns what `iter_merged_rows()` needs to know about the part.
+    """
+    export_plan = export_builder.export_plan
+    positions = dict((section.name, position)
+                     for position, section in enumerate(export_plan.sections))
+    row_counts = defaultdict(int)
+    with NamedTemporaryFile(suffix='.part') as temp_file:
+        with gzip.GzipFile(fileobj=temp_file, mode='wb') as part_file:
+            for section, row in export_builder.iter_rows(records):
+                get = row.get
+                # Parts are only written and read by our own tasks
+                pickle.dump(
+                    (positions[section.name],
+                     [get(field) for field in section.fields]),
+                    part_file, pickle.HIGHEST_PROTOCOL)
+                row_counts[section.name] += 1
+        temp_file.seek(0)
+        path = get_storage_class()().save(path, File(temp_file, path))
+
+    return {
+        'shard': shard,
+        'path': path,
+        'row_counts': dict(row_counts),
+    }
+
+
+def _iter_part(path):
+    storage = get_storage_class()()
+    with NamedTemporaryFile(suffix='.part') as temp_file:
+        # `GzipFile` needs to seek, which remote storages may not allow
+        with storage.open(path, 'rb') as storage_file:
+            shutil.copyfileobj(storage_file, temp_file)
+        temp_file.seek(0)
+        with gzip.GzipFile(fileobj=temp_file, mode='rb') as part_file:
+            while True:
+                try:
+                    yield pickle.load(part_file)
+                except EOFError:
+                    break
+
+
+def _iter_part_rows(export_plan, path):
+    for position, values in _iter_part(path):
+        section = export_plan.sections[position]
+        yield section, dict(zip(section.fields, values))
+
+
+def iter_merged_rows(export_plan, parts):
+    """
+    Yields `(section plan, row)` for the rows of all `parts`, in shard
+    order, with `_index` and `_parent_index` numbered as if the parts had
+    been rendered in a single pass.
+    """
+    # Rows of each section in the previous parts
+    offsets = defaultdict(int)
+    for part in sorted(parts, key=lambda p: p['shard']):
+        rows = _iter_part_rows(export_plan, part['path'])
+        for section_row in offset_row_indices(export_plan, rows, offsets):
+            yield section_row
+        for section_name, count in part['row_counts'].items():
+            offsets[section_name] += count
+
+
+def offset_row_indices(export_plan, rows, offsets):
+    """
+    Yields the `(section plan, row)` of `rows` with `_index` and
+    `_parent_index` shifted by the number of rows `offsets` gives for their
+    section and parent section.
+    """
+    for section, row in rows:
+        row[INDEX] += offsets.get(section.name, 0)
+        if row[PARENT_INDEX] != -1:
+            row[PARENT_INDEX] += offsets.get(
+                export_plan.get_section_name(row[PARENT_TABLE_NAME]), 0)
+        yield section, row
+
+
+def render_export_shard(username, id_string, export_id, shard, after_id,
+                        last_id, filter_query=None, options=None):
+    xform = XForm.objects.get(user__username__iexact=username,
+                              id_string__exact=id_string)
+    export_builder = get_export_builder(xform, **(options or {}))
+    records = query_mongo(username, id_string, filter_query,
+                          after_id=after_id, last_id=last_id)
+    path = os.path.join(get_export_parts_dir(username, id_string, export_id),
+                        '{}.part'.format(shard))
+    return write_export_part(export_builder, records, shard, path)
+
+
+def merge_export_shards(parts, export_type, username, id_string, export_id,
+                        filter_query=None, options=None):
+    """
+    Writes the export file from the parts rendered by `render_export_shard()`
+    and deletes them. Returns the `Export`.
+    """
+    xform = XForm.objects.get(user__username__iexact=username,
+                              id_string__exact=id_string)
+    export_builder = get_export_builder(xform, **(options or {}))
+    extension, write_method = SHARDED_EXPORT_TYPES[export_type]
+    temp_file = get_export_temp_file(export_type, extension, username,
+                                     id_string)
+    getattr(export_builder, write_method)(
+        temp_file.name, iter_merged_rows(export_builder.export_plan, parts))
+    export = save_export_file(xform, export_type, extension, username,
+                              id_string, temp_file, export_id, filter_query)
+    delete_export_parts(username, id_string, export_id)
+    return export
+
+
+def delete_export_parts(username, id_string, export_id):
+    storage = get_storage_class()()
+    parts_dir = get_export_parts_dir(username, id_string, export_id)
+    try:
+        _, filenames = storage.listdir(parts_dir)
+    except OSError:
+        return
+    for filename in filenames:
+        storage.delete(os.path.join(parts_dir, filename))
@@ -0,0 +1,82 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import json
+
+from bson import json_util
+from django.http import StreamingHttpResponse
+
+
+JSON_STREAM = 'json'
+NDJSON_STREAM = 'ndjson'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+# Number of records serialised into each chunk of a streamed response
+DEFAULT_STREAM_CHUNK_SIZE = 100
+
+
+def get_stream_format(query_params):
+    """
+    Returns the streaming format requested with `?stream=`: `ndjson` for
+    newline-delimited JSON, `json` for a JSON array (e.g. `?stream=true`), or
+    `None` if the response must not be streamed.
+    """
+    stream = query_params.get('stream', '').lower()
+    if stream in ('', '0', 'false'):
+        return None
+    return NDJSON_STREAM if stream == NDJSON_STREAM else JSON_STREAM
+
+
+def _dumps(record):
+    return json.dumps(record, default=json_util.default)
+
+
+def _chunks(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(_dumps(record))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_json_array(records, chunk_size=DEFAULT_STREAM_CHUNK_SIZE,
+                    prefix='', suffix=''):
+    """
+    Serialises `records` as a JSON array, `chunk_size` records at a time,
+    so that only one chunk is held in memory.
+    """
+    yield prefix + '['
+    separator = ''
+    for chunk in _chunks(records, chunk_size):
+        yield separator + ','.join(chunk)
+        separator = ','
+    yield ']' + suffix
+
+
+def iter_ndjson(records, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+    """
+    Serialises `records` as newline-delimited JSON, `chunk_size` records at
+    a time.
+    """
+    for chunk in _chunks(records, chunk_size):
+        yield '\n'.join(chunk) + '\n'
+
+
+def streaming_json_response(records, stream_format=JSON_STREAM,
+                            callback=None):
+    """
+    Returns a `StreamingHttpResponse` which serialises `records` (e.g. a
+    Mongo cursor) as they are read. `callback` wraps a JSON array for JSONP.
+    """
+    if stream_format == NDJSON_STREAM:
+        return StreamingHttpResponse(iter_ndjson(records),
+                                     content_type=NDJSON_CONTENT_TYPE)
+
+    prefix = suffix = ''
+    if callback:
+        prefix, suffix = '%s(' % callback, ')'
+    return StreamingHttpResponse(
+        iter_json_array(records, prefix=prefix, suffix=suffix),
+        content_type='application/json')
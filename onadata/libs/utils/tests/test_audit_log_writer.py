@@ -0,0 +1,46 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from django.test import SimpleTestCase
+from mock import Mock
+
+from onadata.libs.utils.audit_log_writer import AuditLogWriter
+
+
+class TestAuditLogWriter(SimpleTestCase):
+
+    def test_writes_in_batches(self):
+        batches = []
+        writer = AuditLogWriter(batches.append, batch_size=2,
+                                flush_interval=60)
+        for i in range(5):
+            self.assertTrue(writer.put({'msg': i}))
+        writer.flush()
+        self.assertEqual(len(writer), 0)
+        # The thread and `flush()` may write batches concurrently
+        self.assertEqual(
+            sorted(record['msg'] for batch in batches for record in batch),
+            range(5))
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+        self.assertEqual(writer.written, 5)
+
+    def test_drops_records_when_full(self):
+        write = Mock()
+        writer = AuditLogWriter(write, max_queue_size=2, batch_size=100,
+                                flush_interval=60)
+        self.assertTrue(writer.put({'msg': 1}))
+        self.assertTrue(writer.put({'msg': 2}))
+        self.assertFalse(writer.put({'msg': 3}))
+        self.assertEqual(writer.dropped, 1)
+
+        writer.flush()
+        write.assert_called_once_with([{'msg': 1}, {'msg': 2}])
+        self.assertTrue(writer.put({'msg': 3}))
+
+    def test_write_errors_are_counted(self):
+        writer = AuditLogWriter(Mock(side_effect=IOError), batch_size=100,
+                                flush_interval=60)
+        writer.put({'msg': 1})
+        writer.flush()
+        self.assertEqual(writer.failed, 1)
+        self.assertEqual(writer.written, 0)
@@ -0,0 +1,55 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import unittest
+
+from onadata.libs.utils.export_benchmark import (
+    EXPORTER_NAMES,
+    SyntheticForm,
+    compare_results,
+    run_benchmarks,
+)
+
+
+class TestExportBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.form_options = {
+            'questions': 6,
+            'repeat_depth': 2,
+            'select_multiples': 1,
+            'geopoints': 1,
+            'repeat_count': 2,
+        }
+
+    def test_synthetic_submissions(self):
+        form = SyntheticForm(**self.form_options)
+        record = form.get_record(3)
+        self.assertEqual(record, list(form.get_records(1, start=3))[0])
+        self.assertEqual(record['_id'], 4)
+        self.assertEqual(len(record['repeat_1']), 2)
+        self.assertEqual(
+            len(record['repeat_1'][0]['repeat_1/repeat_2']), 2)
+        self.assertIn('repeat_1/repeat_2/geopoint_6',
+                      record['repeat_1'][1]['repeat_1/repeat_2'][0])
+        self.assertEqual(form.rows_per_record, 1 + 2 + 4)
+        xpaths = [e.get_abbreviated_xpath()
+                  for e in form.survey.iter_descendants()]
+        self.assertIn('repeat_1/repeat_2/select_all_that_apply_5', xpaths)
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(self.form_options, 10, isolate=False)
+        self.assertEqual([r['exporter'] for r in results['results']],
+                         EXPORTER_NAMES)
+        for result in results['results']:
+            self.assertNotIn('error', result)
+            self.assertEqual(result['records'], 10)
+            self.assertEqual(result['rows'], 70)
+            self.assertGreater(result['output_bytes'], 0)
+            self.assertGreater(result['peak_rss_kb'], 0)
+
+        # Nothing changed when compared with itself
+        comparison = compare_results(results, results)
+        self.assertEqual(len(comparison), 3 * len(EXPORTER_NAMES))
+        self.assertEqual(set(change for _, _, _, _, change in comparison),
+                         {0})
@@ -0,0 +1,70 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from django.test import SimpleTestCase
+from mock import Mock
+
+from onadata.libs.utils.common_tags import ID, USERFORM_ID
+from onadata.libs.utils.mongo_indexes import (
+    INSTANCES_INDEXES,
+    check_query_plans,
+    create_indexes,
+    get_missing_indexes,
+    get_plan_stages,
+)
+
+
+def explain_output(*stages):
+    plan = {}
+    for stage in reversed(stages):
+        plan = dict(plan and {'inputStage': plan}, stage=stage)
+    return {'queryPlanner': {'winningPlan': plan, 'rejectedPlans': []}}
+
+
+class TestMongoIndexes(SimpleTestCase):
+
+    def test_missing_indexes(self):
+        collection = Mock()
+        collection.index_information.return_value = {
+            '_id_': {'key': [(ID, 1)]},
+            # Same keys under another name
+            'by_form_and_id': {'key': [(USERFORM_ID, 1.0), (ID, 1.0)]},
+            # Not every index has numeric directions
+            'search': {'key': [('_fts', 'text'), ('_ftsx', 1)]},
+            'location': {'key': [('_geolocation', '2dsphere')]},
+        }
+        missing_indexes = get_missing_indexes(collection, INSTANCES_INDEXES)
+        self.assertEqual(len(missing_indexes), len(INSTANCES_INDEXES) - 1)
+        self.assertNotIn([(USERFORM_ID, 1), (ID, 1)], missing_indexes)
+
+        create_indexes(collection, INSTANCES_INDEXES)
+        self.assertEqual(
+            [call[0][0] for call in collection.create_index.call_args_list],
+            missing_indexes)
+        self.assertTrue(all(call[1]['background'] for call in
+                            collection.create_index.call_args_list))
+
+    def test_plan_stages(self):
+        self.assertEqual(get_plan_stages(explain_output('FETCH', 'IXSCAN')),
+                         ['FETCH', 'IXSCAN'])
+        # Plans which were not chosen do not count
+        plan = explain_output('COLLSCAN')
+        plan['queryPlanner']['rejectedPlans'] = [{'stage': 'IXSCAN'}]
+        self.assertEqual(get_plan_stages(plan), ['COLLSCAN'])
+        self.assertEqual(get_plan_stages({'cursor': 'BasicCursor'}),
+                         ['COLLSCAN'])
+
+    def test_check_query_plans(self):
+        collection = Mock()
+        collection.find.return_value.sort.return_value.explain.return_value \
+            = explain_output('FETCH', 'IXSCAN')
+        collection.find.return_value.explain.return_value = \
+            explain_output('COLLSCAN')
+
+        results = check_query_plans(collection, 'bob_transportation')
+        # Unsorted queries scan the collection, sorted ones use an index
+        self.assertTrue(results['data'][1])
+        self.assertFalse(results['data sorted by _id'][1])
+        for query in [call[0][0] for call in
+                      collection.find.call_args_list]:
+            self.assertIn('bob_transportation', repr(query))
@@ -0,0 +1,123 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from django.conf import settings
+from django.contrib.gis.geos import GeometryCollection, Point
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mock import Mock
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.viewer.models.parsed_instance import (
+    ParsedInstance,
+    update_mongo_instances,
+)
+from onadata.libs.utils.common_tags import USERFORM_ID
+from onadata.libs.utils.mongo_writer import BulkMongoWriter
+
+
+class TestBulkMongoWriter(TestBase):
+
+    def setUp(self):
+        super(TestBulkMongoWriter, self).setUp()
+        self._publish_transportation_form()
+        self._make_submissions()
+        self.instance_ids = sorted(
+            Instance.objects.values_list('pk', flat=True))
+
+    def _get_records(self):
+        return [pi.to_dict_for_mongo() for pi in
+                ParsedInstance.objects.order_by('instance_id')]
+
+    def test_writes_in_batches(self):
+        collection = Mock()
+        writer = BulkMongoWriter(collection=collection, batch_size=3,
+                                 flush_interval=60)
+        with writer:
+            for record in self._get_records():
+                writer.add(record)
+            # First batch is full, the last one waits for the flush
+            self.assertEqual(collection.bulk_write.call_count, 1)
+            self.assertEqual(len(writer), 1)
+
+        self.assertEqual(collection.bulk_write.call_count, 2)
+        requests, = collection.bulk_write.call_args_list[0][0]
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(collection.bulk_write.call_args[1],
+                         {'ordered': False})
+        self.assertEqual(writer.written, 4)
+        self.assertEqual(writer.failed, 0)
+
+    def test_retries_failed_documents_only(self):
+        records = self._get_records()
+        error = BulkWriteError({'writeErrors': [{'index': 0, 'code': 11000}]})
+        collection = Mock()
+        # The failing document is sent alone on retries
+        collection.bulk_write.side_effect = [error, error, None]
+        with BulkMongoWriter(collection=collection, batch_size=10,
+                             flush_interval=60) as writer:
+            for record in records:
+                writer.add(record)
+
+        self.assertEqual(collection.bulk_write.call_count, 3)
+        for call in collection.bulk_write.call_args_list[1:]:
+            requests, = call[0]
+            self.assertEqual([r._filter for r in requests],
+                             [{'_id': records[0]['_id']}])
+        self.assertEqual(writer.written, 4)
+
+    def test_is_synced_with_mongo_reflects_failures(self):
+        records = self._get_records()
+        Instance.objects.update(is_synced_with_mongo=False)
+        collection = Mock()
+        collection.bulk_write.side_effect = AutoReconnect()
+        with BulkMongoWriter(collection=collection, batch_size=10,
+                             flush_interval=60, max_retries=2) as writer:
+            writer.add(records[0])
+        # One attempt and two retries
+        self.assertEqual(collection.bulk_write.call_count, 3)
+        self.assertEqual(writer.failed_ids, [records[0]['_id']])
+
+        collection.bulk_write.side_effect = None
+        with BulkMongoWriter(collection=collection, batch_size=10,
+                             flush_interval=60) as writer:
+            for record in records[1:]:
+                writer.add(record)
+        self.assertEqual(
+            sorted(Instance.objects.filter(is_synced_with_mongo=True)
+                   .values_list('pk', flat=True)),
+            self.instance_ids[1:])
+
+    def test_update_mongo_instances_task(self):
+        userform_id = '{}_{}'.format(self.user.username, self.xform.id_string)
+        settings.MONGO_DB.instances.drop()
+        written = update_mongo_instances(self.instance_ids)
+        self.assertEqual(written, 4)
+        self.assertEqual(settings.MONGO_DB.instances.find(
+            {USERFORM_ID: userform_id}).count(), 4)
+
+    def test_update_mongo_instances_refreshes_geopoints(self):
+        Instance.objects.filter(pk=self.instance_ids[0]).update(
+            geom=GeometryCollection(Point(36.8, -1.3)))
+        update_mongo_instances(self.instance_ids)
+        parsed_instance = ParsedInstance.objects.get(
+            instance_id=self.instance_ids[0])
+        self.assertEqual((parsed_instance.lat, parsed_instance.lng),
+                         (-1.3, 36.8))
+        self.assertEqual(ParsedInstance.objects.filter(
+            lat__isnull=False).count(), 1)
+
+    def test_bulk_update_mongo_queries_do_not_grow_with_submissions(self):
+        collection = Mock()
+
+        def count_queries(instance_ids):
+            with BulkMongoWriter(collection=collection,
+                                 flush_interval=60) as writer:
+                with CaptureQueriesContext(connection) as queries:
+                    ParsedInstance.bulk_update_mongo(instance_ids, writer)
+            return len(queries)
+
+        self.assertEqual(count_queries(self.instance_ids[:1]),
+                         count_queries(self.instance_ids))
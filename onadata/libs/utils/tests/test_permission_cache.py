@@ -0,0 +1,87 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+from django.contrib.auth.models import AnonymousUser, User
+from guardian.shortcuts import assign_perm, remove_perm
+
+from onadata.apps.logger.models import XForm
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.constants import CAN_VIEW_XFORM
+from onadata.libs.utils.permission_cache import (
+    XFormPermissionCache,
+    xform_permission_cache,
+)
+
+
+class TestXFormPermissionCache(TestBase):
+
+    def setUp(self):
+        super(TestXFormPermissionCache, self).setUp()
+        self._publish_transportation_form()
+        self.alice = self._create_user('alice', 'alice')
+        xform_permission_cache.clear()
+
+    def test_has_perm(self):
+        cache = xform_permission_cache
+        self.assertTrue(cache.has_perm(self.user, 'logger.report_xform',
+                                       self.xform))
+        self.assertFalse(cache.has_perm(self.alice, CAN_VIEW_XFORM,
+                                        self.xform))
+
+        # Changes are seen at once by the process making them
+        assign_perm(CAN_VIEW_XFORM, self.alice, self.xform)
+        self.assertTrue(cache.has_perm(self.alice, CAN_VIEW_XFORM,
+                                       self.xform))
+        self.assertFalse(cache.has_perm(self.alice, 'report_xform',
+                                        self.xform))
+        remove_perm(CAN_VIEW_XFORM, self.alice, self.xform)
+        self.assertFalse(cache.has_perm(self.alice, CAN_VIEW_XFORM,
+                                        self.xform))
+
+        self.alice.is_superuser = True
+        self.assertTrue(cache.has_perm(self.alice, CAN_VIEW_XFORM,
+                                       self.xform))
+        self.alice.is_active = False
+        self.assertFalse(cache.has_perm(self.alice, CAN_VIEW_XFORM,
+                                        self.xform))
+
+        self.assertEqual(
+            cache.has_perm(AnonymousUser(), CAN_VIEW_XFORM, self.xform),
+            AnonymousUser().has_perm(CAN_VIEW_XFORM, self.xform))
+
+    def test_filter_queryset(self):
+        queryset = XForm.objects.all()
+        self.assertEqual(list(xform_permission_cache.filter_queryset(
+            self.alice, 'logger.view_xform', queryset)), [])
+        assign_perm(CAN_VIEW_XFORM, self.alice, self.xform)
+        self.assertEqual(list(xform_permission_cache.filter_queryset(
+            self.alice, 'logger.view_xform', queryset)), [self.xform])
+
+    def test_version_changes_with_permissions(self):
+        # Another process, which does not see the signals of this one
+        cache = XFormPermissionCache()
+        self.assertFalse(cache.has_perm(
+            User.objects.get(pk=self.alice.pk), CAN_VIEW_XFORM, self.xform))
+
+        assign_perm(CAN_VIEW_XFORM, self.alice, self.xform)
+        self.assertTrue(cache.has_perm(
+            User.objects.get(pk=self.alice.pk), CAN_VIEW_XFORM, self.xform))
+
+        remove_perm(CAN_VIEW_XFORM, self.alice, self.xform)
+        self.assertFalse(cache.has_perm(
+            User.objects.get(pk=self.alice.pk), CAN_VIEW_XFORM, self.xform))
+
+    def test_grants_are_cached(self):
+        assign_perm(CAN_VIEW_XFORM, self.alice, self.xform)
+        alice = User.objects.get(pk=self.alice.pk)
+        xform_permission_cache.get_grants(alice)
+
+        # Only the version is queried for a new request
+        alice = User.objects.get(pk=self.alice.pk)
+        with self.assertNumQueries(2):
+            self.assertTrue(xform_permission_cache.has_perm(
+                alice, CAN_VIEW_XFORM, self.xform))
+        # and nothing for the rest of the request
+        with self.assertNumQueries(0):
+            self.assertTrue(xform_permission_cache.has_perm(
+                alice, CAN_VIEW_XFORM, self.xform))
@@ -0,0 +1,45 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+import unittest
+
+from onadata.libs.utils.schema_cache import SizedLRUCache
+
+
+class TestSizedLRUCache(unittest.TestCase):
+
+    def test_get_requires_matching_version(self):
+        cache = SizedLRUCache(max_bytes=100)
+        cache.set(1, 'v1', 'form 1', 10)
+        self.assertEqual(cache.get(1, 'v1'), 'form 1')
+        self.assertIsNone(cache.get(1, 'v2'))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_evicts_least_recently_used_by_size(self):
+        cache = SizedLRUCache(max_bytes=100)
+        cache.set(1, 'v1', 'form 1', 40)
+        cache.set(2, 'v1', 'form 2', 40)
+        # touch 1 so that 2 becomes the least recently used entry
+        cache.get(1, 'v1')
+        cache.set(3, 'v1', 'form 3', 40)
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertIn(3, cache)
+        self.assertEqual(cache.current_bytes, 80)
+
+    def test_oversized_values_are_not_cached(self):
+        cache = SizedLRUCache(max_bytes=100)
+        cache.set(1, 'v1', 'form 1', 40)
+        cache.set(2, 'v1', 'huge form', 101)
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+
+    def test_replace_and_invalidate(self):
+        cache = SizedLRUCache(max_bytes=100)
+        cache.set(1, 'v1', 'form 1', 40)
+        cache.set(1, 'v2', 'form 1 updated', 50)
+        self.assertEqual(cache.current_bytes, 50)
+        self.assertEqual(cache.get(1, 'v2'), 'form 1 updated')
+        cache.invalidate(1)
+        self.assertNotIn(1, cache)
+        self.assertEqual(cache.current_bytes, 0)
@@ -0,0 +1,42 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+import json
+import unittest
+
+from onadata.libs.utils.streaming import (
+    get_stream_format,
+    iter_json_array,
+    iter_ndjson,
+    streaming_json_response,
+)
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [{'_id': i, 'name': 'record %s' % i}
+                        for i in range(250)]
+
+    def test_iter_json_array(self):
+        chunks = list(iter_json_array(iter(self.records), chunk_size=100))
+        # opening bracket, 3 chunks of records, closing bracket
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(json.loads(''.join(chunks)), self.records)
+        self.assertEqual(''.join(iter_json_array(iter([]))), '[]')
+
+    def test_iter_ndjson(self):
+        content = ''.join(iter_ndjson(iter(self.records)))
+        self.assertEqual([json.loads(line) for line in content.splitlines()],
+                         self.records)
+
+    def test_jsonp_callback(self):
+        response = streaming_json_response(iter(self.records[:1]),
+                                           callback='callback')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content, 'callback([{"_id": 0, "name": "record 0"}])')
+
+    def test_get_stream_format(self):
+        self.assertIsNone(get_stream_format({}))
+        self.assertIsNone(get_stream_format({'stream': 'false'}))
+        self.assertEqual(get_stream_format({'stream': 'true'}), 'json')
+        self.assertEqual(get_stream_format({'stream': 'ndjson'}), 'ndjson')
@@ -12,12 +12,17 @@ from django.shortcuts import get_object_or_404
 from guardian.shortcuts import get_perms_for_model, assign_perm
 
 from onadata.apps.logger.models import XForm, Note
+from onadata.apps.logger.models.submission_counter import (
+    SubmissionCounterDelta,
+    submission_counters_are_deferred,
+)
 from onadata.apps.main.models import UserProfile
 from onadata.libs.constants import (
     CAN_DELETE_DATA_XFORM,
     CAN_CHANGE_XFORM,
     CAN_VIEW_XFORM,
 )
+from onadata.libs.utils.permission_cache import xform_permission_cache
 
 
 class HttpResponseNotAuthorized(HttpResponse):
@@ -54,6 +59,9 @@ def set_profile_data(data, content_user):
     forms = content_user.xforms.filter(shared__exact=1)
     num_forms = forms.count()
     user_instances = profile.num_of_submissions
+    if submission_counters_are_deferred():
+        user_instances += SubmissionCounterDelta.get_pending_for_user(
+            content_user.pk)
     home_page = profile.home_page
     if home_page and re.match("http", home_page) is None:
         home_page = "http://%s" % home_page
@@ -70,20 +78,24 @@ def has_permission(xform, owner, request, shared=False):
         (hasattr(request, 'session') and
          request.session.get('public_link') == xform.uuid) or \
         owner == user or \
-        user.has_perm('logger.' + CAN_VIEW_XFORM, xform) or \
-        user.has_perm('logger.' + CAN_CHANGE_XFORM, xform)
+        xform_permission_cache.has_perm(
+            user, 'logger.' + CAN_VIEW_XFORM, xform) or \
+        xform_permission_cache.has_perm(
+            user, 'logger.' + CAN_CHANGE_XFORM, xform)
 
 
 def has_delete_data_permission(xform, owner, request):
     user = request.user
     return owner == user or \
-        user.has_perm('logger.' + CAN_DELETE_DATA_XFORM, xform)
+        xform_permission_cache.has_perm(
+            user, 'logger.' + CAN_DELETE_DATA_XFORM, xform)
 
 
 def has_edit_permission(xform, owner, request):
     user = request.user
     return owner == user or \
-        user.has_perm('logger.' + CAN_CHANGE_XFORM, xform)
+        xform_permission_cache.has_perm(
+            user, 'logger.' + CAN_CHANGE_XFORM, xform)
 
 
 def check_and_set_user_and_form(username, id_string, request):
@@ -112,12 +124,14 @@ def get_xform_and_perms(username, id_string, request):
         XForm, user__username=username, id_string=id_string)
     is_owner = xform.user == request.user
     can_edit = is_owner or \
-        request.user.has_perm('logger.' + CAN_CHANGE_XFORM, xform)
+        xform_permission_cache.has_perm(
+            request.user, 'logger.' + CAN_CHANGE_XFORM, xform)
     can_view = can_edit or \
-        request.user.has_perm('logger.' + CAN_VIEW_XFORM, xform)
+        xform_permission_cache.has_perm(
+            request.user, 'logger.' + CAN_VIEW_XFORM, xform)
     can_delete_data = is_owner or \
-        request.user.has_perm('logger.' + CAN_DELETE_DATA_XFORM,
-                              xform)
+        xform_permission_cache.has_perm(
+            request.user, 'logger.' + CAN_DELETE_DATA_XFORM, xform)
     return [xform, is_owner, can_edit, can_view, can_delete_data]
 
 
@@ -1,20 +1,25 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division, absolute_import
+import logging
+import mimetypes
 import os
+import shutil
 import traceback
 import requests
-import zipfile
+from collections import deque
+from multiprocessing.pool import ThreadPool
 
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile
 from xml.dom import minidom
 
 from django.conf import settings
-from django.core.files.storage import get_storage_class
+from django.core.files.storage import FileSystemStorage, get_storage_class
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.core.mail import mail_admins
 from django.utils.translation import ugettext as _
 
 from onadata.libs.utils import common_tags
+from onadata.libs.utils.zip_stream import ZipStream
 
 
 SLASH = "/"
@@ -222,19 +227,172 @@ def enketo_url(form_url, id_string, instance_xml=None,
     return False
 
 
+# Read and write attachments by chunks of this many bytes
+ATTACHMENTS_ZIP_CHUNK_SIZE = 64 * 1024
+# Prefetched attachments are kept in memory up to this size, on disk above
+ATTACHMENTS_ZIP_SPOOL_SIZE = 1024 * 1024
+# Media which would not get any smaller in the archive
+COMPRESSED_MIMETYPE_PREFIXES = ('image/', 'audio/', 'video/')
+COMPRESSED_MIMETYPES = (
+    'application/gzip',
+    'application/pdf',
+    'application/x-gzip',
+    'application/zip',
+)
+
+
+def _should_compress(attachment):
+    mimetype = getattr(attachment, 'mimetype', '') or \
+        mimetypes.guess_type(attachment.media_file.name)[0] or ''
+    return not (mimetype.startswith(COMPRESSED_MIMETYPE_PREFIXES) or
+                mimetype in COMPRESSED_MIMETYPES)
+
+
+def _iter_chunks(source_file, first_chunk=b''):
+    try:
+        if first_chunk:
+            yield first_chunk
+        for chunk in iter(
+                lambda: source_file.read(ATTACHMENTS_ZIP_CHUNK_SIZE), b''):
+            yield chunk
+    finally:
+        source_file.close()
+
+
+def _open_attachment(storage, name):
+    """
+    Opens `name` in `storage` and reads its first chunk, as remote storages
+    only fetch the file when it is first read. Returns `(file, first chunk)`.
+    """
+    source_file = storage.open(name, 'rb')
+    try:
+        return source_file, source_file.read(ATTACHMENTS_ZIP_CHUNK_SIZE)
+    except Exception:
+        source_file.close()
+        raise
+
+
+def _download_attachment(storage, name):
+    """
+    Copies `name` from `storage` to a temporary file, in a worker thread of
+    `_iter_opened_attachments()`.
+    """
+    temp_file = SpooledTemporaryFile(max_size=ATTACHMENTS_ZIP_SPOOL_SIZE)
+    try:
+        with storage.open(name, 'rb') as source_file:
+            shutil.copyfileobj(source_file, temp_file,
+                               ATTACHMENTS_ZIP_CHUNK_SIZE)
+        temp_file.seek(0)
+    except Exception:
+        temp_file.close()
+        raise
+    return temp_file, b''
+
+
+def _is_missing_file_error(e):
+    """
+    Returns whether `e`, raised by a storage backend, means that the file
+    does not exist. Remote storages do not raise an `EnvironmentError`:
+    boto's `S3ResponseError` has a `status`, Azure's
+    `AzureMissingResourceHttpError` a `status_code` and botocore's
+    `ClientError` a `response`.
+    """
+    if isinstance(e, EnvironmentError):
+        return True
+    if getattr(e, 'status', None) == 404 or \
+            getattr(e, 'status_code', None) == 404:
+        return True
+    response = getattr(e, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code') in ('404', 'NoSuchKey')
+    return False
+
+
+def _iter_opened_attachments(storage, attachments, threads):
+    """
+    Yields `(attachment, file, first chunk)` for `attachments`, in order.
+    With more than one thread, the next attachments are downloaded
+    concurrently while the current one is written, at most `2 * threads`
+    ahead. Attachments which cannot be read are skipped.
+    """
+    def _report(attachment, e):
+        # Missing files are skipped, as they were when their existence was
+        # checked beforehand
+        if _is_missing_file_error(e):
+            logging.getLogger().warning(
+                'File "{}" not found, not added to archive: {}'.format(
+                    attachment.media_file.name, e))
+        else:
+            report_exception("Error adding file \"{}\" to archive.".format(
+                attachment.media_file.name), e)
+
+    if threads <= 1 or isinstance(storage, FileSystemStorage):
+        # Local files gain nothing from being read ahead
+        for attachment in attachments:
+            try:
+                source_file, first_chunk = _open_attachment(
+                    storage, attachment.media_file.name)
+            except Exception as e:
+                _report(attachment, e)
+            else:
+                yield attachment, source_file, first_chunk
+        return
+
+    pool = ThreadPool(threads)
+    pending = deque()
+    try:
+        attachments = iter(attachments)
+        while True:
+            for attachment in attachments:
+                pending.append((attachment, pool.apply_async(
+                    _download_attachment,
+                    (storage, attachment.media_file.name))))
+                if len(pending) >= 2 * threads:
+                    break
+            if not pending:
+                break
+            attachment, result = pending.popleft()
+            try:
+                source_file, first_chunk = result.get()
+            except Exception as e:
+                _report(attachment, e)
+            else:
+                yield attachment, source_file, first_chunk
+    finally:
+        pool.terminate()
+        for unused, result in pending:
+            if result.ready() and result.successful():
+                result.get()[0].close()
+
+
+def iter_attachments_zip(attachments):
+    """
+    Yields the bytes of a ZIP archive of `attachments`, each file copied by
+    chunks, in the order of `attachments`. Media which is already
+    compressed, e.g. photos, is stored as is.
+    """
+    storage = get_storage_class()()
+    threads = getattr(settings, 'ATTACHMENTS_ZIP_FETCH_THREADS', 4)
+    zip_stream = ZipStream()
+    for attachment, source_file, first_chunk in _iter_opened_attachments(
+            storage, attachments, threads):
+        # `media_file_size` saves a round-trip to the storage per file
+        for data in zip_stream.iter_file(
+                attachment.media_file.name,
+                _iter_chunks(source_file, first_chunk),
+                size=getattr(attachment, 'media_file_size', None),
+                compress=_should_compress(attachment)):
+            yield data
+    for data in zip_stream.iter_close():
+        yield data
+
+
 def create_attachments_zipfile(attachments, output_file=None):
     if not output_file:
         output_file = NamedTemporaryFile()
 
-    storage = get_storage_class()()
-    with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as zip_file:
-        for attachment in attachments:
-            if storage.exists(attachment.media_file.name):
-                try:
-                    with storage.open(attachment.media_file.name, 'rb') as source_file:
-                        zip_file.writestr(attachment.media_file.name, source_file.read())
-                except Exception, e:
-                    report_exception("Error adding file \"{}\" to archive.".format(attachment.media_file.name), e)
+    for data in iter_attachments_zip(attachments):
+        output_file.write(data)
 
     return output_file
 
@@ -0,0 +1,203 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import struct
+import time
+import zlib
+from zipfile import (
+    LargeZipFile,
+    ZIP64_LIMIT,
+    ZIP_DEFLATED,
+    ZIP_FILECOUNT_LIMIT,
+    ZIP_STORED,
+)
+
+# Same layouts as the `zipfile` module
+_LOCAL_HEADER = struct.Struct(str('<4s2B4HL2L2H'))
+_LOCAL_HEADER_SIGNATURE = b'PK\003\004'
+_DATA_DESCRIPTOR = struct.Struct(str('<4sLLL'))
+_DATA_DESCRIPTOR_64 = struct.Struct(str('<4sLQQ'))
+_DATA_DESCRIPTOR_SIGNATURE = b'PK\007\010'
+_CENTRAL_DIRECTORY = struct.Struct(str('<4s4B4HL2L5H2L'))
+_CENTRAL_DIRECTORY_SIGNATURE = b'PK\001\002'
+_END_ARCHIVE = struct.Struct(str('<4s4H2LH'))
+_END_ARCHIVE_SIGNATURE = b'PK\005\006'
+_END_ARCHIVE_64 = struct.Struct(str('<4sQ2H2L4Q'))
+_END_ARCHIVE_64_SIGNATURE = b'PK\006\006'
+_END_ARCHIVE_64_LOCATOR = struct.Struct(str('<4sLQL'))
+_END_ARCHIVE_64_LOCATOR_SIGNATURE = b'PK\006\007'
+
+_ZIP64_EXTRA_ID = 0x0001
+_DEFAULT_VERSION = 20
+_ZIP64_VERSION = 45
+_UNIX_SYSTEM = 3
+# Sizes and CRC follow the data, in a data descriptor
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8_FILENAME = 0x800
+# rw-r--r--
+_EXTERNAL_ATTR = 0o100644 << 16
+
+
+class ZipStream(object):
+    """
+    Writes a ZIP archive to a stream which does not need to be seekable,
+    e.g. an HTTP response, one chunk at a time: the CRC and sizes of each
+    file are written in a data descriptor after its data.
+
+    `iter_file()` yields the bytes of a file entry and `iter_close()` those
+    of the central directory, which ends the archive. Entries are written in
+    the order they are added. ZIP64 extensions are used for files,
+    offsets and entry counts over the limits of the original format.
+    """
+
+    def __init__(self, date_time=None):
+        self.date_time = date_time or time.localtime(time.time())[:6]
+        self._offset = 0
+        self._entries = []
+
+    def _dos_date_time(self):
+        year, month, day, hour, minute, second = self.date_time
+        dos_date = (year - 1980) << 9 | month << 5 | day
+        dos_time = hour << 11 | minute << 5 | (second // 2)
+        return dos_date, dos_time
+
+    @staticmethod
+    def _encode_filename(filename):
+        try:
+            return filename.encode('ascii'), 0
+        except UnicodeError:
+            return filename.encode('utf-8'), _FLAG_UTF8_FILENAME
+
+    def _tell(self, data):
+        self._offset += len(data)
+        return data
+
+    def iter_file(self, filename, chunks, size=None, compress=False):
+        """
+        Yields the bytes of an entry named `filename` whose content is the
+        concatenation of `chunks`. `size`, if known beforehand, avoids the
+        ZIP64 extensions for files under 2 GiB. `compress` deflates the
+        content, which is not worth it for already compressed media.
+        """
+        encoded_filename, flags = self._encode_filename(filename)
+        flags |= _FLAG_DATA_DESCRIPTOR
+        compress_type = ZIP_DEFLATED if compress else ZIP_STORED
+        zip64 = size is None or size > ZIP64_LIMIT
+        version = _ZIP64_VERSION if zip64 else _DEFAULT_VERSION
+        dos_date, dos_time = self._dos_date_time()
+        header_offset = self._offset
+
+        extra = b''
+        header_size = 0
+        if zip64:
+            extra = struct.pack(str('<HHQQ'), _ZIP64_EXTRA_ID, 16, 0, 0)
+            header_size = 0xffffffff
+        yield self._tell(_LOCAL_HEADER.pack(
+            _LOCAL_HEADER_SIGNATURE, version, 0, flags, compress_type,
+            dos_time, dos_date, 0, header_size, header_size,
+            len(encoded_filename), len(extra)) + encoded_filename + extra)
+
+        crc = 0
+        file_size = 0
+        compress_size = 0
+        compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15) \
+            if compress else None
+        for chunk in chunks:
+            if not chunk:
+                continue
+            crc = zlib.crc32(chunk, crc) & 0xffffffff
+            file_size += len(chunk)
+            if compressor:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            compress_size += len(chunk)
+            yield self._tell(chunk)
+        if compressor:
+            chunk = compressor.flush()
+            compress_size += len(chunk)
+            yield self._tell(chunk)
+
+        if not zip64 and max(file_size, compress_size) > ZIP64_LIMIT:
+            # The local header has been sent without the ZIP64 extensions
+            raise LargeZipFile(
+                "File size of {} is larger than announced".format(filename))
+        if zip64:
+            descriptor = _DATA_DESCRIPTOR_64.pack(
+                _DATA_DESCRIPTOR_SIGNATURE, crc, compress_size, file_size)
+        else:
+            descriptor = _DATA_DESCRIPTOR.pack(
+                _DATA_DESCRIPTOR_SIGNATURE, crc, compress_size, file_size)
+        yield self._tell(descriptor)
+
+        self._entries.append({
+            'filename': encoded_filename,
+            'flags': flags,
+            'compress_type': compress_type,
+            'dos_date': dos_date,
+            'dos_time': dos_time,
+            'crc': crc,
+            'file_size': file_size,
+            'compress_size': compress_size,
+            'header_offset': header_offset,
+            'zip64': zip64,
+        })
+
+    def _central_directory_record(self, entry):
+        # Only the fields over the limits go into the ZIP64 extra field
+        extra_fields = []
+        file_size = entry['file_size']
+        compress_size = entry['compress_size']
+        header_offset = entry['header_offset']
+        if file_size > ZIP64_LIMIT:
+            extra_fields.append(file_size)
+            file_size = 0xffffffff
+        if compress_size > ZIP64_LIMIT:
+            extra_fields.append(compress_size)
+            compress_size = 0xffffffff
+        if header_offset > ZIP64_LIMIT:
+            extra_fields.append(header_offset)
+            header_offset = 0xffffffff
+
+        extra = b''
+        if extra_fields:
+            extra = struct.pack(
+                str('<HH' + 'Q' * len(extra_fields)), _ZIP64_EXTRA_ID,
+                8 * len(extra_fields), *extra_fields)
+        version = _ZIP64_VERSION if entry['zip64'] or extra_fields \
+            else _DEFAULT_VERSION
+
+        return _CENTRAL_DIRECTORY.pack(
+            _CENTRAL_DIRECTORY_SIGNATURE, version, _UNIX_SYSTEM, version, 0,
+            entry['flags'], entry['compress_type'], entry['dos_time'],
+            entry['dos_date'], entry['crc'], compress_size, file_size,
+            len(entry['filename']), len(extra), 0, 0, 0, _EXTERNAL_ATTR,
+            header_offset) + entry['filename'] + extra
+
+    def iter_close(self):
+        """
+        Yields the central directory and the end of the archive.
+        """
+        start_offset = self._offset
+        for entry in self._entries:
+            yield self._tell(self._central_directory_record(entry))
+        size = self._offset - start_offset
+
+        count = len(self._entries)
+        if count >= ZIP_FILECOUNT_LIMIT or start_offset > ZIP64_LIMIT or \
+                size > ZIP64_LIMIT:
+            end_offset = self._offset
+            yield self._tell(_END_ARCHIVE_64.pack(
+                _END_ARCHIVE_64_SIGNATURE, _END_ARCHIVE_64.size - 12,
+                _ZIP64_VERSION, _ZIP64_VERSION, 0, 0, count, count, size,
+                start_offset))
+            yield self._tell(_END_ARCHIVE_64_LOCATOR.pack(
+                _END_ARCHIVE_64_LOCATOR_SIGNATURE, 0, end_offset, 1))
+            count = min(count, 0xffff)
+            size = min(size, 0xffffffff)
+            start_offset = min(start_offset, 0xffffffff)
+
+        yield self._tell(_END_ARCHIVE.pack(
+            _END_ARCHIVE_SIGNATURE, 0, 0, count, count, size, start_offset,
+            0))
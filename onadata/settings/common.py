@@ -409,6 +409,10 @@ LOGGING = {
     }
 }
 
+# Write audit log records to Mongo in batches from a background thread instead
+# of in the request. See `onadata.libs.utils.audit_log_writer`.
+AUDIT_LOG_ASYNC = os.environ.get('AUDIT_LOG_ASYNC', 'True').lower() == 'true'
+
 GOOGLE_STEP2_URI = 'http://ona.io/gwelcome'
 GOOGLE_CLIENT_ID = '617113120802.onadata.apps.googleusercontent.com'
 GOOGLE_CLIENT_SECRET = '9reM29qpGFPyI8TBuB54Z4fk'
@@ -420,6 +424,10 @@ THUMB_CONF = {
 }
 # order of thumbnails from largest to smallest
 THUMB_ORDER = ['large', 'medium', 'small']
+# Generate the thumbnails of image attachments in a Celery task when they are
+# uploaded, instead of when they are first requested
+GENERATE_THUMBNAILS_ON_UPLOAD = os.environ.get(
+    'GENERATE_THUMBNAILS_ON_UPLOAD', 'True').lower() == 'true'
 
 # Number of times Celery retries to send data to external rest service
 REST_SERVICE_MAX_RETRIES = 3
@@ -458,6 +466,52 @@ CELERY_TASK_DEFAULT_QUEUE = "kobocat_queue"
 
 MONGO_DB_MAX_TIME_MS = CELERY_TASK_TIME_LIMIT * 60 * 1000
 
+# Record new submissions in an append-only table instead of incrementing the
+# form and user counters in the submission transaction. The
+# `fold_submission_counters` task applies them every
+# `FOLD_SUBMISSION_COUNTERS_INTERVAL` seconds.
+DEFER_SUBMISSION_COUNTERS = os.environ.get(
+    'DEFER_SUBMISSION_COUNTERS', 'False').lower() == 'true'
+FOLD_SUBMISSION_COUNTERS_INTERVAL = int(os.environ.get(
+    'FOLD_SUBMISSION_COUNTERS_INTERVAL', 60))
+
+# Bulk writes of parsed submissions to MongoDB (remongo, sync_mongo, ...).
+# Buffered documents are flushed when the batch is full or when a new document
+# arrives more than `FLUSH_INTERVAL` seconds after the previous flush.
+MONGO_BULK_WRITE_BATCH_SIZE = int(os.environ.get(
+    'MONGO_BULK_WRITE_BATCH_SIZE', 500))
+MONGO_BULK_WRITE_FLUSH_INTERVAL = int(os.environ.get(
+    'MONGO_BULK_WRITE_FLUSH_INTERVAL', 5))
+MONGO_BULK_WRITE_MAX_RETRIES = int(os.environ.get(
+    'MONGO_BULK_WRITE_MAX_RETRIES', 3))
+
+# Split XLS, CSV ZIP and SAV ZIP exports of forms with at least
+# `EXPORT_SHARDING_THRESHOLD` submissions into `EXPORT_SHARDS` Celery tasks,
+# merged by a final task. 1 disables sharding.
+EXPORT_SHARDS = int(os.environ.get('EXPORT_SHARDS', 1))
+EXPORT_SHARDING_THRESHOLD = int(os.environ.get(
+    'EXPORT_SHARDING_THRESHOLD', 100000))
+
+# Generate CSV and CSV ZIP exports from the previous export of the form,
+# exporting only the newer submissions, unless submissions were edited or
+# deleted since.
+INCREMENTAL_EXPORTS = os.environ.get(
+    'INCREMENTAL_EXPORTS', 'False').lower() == 'true'
+
+# Attachments ZIP exports: number of threads downloading attachments from
+# remote storages ahead of the one being zipped, and total size of the
+# attachments below which the ZIP is streamed in the HTTP response instead
+# of being generated by a Celery task
+ATTACHMENTS_ZIP_FETCH_THREADS = int(os.environ.get(
+    'ATTACHMENTS_ZIP_FETCH_THREADS', 4))
+ATTACHMENTS_ZIP_STREAMING_MAX_SIZE = int(os.environ.get(
+    'ATTACHMENTS_ZIP_STREAMING_MAX_SIZE', 100 * 1024 * 1024))
+
+# Maximum number of submissions returned at once by the Briefcase
+# `downloadSubmissions` batch endpoint
+BRIEFCASE_MAX_BATCH_SIZE = int(os.environ.get(
+    'BRIEFCASE_MAX_BATCH_SIZE', 100))
+
 # duration to keep zip exports before deletion (in seconds)
 ZIP_EXPORT_COUNTDOWN = 24 * 60 * 60
 
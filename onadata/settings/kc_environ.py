@@ -282,6 +282,13 @@ CELERY_BEAT_SCHEDULE = {
     },
 }
 
+if DEFER_SUBMISSION_COUNTERS:
+    CELERY_BEAT_SCHEDULE['fold-submission-counters'] = {
+        'task': 'onadata.apps.logger.tasks.fold_submission_counters',
+        'schedule': timedelta(seconds=FOLD_SUBMISSION_COUNTERS_INTERVAL),
+        'options': {'queue': 'kobocat_queue'}
+    }
+
 # ## ISSUE 242 TEMPORARY FIX ###
 # See https://github.com/kobotoolbox/kobocat/issues/242
 ISSUE_242_MINIMUM_INSTANCE_ID = os.environ.get(